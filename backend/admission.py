@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+
+import metrics
+from logger_config import logger
+
+# Admission control for the request threadpool, per worker process.
+#
+# Requests are sorted into route classes by path. Each class may fill only a
+# share of ADMISSION_CAPACITY concurrent requests and waits at most its
+# max_wait for a slot; waiting requests are admitted strictly by priority.
+# While checkout requests have to queue longer than ADMISSION_TARGET_DELAY_MS,
+# lower classes are shed outright for ADMISSION_SHED_COOLDOWN seconds. Shed
+# requests get 503 with Retry-After instead of adding to the checkout latency.
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+# Match the threadpool size: beyond that requests only queue inside anyio
+ADMISSION_CAPACITY = int(os.getenv('ADMISSION_CAPACITY', os.getenv('THREADPOOL_SIZE', '40')))
+ADMISSION_TARGET_DELAY_MS = float(os.getenv('ADMISSION_TARGET_DELAY_MS', '50'))
+ADMISSION_SHED_COOLDOWN = float(os.getenv('ADMISSION_SHED_COOLDOWN', '2'))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '2'))
+EWMA_ALPHA = 0.2
+
+class RouteClass:
+    def __init__(self, name, priority, share, max_wait):
+        self.name = name
+        self.priority = priority
+        self.share = share
+        self.max_wait = max_wait
+
+CRITICAL = RouteClass('critical', 0, 1.0, float(os.getenv('ADMISSION_CRITICAL_WAIT', '10')))
+READ = RouteClass('read', 1, 0.75, float(os.getenv('ADMISSION_READ_WAIT', '1')))
+ADMIN = RouteClass('admin', 2, 0.5, float(os.getenv('ADMISSION_ADMIN_WAIT', '0.5')))
+ROUTE_CLASSES = (CRITICAL, READ, ADMIN)
+
+# Gate scans are critical too: a shed check-in leaves a queue at the door
+CRITICAL_PATHS = ('/reserve-seats', '/book', '/upload-payment', '/verify-payment-otp', '/checkin')
+ADMIN_PATHS = ('/admin', '/analytics', '/bookings', '/booking/*/action', '/booking/*/resend-email')
+# Never queued or shed: monitoring must keep working under overload
+EXEMPT_PATHS = ('/metrics', '/test', '/healthz', '/readyz', '/admin/dependencies')
+
+def _matches(path, pattern):
+    parts, pattern_parts = path.split('/'), pattern.split('/')
+    if len(parts) < len(pattern_parts):
+        return False
+    return all(p == '*' or p == part for p, part in zip(pattern_parts, parts))
+
+def classify(path):
+    """RouteClass of a request path, or None if it is exempt"""
+    if path.startswith('/api/'):
+        path = path[4:]
+    path = path.rstrip('/') or '/'
+    if any(_matches(path, pattern) for pattern in EXEMPT_PATHS):
+        return None
+    if any(_matches(path, pattern) for pattern in CRITICAL_PATHS):
+        return CRITICAL
+    if any(_matches(path, pattern) for pattern in ADMIN_PATHS):
+        return ADMIN
+    return READ
+
+class AdmissionController:
+    """Priority admission for one event loop; not thread-safe, and needs no lock"""
+
+    def __init__(self, capacity=ADMISSION_CAPACITY, target_delay=ADMISSION_TARGET_DELAY_MS / 1000,
+                 shed_cooldown=ADMISSION_SHED_COOLDOWN):
+        self.capacity = capacity
+        self.target_delay = target_delay
+        self.shed_cooldown = shed_cooldown
+        self.total = 0
+        self.in_flight = {route_class.name: 0 for route_class in ROUTE_CLASSES}
+        self.queue_delay = {route_class.name: 0.0 for route_class in ROUTE_CLASSES}
+        self.shed_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    def limit(self, route_class):
+        return max(1, int(self.capacity * route_class.share))
+
+    def shedding(self):
+        return time.monotonic() < self.shed_until
+
+    def waiting(self):
+        return sum(1 for *_, future, _ in self._waiters if not future.done())
+
+    async def acquire(self, route_class):
+        """None once admitted, else the reason the request is rejected"""
+        if route_class.priority > CRITICAL.priority and self.shedding():
+            return 'shed'
+        started = time.monotonic()
+        # Only waiters of the same or higher priority are ahead in line
+        if self.total < self.limit(route_class) and (not self._waiters or self._waiters[0][0] > route_class.priority):
+            self._admit(route_class)
+        elif route_class.max_wait <= 0:
+            return 'queue_full'
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (route_class.priority, next(self._sequence), future, route_class))
+            try:
+                await asyncio.wait_for(future, route_class.max_wait)
+            except asyncio.TimeoutError:
+                self._wake()
+                self._observe(route_class, time.monotonic() - started)
+                return 'timeout'
+            except asyncio.CancelledError:
+                # Client went away; give the slot back if it was granted meanwhile
+                if future.done() and not future.cancelled():
+                    self.release(route_class)
+                else:
+                    self._wake()
+                raise
+        self._observe(route_class, time.monotonic() - started)
+        return None
+
+    def release(self, route_class):
+        self.total -= 1
+        self.in_flight[route_class.name] -= 1
+        self._wake()
+
+    def _admit(self, route_class):
+        self.total += 1
+        self.in_flight[route_class.name] += 1
+
+    def _wake(self):
+        """Admit waiters by priority; leaves the heap empty or headed by a live waiter"""
+        while self._waiters:
+            _, _, future, route_class = self._waiters[0]
+            if future.done():
+                # Timed out or its client went away
+                heapq.heappop(self._waiters)
+                continue
+            if self.total >= self.limit(route_class):
+                # The head has the highest priority and the largest share
+                break
+            heapq.heappop(self._waiters)
+            self._admit(route_class)
+            future.set_result(True)
+
+    def _observe(self, route_class, delay):
+        previous = self.queue_delay[route_class.name]
+        self.queue_delay[route_class.name] = previous + EWMA_ALPHA * (delay - previous)
+        metrics.admission_queue_delay.observe(delay, route_class.name)
+        if route_class is CRITICAL and delay > self.target_delay:
+            if not self.shedding():
+                logger.warning(f"Checkout queued {delay * 1000:.0f}ms, shedding read/admin traffic")
+            self.shed_until = time.monotonic() + self.shed_cooldown
+
+    def snapshot(self):
+        return {
+            "capacity": self.capacity,
+            "in_flight": dict(self.in_flight),
+            "waiting": self.waiting(),
+            "queue_delay_ms": {name: round(delay * 1000, 1) for name, delay in self.queue_delay.items()},
+            "shedding": self.shedding(),
+        }
+
+controller = AdmissionController()
+
+metrics.admission_in_flight.set_function(lambda: {(name,): count for name, count in controller.in_flight.items()})
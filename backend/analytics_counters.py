@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Check or rebuild analytics_counters, the per-showtime, per-status booking
+totals behind /api/analytics and /api/bookings/stats.
+
+  verify   compare the counters with a full aggregate of bookings and list
+           every (showtime, status) that disagrees; exits 1 on drift
+  rebuild  recompute the counters from bookings (booking writes wait while
+           it runs), then verify
+
+Usage: python analytics_counters.py verify|rebuild
+"""
+
+import argparse
+import sys
+import time
+
+from database import get_analytics_counter_drift, rebuild_analytics_counters
+
+def verify():
+    drift = get_analytics_counter_drift()
+    for row in drift:
+        print(f"showtime {row['showtime_id']} {row['status']}: "
+              f"bookings {row['counted_bookings']}/{row['expected_bookings']}  "
+              f"seats {row['counted_seats']}/{row['expected_seats']}  "
+              f"revenue {row['counted_revenue']}/{row['expected_revenue']}  (counted/expected)")
+    print(f"{len(drift)} counters out of step" if drift else "✓ analytics_counters match bookings")
+    return not drift
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['verify', 'rebuild'])
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        started = time.perf_counter()
+        count = rebuild_analytics_counters()
+        print(f"✓ Rebuilt {count} counters in {time.perf_counter() - started:.1f}s")
+    sys.exit(0 if verify() else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the busiest database.py queries and the seat map.
+
+Seeds a separate Postgres schema (default: bench) with deterministic data
+(many showtimes, 10k-1M bookings, OTPs), then times each case and writes
+p50/p95/mean latency plus queries per call to JSON. Compared against a
+stored baseline, any case whose p50 got slower than --threshold exits
+non-zero, so regressions are caught before deploy.
+
+Usage: python bench_database.py [--bookings 100000] [--showtimes 200] [--seed 42]
+                                [--iterations 50] [--output results.json]
+                                [--baseline baseline.json] [--save-baseline]
+Data is only re-seeded when the generator settings change (or with --reseed).
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+STATUS_WEIGHTS = {
+    'confirmed': 40,
+    'approved': 10,
+    'pending_approval': 5,
+    'pending_verification': 3,
+    'pending_payment': 2,
+    'cancelled': 20,
+    'expired': 15,
+    'admin_rejected': 5,
+}
+HALL = {'rows': 11, 'left_cols': 8, 'right_cols': 6}
+BATCH_SIZE = 10000
+
+# Seeding drops and recreates the schema, so never touch the application's own
+SCHEMA_PATTERN = re.compile(r'^[a-z_][a-z0-9_]*$')
+PROTECTED_SCHEMAS = ('public', 'information_schema')
+
+def check_schema_name(schema):
+    """Error message if schema must not be used for benchmark data, else None"""
+    if not SCHEMA_PATTERN.match(schema):
+        return f"invalid schema name {schema!r} (lowercase letters, digits and _ only)"
+    if schema in PROTECTED_SCHEMAS or schema.startswith('pg_'):
+        return f"refusing to use the {schema} schema for benchmark data"
+    return None
+
+def foreign_tables(cursor, schema):
+    """Tables in schema, if it exists and was not created by seed() (no bench_meta)"""
+    cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = %s", (schema,))
+    tables = [row['table_name'] for row in cursor.fetchall()]
+    return [] if 'bench_meta' in tables else tables
+
+def use_schema(schema):
+    """Point every connection opened by database.py at the benchmark schema"""
+    os.environ['PGOPTIONS'] = f"-c search_path={schema}"
+
+def seed_settings(args):
+    return {'bookings': args.bookings, 'showtimes': args.showtimes, 'otps': args.otps, 'seed': args.seed}
+
+def current_settings(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT settings FROM bench_meta LIMIT 1")
+        row = cursor.fetchone()
+        return row['settings'] if row else None
+    except Exception:
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+
+def all_seats():
+    return [
+        f"{chr(65 + row)}{col}"
+        for row in range(HALL['rows'])
+        for col in range(1, HALL['left_cols'] + HALL['right_cols'] + 1)
+    ]
+
+def generate_bookings(rng, count, showtime_ids):
+    """Bookings skewed towards a few hot showtimes, like a real launch"""
+    seats = all_seats()
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+    now = datetime.now()
+    for i in range(count):
+        showtime_id = showtime_ids[min(int(rng.paretovariate(1.2)) - 1, len(showtime_ids) - 1)]
+        chosen = rng.sample(seats, rng.randint(1, 4))
+        created_at = now - timedelta(minutes=rng.randint(10, 60 * 24 * 90))
+        yield (
+            showtime_id, f"Customer {i}", f"customer{i}@example.com", f"08{i:010d}", chosen,
+            len(chosen) * 50000, rng.choices(statuses, weights)[0], created_at, created_at,
+        )
+
+def seed(schema, args):
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    existing = foreign_tables(cursor, schema)
+    if existing and not args.force:
+        conn.close()
+        sys.exit(f"Schema {schema} holds tables not created by this benchmark ({', '.join(sorted(existing)[:5])}); "
+                 f"refusing to drop it without --force")
+    print(f"Seeding schema {schema}: {args.showtimes} showtimes, {args.bookings} bookings, {args.otps} OTPs")
+    started = time.perf_counter()
+    cursor.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(schema)))
+    cursor.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(schema)))
+    cursor.execute(sql.SQL("SET LOCAL search_path TO {}").format(sql.Identifier(schema)))
+    with open(os.path.join(os.path.dirname(__file__), 'database.sql')) as f:
+        cursor.execute(f.read())
+
+    rng = random.Random(args.seed)
+    cursor.execute("SELECT id FROM movies ORDER BY id LIMIT 1")
+    movie_id = cursor.fetchone()['id']
+    cursor.execute("""
+        INSERT INTO theaters (name, address, rows, left_cols, right_cols, non_selectable_seats)
+        VALUES ('Bench Hall', '', %s, %s, %s, %s) RETURNING id
+    """, (HALL['rows'], HALL['left_cols'], HALL['right_cols'], ['A1', 'A14']))
+    theater_id = cursor.fetchone()['id']
+    today = datetime.now().date()
+    execute_values(cursor, """
+        INSERT INTO showtimes (movie_id, theater_id, show_date, show_time, price) VALUES %s
+    """, [(movie_id, theater_id, today + timedelta(days=i % 60), f"{10 + i % 12}:00:00", 50000)
+          for i in range(args.showtimes)])
+    cursor.execute("SELECT id FROM showtimes ORDER BY id")
+    showtime_ids = [row['id'] for row in cursor.fetchall()]
+
+    batch = []
+    for row in generate_bookings(rng, args.bookings, showtime_ids):
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            execute_values(cursor, """
+                INSERT INTO bookings (showtime_id, customer_name, customer_email, customer_phone, seats,
+                                      total_amount, status, created_at, updated_at) VALUES %s
+            """, batch)
+            batch = []
+    if batch:
+        execute_values(cursor, """
+            INSERT INTO bookings (showtime_id, customer_name, customer_email, customer_phone, seats,
+                                  total_amount, status, created_at, updated_at) VALUES %s
+        """, batch)
+
+    expires_at = datetime.now() + timedelta(days=365)
+    execute_values(cursor, """
+        INSERT INTO otp_storage (email, otp, booking_id, expires_at) VALUES %s
+    """, [(f"customer{i}@example.com", f"{rng.randint(0, 999999):06d}", i + 1, expires_at)
+          for i in range(min(args.otps, args.bookings))])
+
+    cursor.execute("CREATE TABLE bench_meta (settings JSONB)")
+    cursor.execute("INSERT INTO bench_meta VALUES (%s)", (json.dumps(seed_settings(args)),))
+    conn.commit()
+    cursor.execute("ANALYZE")
+    cursor.close()
+    conn.close()
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+    return showtime_ids
+
+def hot_showtime():
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT showtime_id, COUNT(*) AS bookings FROM bookings GROUP BY showtime_id ORDER BY 2 DESC LIMIT 1")
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return row['showtime_id']
+
+def build_cases(showtime_id, rng):
+    """name -> (setup, call); setup() returns the call's arguments and is not timed"""
+    import database
+    from main import get_showtime_info
+
+    otp_counter = iter(range(10 ** 9))
+
+    def fresh_otp():
+        i = next(otp_counter)
+        email = f"bench-otp-{i}@example.com"
+        database.store_otp(email, '123456', None, datetime.now() + timedelta(minutes=5))
+        return (email, '123456')
+
+    seats = all_seats()
+    return {
+        'get_booked_seats': (lambda: (showtime_id,), database.get_booked_seats),
+        'get_showtime_info': (lambda: (showtime_id,), get_showtime_info),
+        'get_analytics': (lambda: (), database.get_analytics),
+        'get_all_bookings': (lambda: (), database.get_all_bookings),
+        'reserve_seats': (
+            lambda: (showtime_id, rng.sample(seats, 2), f"bench_{rng.randint(0, 999)}", datetime.now() + timedelta(minutes=5)),
+            database.reserve_seats,
+        ),
+        'verify_otp_miss': (lambda: (f"customer{rng.randint(0, 999)}@example.com", '000000'), database.verify_otp),
+        'verify_otp_hit': (fresh_otp, database.verify_otp),
+    }
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def run_case(setup, call, iterations, warmup):
+    import query_tracer
+
+    for _ in range(warmup):
+        call(*setup())
+    timings = []
+    queries = 0
+    for _ in range(iterations):
+        args = setup()
+        with query_tracer.capture_queries() as capture:
+            started = time.perf_counter()
+            call(*args)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries += capture.count
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'queries_per_call': queries / iterations,
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+def compare(results, baseline, threshold):
+    """Cases whose p50 regressed by more than threshold (fraction)"""
+    regressions = []
+    print(f"\n{'case':<20} {'p50 ms':>10} {'baseline':>10} {'change':>8}")
+    for name, result in results['cases'].items():
+        base = baseline['cases'].get(name)
+        if not base:
+            print(f"{name:<20} {result['p50_ms']:>10} {'-':>10} {'new':>8}")
+            continue
+        change = (result['p50_ms'] - base['p50_ms']) / base['p50_ms'] if base['p50_ms'] else 0.0
+        marker = ' ✗' if change > threshold else ''
+        print(f"{name:<20} {result['p50_ms']:>10} {base['p50_ms']:>10} {change:>+8.1%}{marker}")
+        if change > threshold:
+            regressions.append(name)
+    if baseline.get('settings') != results['settings']:
+        print("! Baseline was recorded with different seed settings; comparison is indicative only")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--schema', default='bench')
+    parser.add_argument('--bookings', type=int, default=100000)
+    parser.add_argument('--showtimes', type=int, default=200)
+    parser.add_argument('--otps', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reseed', action='store_true')
+    parser.add_argument('--force', action='store_true', help='reseed even if the schema holds non-benchmark tables')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--cases', help='comma-separated subset of cases to run')
+    parser.add_argument('--output', default='bench_database_results.json')
+    parser.add_argument('--baseline', default='bench_database_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p50 slowdown vs baseline (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    problem = check_schema_name(args.schema)
+    if problem:
+        parser.error(problem)
+    use_schema(args.schema)
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    stale = args.reseed or current_settings(conn) != seed_settings(args)
+    conn.close()
+    if stale:
+        seed(args.schema, args)
+
+    showtime_id = hot_showtime()
+    cases = build_cases(showtime_id, random.Random(args.seed))
+    if args.cases:
+        cases = {name: cases[name] for name in args.cases.split(',')}
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'settings': seed_settings(args),
+        'hot_showtime_id': showtime_id,
+        'cases': {},
+    }
+    for name, (setup, call) in cases.items():
+        results['cases'][name] = run_case(setup, call, args.iterations, args.warmup)
+        result = results['cases'][name]
+        print(f"{name:<20} p50 {result['p50_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms  "
+              f"{result['queries_per_call']:.1f} queries/call")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n✗ Regressions beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n✓ No regressions")
+
+if __name__ == "__main__":
+    main()
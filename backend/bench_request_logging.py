@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Measure the per-request cost of request logging on the request thread.
+Compares the old synchronous two-line logging of full headers with the
+queued, sampled, structured logging used by the log_requests middleware.
+
+Usage: python bench_request_logging.py [--requests 20000]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+import logger_config
+from request_logging import log_request, overhead_snapshot
+
+HEADERS = {
+    'host': 'localhost:8000',
+    'connection': 'keep-alive',
+    'sec-ch-ua': '"Google Chrome";v="141", "Not?A_Brand";v="8", "Chromium";v="141"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36',
+    'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'accept-encoding': 'gzip, deflate, br, zstd',
+    'accept-language': 'en-US,en;q=0.9',
+    'cookie': 'ajs_anonymous_id=dc0cfc41-286b-43bb-b63e-1e64b9bfdd2b',
+    'x-real-ip': '203.0.113.7',
+}
+
+def bench_legacy(requests, log_dir):
+    legacy = logging.getLogger("bench-legacy")
+    legacy.propagate = False
+    handler = RotatingFileHandler(os.path.join(log_dir, "legacy.log"), maxBytes=10 * 1024 * 1024, backupCount=5)
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s"
+    ))
+    legacy.addHandler(handler)
+    legacy.setLevel(logging.INFO)
+
+    url = "http://localhost:8000/api/showtime/1"
+    start = time.perf_counter()
+    for _ in range(requests):
+        legacy.info(f"Request: GET {url} - Headers: {dict(HEADERS)}")
+        legacy.info(f"Response: GET {url} - Status: 200 - Time: 0.012s")
+    elapsed = time.perf_counter() - start
+    handler.close()
+    return elapsed
+
+def bench_queued(requests, path):
+    start = time.perf_counter()
+    for _ in range(requests):
+        log_request("GET", path, path, "", 200, 12.0, "203.0.113.7", HEADERS)
+    return time.perf_counter() - start
+
+def report(label, requests, elapsed):
+    print(f"{label:<38} {elapsed / requests * 1e6:8.2f} us/request")
+
+def main():
+    parser = argparse.ArgumentParser(description="Request logging overhead benchmark")
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        # Send the queued path to a scratch file instead of the real log and console
+        scratch = RotatingFileHandler(os.path.join(log_dir, "queued.log"), maxBytes=10 * 1024 * 1024, backupCount=5)
+        scratch.setFormatter(logger_config.formatter)
+        logger_config.stop_log_listener()
+        logger_config.console_handler.setLevel(logging.CRITICAL)
+        logger_config.file_handler = scratch
+        logger_config.start_log_listener()
+        logger_config._listener.handlers = (scratch,)
+
+        print(f"{args.requests} requests per scenario")
+        print("=" * 60)
+        report("legacy: sync, 2 lines, all headers", args.requests, bench_legacy(args.requests, log_dir))
+        report("queued: sampled seat-map poll", args.requests, bench_queued(args.requests, "/api/showtime/1"))
+        report("queued: always-logged route", args.requests, bench_queued(args.requests, "/api/book"))
+
+        drain_start = time.perf_counter()
+        logger_config.stop_log_listener()
+        print(f"{'writer thread drain after run':<38} {(time.perf_counter() - drain_start) * 1000:8.1f} ms")
+        print(f"middleware overhead: {overhead_snapshot()}")
+        print(f"dropped records: {logger_config.DroppingQueueHandler.dropped}")
+
+if __name__ == "__main__":
+    main()
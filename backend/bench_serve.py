@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Throughput scaling of the production serve mode (run.py serve) per worker.
+
+For each worker count the API is started with `run.py serve --workers N` and
+the in-memory storage/email backends, then hammered for a fixed time by
+closed-loop clients fetching the showtime list and a seat map. The report
+shows requests/s, p50/p99 latency, the speedup over one worker and the
+scaling efficiency (speedup / workers).
+
+The load generator runs in its own processes (--clients) on the same
+machine; leave it enough cores that it is not the bottleneck.
+Runs against the Postgres configured in .env.
+Requires httpx (pip install httpx).
+
+Usage: python bench_serve.py [--workers 1,2,4] [--concurrency 64] [--duration 20]
+                             [--clients 2] [--json scaling.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from load_test import percentile, seed_showtime, spawn_server
+
+RUN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run.py')
+
+async def hammer(url, paths, concurrency, duration):
+    latencies, errors, shed = [], 0, 0
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(client, offset):
+        nonlocal errors, shed
+        i = offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if response.status_code == 503:
+                shed += 1
+            elif response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        await asyncio.gather(*(client_loop(client, n) for n in range(concurrency)))
+    return latencies, errors, shed
+
+def run_client(url, paths, concurrency, duration):
+    return asyncio.run(hammer(url, paths, concurrency, duration))
+
+def measure(url, paths, concurrency, duration, clients):
+    """Run the load from several processes and merge their results"""
+    per_client = max(1, concurrency // clients)
+    with ProcessPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(run_client, *zip(*[(url, paths, per_client, duration)] * clients)))
+    latencies = [value for result in results for value in result[0]]
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+        'errors': sum(result[1] for result in results),
+        'shed': sum(result[2] for result in results),
+    }
+
+def serve_command(port, workers, threadpool):
+    return [
+        sys.executable, RUN_SCRIPT, 'serve', '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers), '--threadpool', str(threadpool), '--log-level', 'warning',
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default=','.join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})),
+                        help='comma-separated worker counts')
+    parser.add_argument('--concurrency', type=int, default=64, help='concurrent connections in total')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds of load per worker count')
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--clients', type=int, default=2, help='load generator processes')
+    parser.add_argument('--threadpool', type=int, default=40)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--showtime-id', type=int, help='existing showtime (default: seed a fresh one)')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    if args.showtime_id is None:
+        args.showtime_id = seed_showtime(11, 8, 6)
+    paths = ['/api/showtimes', f'/api/showtime/{args.showtime_id}']
+    url = f"http://127.0.0.1:{args.port}"
+
+    results = []
+    for workers in (int(n) for n in args.workers.split(',')):
+        server = spawn_server(args.port, serve_command(args.port, workers, args.threadpool))
+        try:
+            measure(url, paths, args.concurrency, args.warmup, args.clients)
+            result = {'workers': workers, **measure(url, paths, args.concurrency, args.duration, args.clients)}
+        finally:
+            server.terminate()
+            server.wait()
+        results.append(result)
+        print(f"{workers:>3} workers: {result['rps']:>8} req/s  p50 {result['p50_ms']:>6}ms  "
+              f"p99 {result['p99_ms']:>7}ms  errors {result['errors']}  shed {result['shed']}")
+
+    baseline = results[0]['rps'] / results[0]['workers'] if results and results[0]['rps'] else None
+    print(f"\n{'workers':>7} {'req/s':>9} {'speedup':>8} {'efficiency':>10}")
+    for result in results:
+        if baseline:
+            result['speedup'] = round(result['rps'] / baseline, 2)
+            result['efficiency'] = round(result['speedup'] / result['workers'], 2)
+        print(f"{result['workers']:>7} {result['rps']:>9} {result.get('speedup', '-'):>8} {result.get('efficiency', '-'):>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'concurrency': args.concurrency,
+                       'duration': args.duration, 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
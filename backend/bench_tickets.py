@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for ticket PDF generation.
+Renders N tickets serially and through the ticket process pool.
+
+Usage: python bench_tickets.py [--count 1000] [--workers 4] [--seats 2] [--mode disk|memory]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ticket_jobs import render_ticket_bytes_job, render_ticket_job, ticket_booking_data
+
+THEATER_CONFIG = {
+    'movie': 'Avengers: Endgame',
+    'theater': 'PVR Cinemas Jakarta',
+    'show_date': '2025-01-01',
+    'showtime': '19:00:00',
+}
+
+def sample_booking(booking_id, seat_count):
+    return ticket_booking_data({
+        'id': booking_id,
+        'showtime_id': 1,
+        'customer_name': f'Customer {booking_id}',
+        'customer_email': f'customer{booking_id}@example.com',
+        'customer_phone': '081234567890',
+        'seats': [f"{chr(65 + i % 11)}{i // 11 + 3}" for i in range(seat_count)],
+        'total_amount': 200000 * seat_count,
+    })
+
+def job_args(mode, booking_id, seat_count, out_dir):
+    args = (sample_booking(booking_id, seat_count), THEATER_CONFIG)
+    if mode == 'disk':
+        return (render_ticket_job,) + args + (os.path.join(out_dir, f"ticket_{booking_id}.pdf"),)
+    return (render_ticket_bytes_job,) + args
+
+def run_serial(mode, count, seat_count, out_dir):
+    start = time.perf_counter()
+    for booking_id in range(1, count + 1):
+        job, *args = job_args(mode, booking_id, seat_count, out_dir)
+        job(*args)
+    return time.perf_counter() - start
+
+def run_pool(mode, count, seat_count, workers, out_dir):
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(*job_args(mode, booking_id, seat_count, out_dir))
+            for booking_id in range(1, count + 1)
+        ]
+        for future in futures:
+            future.result()
+    return time.perf_counter() - start
+
+def report(label, count, elapsed):
+    print(f"{label:<22} {count} tickets in {elapsed:6.2f}s  "
+          f"{count / elapsed:8.1f} tickets/s  {elapsed / count * 1000:6.1f} ms/ticket")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ticket PDF generation benchmark")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seats', type=int, default=2, help="seats (QR codes) per ticket")
+    parser.add_argument('--mode', choices=['disk', 'memory'], default='disk',
+                        help="write PDFs to disk or render into memory buffers")
+    parser.add_argument('--skip-serial', action='store_true')
+    args = parser.parse_args()
+
+    print(f"Rendering {args.count} tickets with {args.seats} seat(s) each ({args.mode})")
+    print("=" * 70)
+    with tempfile.TemporaryDirectory() as out_dir:
+        if not args.skip_serial:
+            report("serial", args.count, run_serial(args.mode, args.count, args.seats, out_dir))
+        report(f"pool ({args.workers} workers)", args.count,
+               run_pool(args.mode, args.count, args.seats, args.workers, out_dir))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Bulk export of bookings for accounting, as CSV, NDJSON or Parquet.
+
+Bookings (newest first, joined with their showtime, movie and theater) are
+read through a named server-side cursor and written out in chunks, so memory
+stays flat however many rows match. Also served by GET /api/admin/bookings/export.
+Parquet needs pyarrow (pip install pyarrow); each EXPORT_BATCH_SIZE rows
+become one row group.
+
+Usage: python booking_export.py [--format csv|ndjson|parquet] [--from 2026-01-01] [--to 2026-01-31]
+                                [--status approved,confirmed] [--output bookings.csv]
+Without --output the export is written to stdout.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import date
+
+from database import iter_bookings
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '5000'))
+# Bytes gathered before a chunk is handed to the response or file
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_COLUMNS = [
+    'id', 'created_at', 'updated_at', 'status',
+    'customer_name', 'customer_email', 'customer_phone',
+    'showtime_id', 'movie_title', 'theater_name', 'show_date', 'show_time',
+    'seats', 'seat_count', 'total_amount', 'payment_proof', 'admin_remarks',
+]
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def export_row(booking):
+    row = {column: booking.get(column) for column in EXPORT_COLUMNS}
+    row['seats'] = list(booking.get('seats') or [])
+    row['seat_count'] = len(row['seats'])
+    return row
+
+def _text(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+def _chunked(pieces):
+    """Join small byte strings into chunks of about EXPORT_CHUNK_SIZE"""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+def write_csv(rows):
+    def lines():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            row['seats'] = ' '.join(row['seats'])
+            writer.writerow([_text(row[column]) for column in EXPORT_COLUMNS])
+            yield out.getvalue().encode()
+            out.seek(0)
+            out.truncate()
+        yield out.getvalue().encode()
+    return _chunked(lines())
+
+def write_ndjson(rows):
+    return _chunked((json.dumps(row, default=_text) + '\n').encode() for row in rows)
+
+class _Sink:
+    """Write-only file object for pyarrow that hands written bytes back to the caller"""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+def write_parquet(rows, batch_size=EXPORT_BATCH_SIZE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()), ('created_at', pa.timestamp('us')), ('updated_at', pa.timestamp('us')),
+        ('status', pa.string()), ('customer_name', pa.string()), ('customer_email', pa.string()),
+        ('customer_phone', pa.string()), ('showtime_id', pa.int64()), ('movie_title', pa.string()),
+        ('theater_name', pa.string()), ('show_date', pa.date32()), ('show_time', pa.time64('us')),
+        ('seats', pa.list_(pa.string())), ('seat_count', pa.int32()), ('total_amount', pa.int64()),
+        ('payment_proof', pa.string()), ('admin_remarks', pa.string()),
+    ])
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+
+    def flush(batch):
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        return sink.drain()
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield flush(batch)
+            batch = []
+    if batch:
+        yield flush(batch)
+    writer.close()
+    yield sink.drain()
+
+WRITERS = {'csv': write_csv, 'ndjson': write_ndjson, 'parquet': write_parquet}
+
+def export_bookings(fmt, stats=None, **filters):
+    """Byte chunks of the export in fmt; filters as for iter_bookings (status may be a list).
+
+    stats, if given, is filled with rows and bytes once the export completes.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt} (use {', '.join(WRITERS)})")
+    if fmt == 'parquet' and not parquet_available():
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+    stats = stats if stats is not None else {}
+    stats.update(rows=0, bytes=0)
+
+    def rows():
+        for booking in iter_bookings(itersize=EXPORT_BATCH_SIZE, **filters):
+            stats['rows'] += 1
+            yield export_row(booking)
+
+    def chunks():
+        for chunk in WRITERS[fmt](rows()):
+            if chunk:
+                stats['bytes'] += len(chunk)
+                yield chunk
+
+    return chunks()
+
+def export_filename(fmt, date_from=None, date_to=None):
+    span = '-'.join(str(d) for d in (date_from, date_to) if d) or date.today().isoformat()
+    return f"bookings-{span}.{FORMATS[fmt][1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', choices=list(WRITERS), default='csv')
+    parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help='first booking date (inclusive)')
+    parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help='last booking date (inclusive)')
+    parser.add_argument('--status', help='comma-separated statuses')
+    parser.add_argument('--output', '-o', help='file to write (default: stdout)')
+    args = parser.parse_args()
+
+    statuses = [s.strip() for s in args.status.split(',') if s.strip()] if args.status else None
+    stats = {}
+    started = time.perf_counter()
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_bookings(args.format, stats, status=statuses,
+                                     date_from=args.date_from, date_to=args.date_to):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {stats['rows']} bookings ({stats['bytes'] / 1024:.0f} KiB) "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import metrics
+
+# Small in-process caches for data that is read on every seat-map request but
+# changes rarely. Each worker process has its own copy; writes in this process
+# invalidate it directly, other workers see the change within the TTL.
+
+_caches = {}
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire ttl seconds after being stored"""
+
+    def __init__(self, name, ttl, max_entries=1024):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        _caches[name] = self
+
+    def get(self, key):
+        """Cached value, or None when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            metrics.cache_requests_total.inc(self.name, 'hit')
+            return entry[1]
+        metrics.cache_requests_total.inc(self.name, 'miss')
+        return None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                self._evict()
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def get_or_load(self, key, loader):
+        """Cached value, else loader() stored for next time (None results are not cached)"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one entry, or all of them"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired or [min(self._entries, key=lambda key: self._entries[key][0])]:
+            del self._entries[key]
+
+def cache_sizes():
+    return {name: len(cache) for name, cache in _caches.items()}
+
+metrics.cache_entries.set_function(lambda: {(name,): size for name, size in cache_sizes().items()})
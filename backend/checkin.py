@@ -0,0 +1,191 @@
+import base64
+import hashlib
+import hmac
+import os
+import re
+import struct
+import threading
+import time
+from datetime import datetime
+
+from logger_config import logger
+
+# Gate check-in.
+#
+# Each seat gets a compact HMAC-signed token (printed as its QR code), so the
+# gate can verify a scan without reading bookings. A seat is admitted when its
+# row goes into the append-only checkins table: the unique (showtime_id,
+# seat_index) key decides, so every worker and instance agrees on who got in.
+# Seats this process has seen admitted are answered as duplicates without a
+# round trip. Tokens of bookings that are no longer approved/confirmed are
+# rejected from a per-showtime revoked set, refreshed from the database every
+# CHECKIN_REVOCATION_TTL seconds and updated at once on status changes here.
+
+CHECKIN_SECRET = os.getenv('CHECKIN_SECRET') or os.getenv('JWT_SECRET_KEY', 'your-super-secret-jwt-key-change-in-production')
+CHECKIN_REVOCATION_TTL = float(os.getenv('CHECKIN_REVOCATION_TTL', '10'))
+
+TOKEN_VERSION = 1
+TOKEN_MAC_BYTES = 10
+# version, showtime_id, booking_id, seat index
+_TOKEN_LAYOUT = struct.Struct('>BIIH')
+MAX_SEAT_COLS = 64
+SEATS_PER_SHOWTIME = 26 * MAX_SEAT_COLS
+_SEAT_PATTERN = re.compile(r'^([A-Z])(\d{1,2})$')
+
+def seat_index(seat):
+    """Map a seat label like 'C7' to a dense index for bitmaps and tokens"""
+    match = _SEAT_PATTERN.match(seat)
+    if not match or int(match.group(2)) >= MAX_SEAT_COLS:
+        raise ValueError(f"Unsupported seat label: {seat}")
+    return (ord(match.group(1)) - ord('A')) * MAX_SEAT_COLS + int(match.group(2))
+
+def check_layout(rows, left_cols, right_cols):
+    """Raise ValueError unless every seat of the layout can get a token (rows A-Z, columns below MAX_SEAT_COLS)"""
+    if not 1 <= rows <= 26:
+        raise ValueError("A theater can have 1 to 26 rows (A-Z)")
+    if left_cols < 0 or right_cols < 0 or not 1 <= left_cols + right_cols < MAX_SEAT_COLS:
+        raise ValueError(f"A theater can have 1 to {MAX_SEAT_COLS - 1} seats per row")
+
+def seat_label(index):
+    """Inverse of seat_index"""
+    return f"{chr(ord('A') + index // MAX_SEAT_COLS)}{index % MAX_SEAT_COLS}"
+
+def _mac(payload, secret=None):
+    key = (secret or CHECKIN_SECRET).encode()
+    return hmac.new(key, payload, hashlib.sha256).digest()[:TOKEN_MAC_BYTES]
+
+def sign_seat_token(showtime_id, booking_id, seat):
+    """Create the signed QR token for one seat (28 URL-safe characters)"""
+    payload = _TOKEN_LAYOUT.pack(TOKEN_VERSION, showtime_id, booking_id, seat_index(seat))
+    return base64.urlsafe_b64encode(payload + _mac(payload)).rstrip(b'=').decode()
+
+def verify_seat_token(token):
+    """Verify a seat token; returns its claims or None. No database access."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except (ValueError, TypeError):
+        return None
+    if len(raw) != _TOKEN_LAYOUT.size + TOKEN_MAC_BYTES:
+        return None
+
+    payload, mac = raw[:_TOKEN_LAYOUT.size], raw[_TOKEN_LAYOUT.size:]
+    if not hmac.compare_digest(mac, _mac(payload)):
+        return None
+    version, showtime_id, booking_id, index = _TOKEN_LAYOUT.unpack(payload)
+    if version != TOKEN_VERSION:
+        return None
+    return {
+        'showtime_id': showtime_id,
+        'booking_id': booking_id,
+        'seat_index': index,
+        'seat': seat_label(index),
+    }
+
+# Admission state
+_lock = threading.Lock()
+_admitted = {}
+_revoked = {}
+
+def _revoked_bookings(showtime_id):
+    """Booking ids of a showtime whose tokens no longer admit, at most CHECKIN_REVOCATION_TTL old"""
+    entry = _revoked.get(showtime_id)
+    if entry is None or time.monotonic() - entry[0] >= CHECKIN_REVOCATION_TTL:
+        from database import get_revoked_booking_ids
+
+        entry = (time.monotonic(), set(get_revoked_booking_ids(showtime_id)))
+        with _lock:
+            _revoked[showtime_id] = entry
+    return entry[1]
+
+def booking_status_changed(showtime_id, booking_id, status):
+    """Call after a booking's status changes, so its tokens stop (or start) admitting here at once"""
+    from ticket_jobs import TICKET_STATUSES
+
+    with _lock:
+        entry = _revoked.get(showtime_id)
+        if entry is None:
+            return
+        if status in TICKET_STATUSES:
+            entry[1].discard(booking_id)
+        else:
+            entry[1].add(booking_id)
+
+def check_in_many(scans, gate=None):
+    """Admit each (token, scanned_at) once; results in order.
+
+    Each result is {'status': 'admitted' | 'duplicate' | 'revoked' | 'invalid', ...claims}.
+    """
+    results = []
+    rows = {}
+    for token, scanned_at in scans:
+        claims = verify_seat_token(token)
+        if claims is None:
+            results.append({'status': 'invalid'})
+            continue
+        showtime_id, index = claims['showtime_id'], claims['seat_index']
+        if claims['booking_id'] in _revoked_bookings(showtime_id):
+            results.append({'status': 'revoked', **claims})
+            continue
+        if index in _admitted.get(showtime_id, ()) or (showtime_id, index) in rows:
+            results.append({'status': 'duplicate', **claims})
+            continue
+        rows[(showtime_id, index)] = (
+            showtime_id, claims['booking_id'], index, claims['seat'], gate, scanned_at or datetime.now()
+        )
+        results.append({'status': None, **claims})
+
+    if rows:
+        from database import insert_checkins
+
+        inserted = set(insert_checkins(list(rows.values())))
+        with _lock:
+            for showtime_id, index in rows:
+                _admitted.setdefault(showtime_id, set()).add(index)
+        for result in results:
+            if result['status'] is None:
+                key = (result['showtime_id'], result['seat_index'])
+                result['status'] = 'admitted' if key in inserted else 'duplicate'
+    return results
+
+def check_in(token, gate=None, scanned_at=None):
+    """Admit the seat behind token once (see check_in_many)"""
+    return check_in_many([(token, scanned_at)], gate)[0]
+
+# Offline scanner manifest
+#
+# Layout (big-endian): header, count sorted 8-byte token digests, then a
+# 32-byte HMAC-SHA256 over everything before it. The HMAC key is derived per
+# showtime (scanner_key) so a scanner can check the manifest without being
+# able to mint seat tokens. Scanners admit a scanned token when its digest is
+# in the list (binary search) and upload the scans later to /api/checkin/batch.
+MANIFEST_MAGIC = b'BMSM'
+MANIFEST_FORMAT_VERSION = 1
+MANIFEST_DIGEST_BYTES = 8
+# magic, format version, showtime_id, content version (ms), generated at (s), count
+_MANIFEST_HEADER = struct.Struct('>4sBIQII')
+
+def token_digest(token):
+    """Short digest of a seat token as listed in scanner manifests"""
+    return hashlib.sha256(token.encode()).digest()[:MANIFEST_DIGEST_BYTES]
+
+def scanner_key(showtime_id):
+    """Per-showtime key that scanners use to verify their manifest"""
+    return hmac.new(CHECKIN_SECRET.encode(), f"scanner-manifest:{showtime_id}".encode(), hashlib.sha256).digest()
+
+def build_scanner_manifest(showtime_id, bookings, content_version):
+    """Build the signed manifest from (booking_id, seats) rows of ticketed bookings.
+
+    content_version must grow with every change to the showtime's bookings,
+    including cancellations that remove seats (see get_showtime_bookings_version).
+    """
+    digests = []
+    for booking_id, seats, _ in bookings:
+        digests.extend(token_digest(sign_seat_token(showtime_id, booking_id, seat)) for seat in seats)
+    digests.sort()
+
+    header = _MANIFEST_HEADER.pack(
+        MANIFEST_MAGIC, MANIFEST_FORMAT_VERSION, showtime_id, content_version,
+        int(datetime.now().timestamp()), len(digests)
+    )
+    body = header + b''.join(digests)
+    return body + hmac.new(scanner_key(showtime_id), body, hashlib.sha256).digest()
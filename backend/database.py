@@ -1,8 +1,16 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+import base64
+import contextvars
+import itertools
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+import metrics
+import query_tracer
+import slow_queries
 
 load_dotenv()
 
@@ -12,12 +20,313 @@ DB_CONFIG = {
     'port': os.getenv('DB_PORT', '5432'),
     'database': os.getenv('DB_NAME'),
     'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD')
+    'password': os.getenv('DB_PASSWORD'),
+    'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
 }
 
-def get_db_connection():
-    """Get database connection"""
-    return psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)
+# Read replicas (DB_REPLICA_HOSTS="replica1,replica2:5433"), reached with the
+# primary's database and credentials. Only reads that tolerate a little
+# staleness ask for them, with get_db_connection(readonly=True).
+DB_REPLICA_CONFIGS = [
+    {**DB_CONFIG, 'host': host.partition(':')[0], 'port': host.partition(':')[2] or DB_CONFIG['port']}
+    for host in (h.strip() for h in os.getenv('DB_REPLICA_HOSTS', '').split(','))
+    if host
+]
+# Replicas further behind than this are skipped, and their lag is measured at
+# most every DB_REPLICA_LAG_CHECK seconds
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '5'))
+DB_REPLICA_LAG_CHECK = float(os.getenv('DB_REPLICA_LAG_CHECK', '2'))
+# An unreachable replica is retried after this long rather than at every check,
+# since each attempt can take up to connect_timeout on a request thread
+DB_REPLICA_RETRY = float(os.getenv('DB_REPLICA_RETRY', '30'))
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that reports every statement to metrics and the request's query trace"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._record(query, vars, time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            first = vars_list[0] if isinstance(vars_list, (list, tuple)) and vars_list else None
+            self._record(query, first, time.perf_counter() - started)
+
+    def _record(self, query, vars, seconds):
+        metrics.record_query(seconds, self.connection.target.name)
+        query_tracer.record(query, seconds, self.rowcount)
+        slow_queries.report(query, vars, seconds)
+
+# Idle connections kept per process for reuse (0 disables pooling), and how
+# long one may sit idle before it is closed instead of reused
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', '300'))
+# Idle longer than this, a connection is pinged before reuse: the server or a
+# proxy may have dropped it meanwhile (restart, failover, idle timeout)
+DB_POOL_CHECK_AFTER = float(os.getenv('DB_POOL_CHECK_AFTER', '5'))
+# Connections a process may have open per database (0 = no limit); run.py serve
+# sets it to each worker's share of DB_MAX_CONNECTIONS. Beyond it callers wait
+# up to DB_POOL_WAIT seconds for one to be closed.
+DB_POOL_MAX_OPEN = int(os.getenv('DB_POOL_MAX_OPEN', os.getenv('DB_MAX_CONNECTIONS', '0')))
+DB_POOL_WAIT = float(os.getenv('DB_POOL_WAIT', '5'))
+
+class ConnectionPool:
+    """Idle connections for reuse by get_db_connection().
+
+    Without an idle connection a new one is opened, waiting while max_open
+    are already open; connections beyond max_idle are closed when released.
+    Session state outlives a release, so use SET LOCAL rather than SET.
+    """
+
+    def __init__(self, max_idle=DB_POOL_SIZE, max_idle_seconds=DB_POOL_MAX_IDLE, max_open=DB_POOL_MAX_OPEN,
+                 check_after=DB_POOL_CHECK_AFTER):
+        self.max_idle = max_idle
+        self.max_idle_seconds = max_idle_seconds
+        self.check_after = check_after
+        self.max_open = max_open
+        self._idle = []
+        self._inherited = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_open) if max_open > 0 else None
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            # The parent's sockets: closing them here would terminate its sessions
+            self._inherited, self._idle = self._idle, []
+            self._pid = os.getpid()
+            if self._slots is not None:
+                self._slots = threading.BoundedSemaphore(self.max_open)
+
+    def acquire(self):
+        """An idle connection, or None"""
+        while True:
+            with self._lock:
+                self._check_fork()
+                if not self._idle:
+                    return None
+                conn, released_at = self._idle.pop()
+                conn.in_pool = False
+            idle_for = time.monotonic() - released_at
+            if conn.closed or idle_for > self.max_idle_seconds:
+                conn.discard()
+                continue
+            if idle_for > self.check_after and not self._alive(conn):
+                metrics.db_pool_dead_total.inc()
+                conn.discard()
+                continue
+            return conn
+
+    @staticmethod
+    def _alive(conn):
+        # A plain cursor, so the ping stays out of query metrics and traces
+        try:
+            cursor = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def release(self, conn):
+        """Keep a connection for reuse; False if it should be closed instead"""
+        if conn.in_pool:
+            # Closed twice: it is already idle
+            return True
+        if conn.closed or self.max_idle <= 0:
+            return False
+        status = conn.info.transaction_status
+        if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        with self._lock:
+            self._check_fork()
+            if len(self._idle) >= self.max_idle:
+                return False
+            conn.in_pool = True
+            self._idle.append((conn, time.monotonic()))
+        return True
+
+    def reserve(self, timeout=DB_POOL_WAIT):
+        """Take one of max_open slots for a new connection; False if none frees up in time"""
+        with self._lock:
+            self._check_fork()
+            slots = self._slots
+        return slots is None or slots.acquire(timeout=timeout)
+
+    def unreserve(self):
+        if self._slots is not None:
+            self._slots.release()
+
+    def idle(self):
+        return len(self._idle)
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection that goes back to its target's pool on close() and keeps the open-connections gauge accurate"""
+
+    in_pool = False
+    target = None
+    # Process holding a ConnectionPool slot for this connection
+    reserved_by = None
+
+    def close(self):
+        if not self.target.pool.release(self):
+            self.discard()
+
+    def discard(self):
+        """Really close the connection"""
+        if not self.closed:
+            metrics.db_connections_open.dec()
+        super().close()
+        if self.reserved_by == os.getpid():
+            self.reserved_by = None
+            self.target.pool.unreserve()
+
+class DatabaseTarget:
+    """The primary or a replica: its connection settings, pool and last measured replication lag"""
+
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.pool = ConnectionPool()
+        self.lag = None
+        self.error = None
+        self.next_check = None
+        self._checking = threading.Lock()
+
+    def connect(self):
+        conn = self.pool.acquire()
+        if conn is not None:
+            metrics.db_pool_reused.inc()
+            return conn
+        if not self.pool.reserve():
+            metrics.db_pool_timeouts_total.inc(self.name)
+            raise psycopg2.OperationalError(
+                f"No {self.name} database connection free: {self.pool.max_open} open in this process for {DB_POOL_WAIT}s"
+            )
+        started = time.perf_counter()
+        try:
+            conn = psycopg2.connect(**self.config, connection_factory=InstrumentedConnection, cursor_factory=InstrumentedCursor)
+        except BaseException:
+            self.pool.unreserve()
+            raise
+        conn.target = self
+        conn.reserved_by = os.getpid()
+        metrics.db_connect_duration.observe(time.perf_counter() - started, self.name)
+        metrics.db_connections_opened.inc()
+        metrics.db_connections_open.inc()
+        return conn
+
+    def usable(self):
+        """Whether reads may go here; re-measures the lag when it is stale (one caller at a time)"""
+        if self.next_check is None or time.monotonic() >= self.next_check:
+            if self._checking.acquire(blocking=self.next_check is None):
+                try:
+                    self.check_lag()
+                finally:
+                    self._checking.release()
+        return self.lag is not None and self.lag <= DB_REPLICA_MAX_LAG
+
+    def check_lag(self):
+        try:
+            conn = self.connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SET LOCAL statement_timeout = 1000")
+                cursor.execute("""
+                    SELECT CASE
+                        WHEN NOT pg_is_in_recovery() THEN 0
+                        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                    END AS lag
+                """)
+                lag = cursor.fetchone()['lag']
+                cursor.close()
+                conn.commit()
+            finally:
+                conn.close()
+            self.lag, self.error = (float(lag) if lag is not None else None), None
+            self.next_check = time.monotonic() + DB_REPLICA_LAG_CHECK
+        except psycopg2.Error as e:
+            self.mark_down(e)
+
+    def mark_down(self, error):
+        self.lag, self.error = None, str(error).strip()
+        self.next_check = time.monotonic() + DB_REPLICA_RETRY
+
+    def snapshot(self):
+        return {"lag_seconds": self.lag, "usable": self.lag is not None and self.lag <= DB_REPLICA_MAX_LAG,
+                "error": self.error}
+
+primary = DatabaseTarget('primary', DB_CONFIG)
+replicas = [DatabaseTarget(f'replica{n}', config) for n, config in enumerate(DB_REPLICA_CONFIGS, 1)]
+_targets = [primary, *replicas]
+_next_replica = itertools.count()
+metrics.db_pool_idle.set_function(lambda: {(target.name,): target.pool.idle() for target in _targets})
+metrics.db_replica_lag.set_function(lambda: {(r.name,): r.lag for r in replicas if r.lag is not None})
+
+# Read-your-writes: set per request for clients that wrote recently, so their
+# readonly queries see their own bookings instead of a lagging replica
+_read_primary = contextvars.ContextVar('read_primary', default=False)
+
+def read_from_primary(enabled=True):
+    """Send this context's readonly queries to the primary as well"""
+    return _read_primary.set(enabled)
+
+def route_read():
+    """Target for a readonly query: a replica within DB_REPLICA_MAX_LAG, else the primary"""
+    if not replicas:
+        return primary
+    if _read_primary.get():
+        metrics.db_read_routes_total.inc(primary.name, 'read_your_writes')
+        return primary
+    start = next(_next_replica)
+    for i in range(len(replicas)):
+        replica = replicas[(start + i) % len(replicas)]
+        if replica.usable():
+            metrics.db_read_routes_total.inc(replica.name, 'replica')
+            return replica
+    metrics.db_read_routes_total.inc(primary.name, 'lagging')
+    return primary
+
+def replicas_snapshot():
+    return {replica.name: replica.snapshot() for replica in replicas}
+
+def get_db_connection(readonly=False):
+    """Get database connection (from the pool when one is idle); close() returns it.
+
+    readonly=True allows a replica: only for queries that write nothing and can
+    be a few seconds stale. An unreachable replica falls back to the primary.
+    """
+    target = route_read() if readonly else primary
+    if target is primary:
+        return primary.connect()
+    try:
+        return target.connect()
+    except psycopg2.OperationalError as e:
+        target.mark_down(e)
+        metrics.db_read_routes_total.inc(primary.name, 'unavailable')
+        return primary.connect()
+
+def fill_pool(size=DB_POOL_SIZE):
+    """Open primary connections up to the pool size ahead of traffic; returns how many are idle"""
+    if primary.pool.max_open > 0:
+        size = min(size, primary.pool.max_open)
+    connections = [get_db_connection() for _ in range(max(0, size - primary.pool.idle()))]
+    for conn in connections:
+        conn.close()
+    return primary.pool.idle()
 
 # Booking operations
 def create_booking(showtime_id, customer_name, customer_email, customer_phone, seats, total_amount):
@@ -40,7 +349,7 @@ def create_booking(showtime_id, customer_name, customer_email, customer_phone, s
 
 def get_all_bookings():
     """Get all bookings from database"""
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM bookings ORDER BY created_at DESC")
@@ -51,6 +360,93 @@ def get_all_bookings():
     
     return [dict(booking) for booking in bookings]
 
+# Admin bookings listing: newest first, paged by keyset on (created_at, id) so
+# a page costs the same however deep it is. Served by the composite indexes
+# from migrate_booking_listing_indexes.py.
+BOOKING_LISTING_COLUMNS = """
+    b.*, s.show_date, s.show_time, m.title as movie_title, t.name as theater_name
+    FROM bookings b
+    LEFT JOIN showtimes s ON b.showtime_id = s.id
+    LEFT JOIN movies m ON s.movie_id = m.id
+    LEFT JOIN theaters t ON s.theater_id = t.id
+"""
+
+def encode_booking_cursor(booking):
+    """Opaque page cursor pointing after this booking"""
+    raw = f"{booking['created_at'].isoformat()}|{booking['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_booking_cursor(cursor):
+    """(created_at, id) from encode_booking_cursor(); ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, _, booking_id = raw.partition('|')
+        return datetime.fromisoformat(created_at), int(booking_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _booking_filters(status=None, showtime_id=None, date_from=None, date_to=None, after=None):
+    """WHERE clause and parameters for the bookings listing (dates are booking dates, inclusive)"""
+    conditions, params = [], []
+    if isinstance(status, (list, tuple)):
+        conditions.append("b.status = ANY(%s)")
+        params.append(list(status))
+    elif status:
+        conditions.append("b.status = %s")
+        params.append(status)
+    if showtime_id is not None:
+        conditions.append("b.showtime_id = %s")
+        params.append(showtime_id)
+    if date_from:
+        conditions.append("b.created_at >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("b.created_at < %s")
+        params.append(date_to + timedelta(days=1))
+    if after:
+        conditions.append("(b.created_at, b.id) < (%s, %s)")
+        params.extend(after)
+    return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+def get_bookings_page(limit=100, page_cursor=None, **filters):
+    """(bookings, next_cursor) for one page of the listing; next_cursor is None on the last page"""
+    where, params = _booking_filters(after=decode_booking_cursor(page_cursor) if page_cursor else None, **filters)
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {BOOKING_LISTING_COLUMNS}
+        {where}
+        ORDER BY b.created_at DESC, b.id DESC
+        LIMIT %s
+    """, (*params, limit + 1))
+    bookings = [dict(booking) for booking in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+
+    if len(bookings) <= limit:
+        return bookings, None
+    bookings = bookings[:limit]
+    return bookings, encode_booking_cursor(bookings[-1])
+
+def iter_bookings(itersize=1000, **filters):
+    """Stream the whole listing through a server-side cursor, holding itersize rows at a time"""
+    where, params = _booking_filters(**filters)
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor(name="bookings_listing")
+    cursor.itersize = itersize
+
+    try:
+        cursor.execute(f"""
+            SELECT {BOOKING_LISTING_COLUMNS}
+            {where}
+            ORDER BY b.created_at DESC, b.id DESC
+        """, params)
+        for row in cursor:
+            yield row
+    finally:
+        cursor.close()
+        conn.close()
+
 def get_booking_by_id(booking_id):
     """Get booking by ID"""
     conn = get_db_connection()
@@ -89,16 +485,16 @@ def update_booking_status(booking_id, status, admin_remarks=None):
     
     return dict(booking) if booking else None
 
-def update_booking_payment_proof(booking_id, file_path):
-    """Update booking with payment proof"""
+def update_booking_payment_proof(booking_id, file_path, proof_hash=None):
+    """Update booking with payment proof and its content hash"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
-        UPDATE bookings SET payment_proof = %s, status = %s, updated_at = CURRENT_TIMESTAMP 
+        UPDATE bookings SET payment_proof = %s, payment_proof_hash = %s, status = %s, updated_at = CURRENT_TIMESTAMP 
         WHERE id = %s
         RETURNING *
-    """, (file_path, 'pending_verification', booking_id))
+    """, (file_path, proof_hash, 'pending_verification', booking_id))
     
     booking = cursor.fetchone()
     conn.commit()
@@ -107,6 +503,24 @@ def update_booking_payment_proof(booking_id, file_path):
     
     return dict(booking) if booking else None
 
+def get_bookings_by_proof_hash(proof_hash, exclude_booking_id=None):
+    """Get other bookings that uploaded the same payment proof bytes"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT id, showtime_id, customer_name, customer_email, customer_phone, seats, total_amount, status, created_at
+        FROM bookings
+        WHERE payment_proof_hash = %s AND id <> %s
+        ORDER BY created_at DESC
+    """, (proof_hash, exclude_booking_id or 0))
+    bookings = cursor.fetchall()
+    
+    cursor.close()
+    conn.close()
+    
+    return [dict(booking) for booking in bookings]
+
 def get_booked_seats(showtime_id):
     """Get all booked seats for a specific showtime"""
     conn = get_db_connection()
@@ -288,22 +702,279 @@ def check_seat_availability(showtime_id, seats, user_id):
     
     return reserved_by_others
 
-# Analytics
+# Check-in log
+def insert_checkins(rows):
+    """Record (showtime_id, booking_id, seat_index, seat_id, gate, scanned_at) check-ins.
+
+    Returns the (showtime_id, seat_index) pairs actually inserted; seats already
+    checked in are skipped, so only those were admitted.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    inserted = execute_values(cursor, """
+        INSERT INTO checkins (showtime_id, booking_id, seat_index, seat_id, gate, scanned_at)
+        VALUES %s
+        ON CONFLICT (showtime_id, seat_index) DO NOTHING
+        RETURNING showtime_id, seat_index
+    """, rows, fetch=True)
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    return [(row['showtime_id'], row['seat_index']) for row in inserted]
+
+def get_revoked_booking_ids(showtime_id):
+    """Bookings of a showtime whose seat tokens must not admit (any status but approved/confirmed)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT id FROM bookings
+        WHERE showtime_id = %s AND status NOT IN ('approved', 'confirmed')
+    """, (showtime_id,))
+    results = cursor.fetchall()
+    
+    cursor.close()
+    conn.close()
+    
+    return [result['id'] for result in results]
+
+def get_showtime_bookings_version(showtime_id):
+    """Latest change to any booking of a showtime, in ms: grows on every status change, revocations included"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT MAX(GREATEST(created_at, updated_at)) as changed_at
+        FROM bookings WHERE showtime_id = %s
+    """, (showtime_id,))
+    changed_at = cursor.fetchone()['changed_at']
+    
+    cursor.close()
+    conn.close()
+    
+    return int(changed_at.timestamp() * 1000) if changed_at else 0
+
+def iter_showtime_ticket_seats(showtime_id, itersize=2000):
+    """Stream (booking_id, seats, updated_at) of ticketed bookings through a server-side cursor"""
+    conn = get_db_connection()
+    cursor = conn.cursor(name=f"ticket_seats_{showtime_id}")
+    cursor.itersize = itersize
+    
+    try:
+        cursor.execute("""
+            SELECT id, seats, updated_at FROM bookings
+            WHERE showtime_id = %s AND status IN ('approved', 'confirmed')
+        """, (showtime_id,))
+        for row in cursor:
+            yield row['id'], row['seats'], row['updated_at']
+    finally:
+        cursor.close()
+        conn.close()
+
+SLOW_QUERY_ORDERS = {
+    'total': 'total_ms DESC',
+    'max': 'max_ms DESC',
+    'calls': 'calls DESC',
+    'recent': 'last_seen_at DESC',
+}
+
+def get_slow_queries(order='total', limit=50, with_plans=False):
+    """Get aggregated slow statements, worst first"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    plan_column = ", plan" if with_plans else ""
+    cursor.execute(f"""
+        SELECT fingerprint, query, calls, total_ms, max_ms, last_ms, total_ms / NULLIF(calls, 0) AS avg_ms,
+               param_shape, plan_kind, plan_captured_at, first_seen_at, last_seen_at{plan_column}
+        FROM slow_queries
+        ORDER BY {SLOW_QUERY_ORDERS[order]}
+        LIMIT %s
+    """, (limit,))
+    results = cursor.fetchall()
+    
+    cursor.close()
+    conn.close()
+    
+    return results
+
+def get_slow_query(fingerprint):
+    """Get one slow statement including its captured plan"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT * FROM slow_queries WHERE fingerprint = %s", (fingerprint,))
+    result = cursor.fetchone()
+    
+    cursor.close()
+    conn.close()
+    
+    return result
+
+# Email outbox
+EMAIL_RETRY_BASE_SECONDS = 30
+EMAIL_RETRY_MAX_SECONDS = 3600
+# Attempts after which a message is given up on (dead) and no longer retried
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', '10'))
+
+def enqueue_email(to_email, subject, html, text_body, cc_email=None, error=None):
+    """Queue a message the email backend could not take right now"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        INSERT INTO email_outbox (to_email, cc_email, subject, html, text_body, attempts, last_error)
+        VALUES (%s, %s, %s, %s, %s, 1, %s)
+        RETURNING id
+    """, (to_email, cc_email, subject, html, text_body, error))
+    
+    email_id = cursor.fetchone()['id']
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    return email_id
+
+def claim_due_emails(limit=20, lease_seconds=120):
+    """Claim queued emails that are due, pushing their next attempt past the lease
+    so another worker does not pick them up while they are being sent"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        UPDATE email_outbox SET next_attempt_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+        WHERE id IN (
+            SELECT id FROM email_outbox
+            WHERE sent_at IS NULL AND dead_at IS NULL AND next_attempt_at <= CURRENT_TIMESTAMP
+            ORDER BY next_attempt_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+    """, (lease_seconds, limit))
+    
+    emails = cursor.fetchall()
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    return emails
+
+def mark_email_sent(email_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("UPDATE email_outbox SET sent_at = CURRENT_TIMESTAMP WHERE id = %s", (email_id,))
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def mark_email_failed(email_id, error, max_attempts=EMAIL_MAX_ATTEMPTS):
+    """Record a failed attempt and back off exponentially; once max_attempts
+    is reached the message is marked dead. Returns True if it is now dead"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        UPDATE email_outbox
+        SET attempts = attempts + 1, last_error = %s,
+            next_attempt_at = CURRENT_TIMESTAMP + LEAST(%s * POWER(2, attempts), %s) * INTERVAL '1 second',
+            dead_at = CASE WHEN attempts + 1 >= %s THEN CURRENT_TIMESTAMP END
+        WHERE id = %s
+        RETURNING dead_at
+    """, (error, EMAIL_RETRY_BASE_SECONDS, EMAIL_RETRY_MAX_SECONDS, max_attempts, email_id))
+    
+    row = cursor.fetchone()
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    return row is not None and row['dead_at'] is not None
+
+def get_email_outbox_stats():
+    """Backlog of emails still being retried, the age of the oldest one, and
+    the number given up on (dead)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT COUNT(*) FILTER (WHERE dead_at IS NULL) AS pending,
+               EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - MIN(created_at) FILTER (WHERE dead_at IS NULL)) AS oldest_age_s,
+               MAX(attempts) FILTER (WHERE dead_at IS NULL) AS max_attempts,
+               COUNT(*) FILTER (WHERE dead_at IS NOT NULL) AS dead
+        FROM email_outbox
+        WHERE sent_at IS NULL
+    """)
+    stats = dict(cursor.fetchone())
+    
+    cursor.close()
+    conn.close()
+    
+    return stats
+
+def get_payment_proofs_under(prefix):
+    """Distinct payment proof locations starting with prefix (e.g. the local fallback)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT DISTINCT payment_proof FROM bookings
+        WHERE LEFT(payment_proof, %s) = %s
+    """, (len(prefix), prefix))
+    locations = [row['payment_proof'] for row in cursor.fetchall()]
+    
+    cursor.close()
+    conn.close()
+    
+    return locations
+
+def move_payment_proof(old_location, new_location):
+    """Point every booking that references a proof location at its new location"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        UPDATE bookings SET payment_proof = %s
+        WHERE payment_proof = %s
+    """, (new_location, old_location))
+    
+    moved = cursor.rowcount
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    return moved
+
+# Analytics: read from analytics_counters, which the bookings triggers keep in
+# step with every insert and status change, so dashboards cost O(showtimes)
+# rather than a scan of all bookings
+ANALYTICS_COUNTERS_REBUILD_SQL = """
+    DELETE FROM analytics_counters;
+    INSERT INTO analytics_counters (showtime_id, status, bookings, seats, revenue)
+    SELECT COALESCE(showtime_id, 0), status, COUNT(*),
+           COALESCE(SUM(array_length(seats, 1)), 0), COALESCE(SUM(total_amount), 0)
+    FROM bookings
+    GROUP BY 1, 2;
+"""
+
 def get_analytics():
     """Get booking analytics based on seats"""
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor()
     
     cursor.execute("""
         SELECT 
-            SUM(array_length(seats, 1)) as total_seats_booked,
-            SUM(CASE WHEN status IN ('confirmed', 'approved') THEN total_amount ELSE 0 END) as total_revenue,
-            SUM(CASE WHEN status IN ('confirmed', 'approved') THEN array_length(seats, 1) ELSE 0 END) as confirmed_seats,
-            SUM(CASE WHEN status = 'pending_payment' THEN array_length(seats, 1) ELSE 0 END) as pending_payment_seats,
-            SUM(CASE WHEN status = 'pending_verification' THEN array_length(seats, 1) ELSE 0 END) as pending_verification_seats,
-            SUM(CASE WHEN status = 'pending_approval' THEN array_length(seats, 1) ELSE 0 END) as pending_approval_seats
-        FROM bookings
-        WHERE status NOT IN ('cancelled', 'admin_rejected')
+            SUM(seats) FILTER (WHERE status NOT IN ('cancelled', 'admin_rejected'))::bigint as total_seats_booked,
+            SUM(revenue) FILTER (WHERE status IN ('confirmed', 'approved'))::bigint as total_revenue,
+            SUM(seats) FILTER (WHERE status IN ('confirmed', 'approved'))::bigint as confirmed_seats,
+            SUM(seats) FILTER (WHERE status = 'pending_payment')::bigint as pending_payment_seats,
+            SUM(seats) FILTER (WHERE status = 'pending_verification')::bigint as pending_verification_seats,
+            SUM(seats) FILTER (WHERE status = 'pending_approval')::bigint as pending_approval_seats
+        FROM analytics_counters
     """)
     
     result = cursor.fetchone()
@@ -319,10 +990,69 @@ def get_analytics():
         'pending_approval': result['pending_approval_seats'] or 0
     }
 
+def get_booking_status_counts():
+    """Number of bookings per status (statuses with none are left out)"""
+    conn = get_db_connection(readonly=True)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT status, SUM(bookings)::bigint as count
+        FROM analytics_counters
+        GROUP BY status
+        HAVING SUM(bookings) > 0
+    """)
+    stats = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return {stat['status']: stat['count'] for stat in stats}
+
+def rebuild_analytics_counters():
+    """Recompute analytics_counters from bookings; returns the number of counter rows.
+
+    Holds a SHARE lock on bookings meanwhile, so booking writes wait for it.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("LOCK TABLE bookings IN SHARE MODE")
+        cursor.execute(ANALYTICS_COUNTERS_REBUILD_SQL)
+        cursor.execute("SELECT COUNT(*) as count FROM analytics_counters")
+        count = cursor.fetchone()['count']
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    return count
+
+def get_analytics_counter_drift():
+    """Counter rows that disagree with the bookings table, with expected and counted totals"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        WITH actual AS (
+            SELECT COALESCE(showtime_id, 0) as showtime_id, status, COUNT(*) as bookings,
+                   COALESCE(SUM(array_length(seats, 1)), 0) as seats, COALESCE(SUM(total_amount), 0) as revenue
+            FROM bookings
+            GROUP BY 1, 2
+        )
+        SELECT COALESCE(a.showtime_id, c.showtime_id) as showtime_id, COALESCE(a.status, c.status) as status,
+               COALESCE(a.bookings, 0) as expected_bookings, COALESCE(c.bookings, 0) as counted_bookings,
+               COALESCE(a.seats, 0) as expected_seats, COALESCE(c.seats, 0) as counted_seats,
+               COALESCE(a.revenue, 0) as expected_revenue, COALESCE(c.revenue, 0) as counted_revenue
+        FROM actual a
+        FULL OUTER JOIN analytics_counters c ON c.showtime_id = a.showtime_id AND c.status = a.status
+        WHERE (COALESCE(a.bookings, 0), COALESCE(a.seats, 0), COALESCE(a.revenue, 0))
+              IS DISTINCT FROM (COALESCE(c.bookings, 0), COALESCE(c.seats, 0), COALESCE(c.revenue, 0))
+        ORDER BY 1, 2
+    """)
+    drift = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return [dict(row) for row in drift]
+
 # Theater configuration
 # Movies management
 def get_all_movies():
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM movies WHERE is_active = TRUE ORDER BY title")
     movies = cursor.fetchall()
@@ -345,7 +1075,7 @@ def create_movie(title, poster_url, duration_minutes, genre, rating, description
 
 # Theaters management
 def get_all_theaters():
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM theaters WHERE is_active = TRUE ORDER BY name")
     theaters = cursor.fetchall()
@@ -368,7 +1098,7 @@ def create_theater(name, address, rows, left_cols, right_cols, non_selectable_se
 
 # Showtimes management
 def get_all_showtimes():
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor()
     cursor.execute("""
         SELECT s.*, m.title as movie_title, m.poster_url, t.name as theater_name, t.address
@@ -412,6 +1142,26 @@ def get_showtime_by_id(showtime_id):
     conn.close()
     return dict(showtime) if showtime else None
 
+def get_upcoming_showtimes(days):
+    """Active showtimes that have not started yet and start within the next days, with their layout columns"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT s.*, m.title as movie_title, m.poster_url,
+               t.name as theater_name, t.address, t.rows, t.left_cols, t.right_cols, t.non_selectable_seats
+        FROM showtimes s
+        JOIN movies m ON s.movie_id = m.id
+        JOIN theaters t ON s.theater_id = t.id
+        WHERE s.is_active = TRUE
+          AND s.show_date BETWEEN CURRENT_DATE AND CURRENT_DATE + %s
+          AND s.show_date + s.show_time >= LOCALTIMESTAMP
+        ORDER BY s.show_date, s.show_time
+    """, (days,))
+    showtimes = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return [dict(showtime) for showtime in showtimes]
+
 def get_admin_settings():
     """Get admin settings"""
     conn = get_db_connection()
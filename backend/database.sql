@@ -50,6 +50,7 @@ CREATE TABLE IF NOT EXISTS bookings (
     total_amount INTEGER NOT NULL,
     status VARCHAR(50) NOT NULL DEFAULT 'pending_payment',
     payment_proof VARCHAR(500),
+    payment_proof_hash VARCHAR(64),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -84,6 +85,63 @@ CREATE TABLE IF NOT EXISTS admin_settings (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- 8. Check-ins table (append-only gate scan log)
+CREATE TABLE IF NOT EXISTS checkins (
+    id BIGSERIAL PRIMARY KEY,
+    showtime_id INTEGER NOT NULL,
+    booking_id INTEGER NOT NULL,
+    seat_index INTEGER NOT NULL,
+    seat_id VARCHAR(10) NOT NULL,
+    gate VARCHAR(50),
+    scanned_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (showtime_id, seat_index)
+);
+
+-- 9. Slow queries table (aggregated by normalized statement, with last captured plan)
+CREATE TABLE IF NOT EXISTS slow_queries (
+    fingerprint VARCHAR(32) PRIMARY KEY,
+    query TEXT NOT NULL,
+    calls BIGINT NOT NULL DEFAULT 0,
+    total_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+    last_ms DOUBLE PRECISION,
+    param_shape JSONB,
+    plan_kind VARCHAR(10),
+    plan JSONB,
+    plan_captured_at TIMESTAMP,
+    first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 10. Email outbox (messages the email backend could not take, retried in the background)
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    to_email VARCHAR(255) NOT NULL,
+    cc_email VARCHAR(255),
+    subject TEXT NOT NULL,
+    html TEXT NOT NULL,
+    text_body TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP,
+    dead_at TIMESTAMP  -- given up on after EMAIL_MAX_ATTEMPTS
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(next_attempt_at) WHERE sent_at IS NULL;
+
+-- 11. Analytics counters (bookings, seats and revenue per showtime and status, kept up to date by triggers)
+CREATE TABLE IF NOT EXISTS analytics_counters (
+    showtime_id INTEGER NOT NULL,  -- 0 for bookings without a showtime
+    status VARCHAR(50) NOT NULL,
+    bookings BIGINT NOT NULL DEFAULT 0,
+    seats BIGINT NOT NULL DEFAULT 0,
+    revenue BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (showtime_id, status)
+);
+
 -- Insert sample data
 INSERT INTO movies (title, poster_url, duration_minutes, genre, rating, description) VALUES 
 ('Avengers: Endgame', 'https://image.tmdb.org/t/p/w500/or06FN3Dka5tukK1e9sl16pB3iy.jpg', 181, 'Action, Adventure, Drama', 'PG-13', 'The epic conclusion to the Infinity Saga'),
@@ -105,7 +163,11 @@ ON CONFLICT DO NOTHING;
 -- Create indexes for better performance
 CREATE INDEX idx_bookings_status ON bookings(status);
 CREATE INDEX idx_bookings_email ON bookings(customer_email);
-CREATE INDEX idx_bookings_created_at ON bookings(created_at);
+-- Admin bookings listing: keyset pagination on (created_at, id), optionally by status or showtime
+CREATE INDEX idx_bookings_created_id ON bookings(created_at DESC, id DESC);
+CREATE INDEX idx_bookings_status_created_id ON bookings(status, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_showtime_created_id ON bookings(showtime_id, created_at DESC, id DESC);
+CREATE INDEX idx_bookings_payment_proof_hash ON bookings(payment_proof_hash);
 CREATE INDEX idx_otp_email ON otp_storage(email);
 CREATE INDEX idx_otp_expires ON otp_storage(expires_at);
 CREATE INDEX idx_reservations_seat ON seat_reservations(seat_id);
@@ -127,6 +189,56 @@ CREATE TRIGGER update_bookings_updated_at
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Keep analytics_counters in step with bookings, in the same transaction
+CREATE OR REPLACE FUNCTION bump_analytics_counters(p_showtime_id INTEGER, p_status VARCHAR, p_bookings INTEGER, p_seats BIGINT, p_revenue BIGINT)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO analytics_counters (showtime_id, status, bookings, seats, revenue)
+    VALUES (p_showtime_id, p_status, p_bookings, p_seats, p_revenue)
+    ON CONFLICT (showtime_id, status) DO UPDATE SET
+        bookings = analytics_counters.bookings + EXCLUDED.bookings,
+        seats = analytics_counters.seats + EXCLUDED.seats,
+        revenue = analytics_counters.revenue + EXCLUDED.revenue;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_analytics_counters()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_key TEXT;
+    new_key TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_analytics_counters(COALESCE(NEW.showtime_id, 0), NEW.status, 1, COALESCE(array_length(NEW.seats, 1), 0), NEW.total_amount);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_analytics_counters(COALESCE(OLD.showtime_id, 0), OLD.status, -1, -COALESCE(array_length(OLD.seats, 1), 0), -OLD.total_amount);
+    ELSE
+        -- Touch both counter rows in key order so concurrent transitions cannot deadlock
+        old_key := lpad(COALESCE(OLD.showtime_id, 0)::text, 10, '0') || OLD.status;
+        new_key := lpad(COALESCE(NEW.showtime_id, 0)::text, 10, '0') || NEW.status;
+        IF old_key <= new_key THEN
+            PERFORM bump_analytics_counters(COALESCE(OLD.showtime_id, 0), OLD.status, -1, -COALESCE(array_length(OLD.seats, 1), 0), -OLD.total_amount);
+            PERFORM bump_analytics_counters(COALESCE(NEW.showtime_id, 0), NEW.status, 1, COALESCE(array_length(NEW.seats, 1), 0), NEW.total_amount);
+        ELSE
+            PERFORM bump_analytics_counters(COALESCE(NEW.showtime_id, 0), NEW.status, 1, COALESCE(array_length(NEW.seats, 1), 0), NEW.total_amount);
+            PERFORM bump_analytics_counters(COALESCE(OLD.showtime_id, 0), OLD.status, -1, -COALESCE(array_length(OLD.seats, 1), 0), -OLD.total_amount);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER bookings_analytics_counters
+    AFTER INSERT OR DELETE ON bookings
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_analytics_counters();
+
+CREATE TRIGGER bookings_analytics_counters_update
+    AFTER UPDATE OF showtime_id, status, seats, total_amount ON bookings
+    FOR EACH ROW
+    WHEN ((OLD.showtime_id, OLD.status, OLD.seats, OLD.total_amount) IS DISTINCT FROM (NEW.showtime_id, NEW.status, NEW.seats, NEW.total_amount))
+    EXECUTE FUNCTION maintain_analytics_counters();
+
 -- Create function to clean expired records
 CREATE OR REPLACE FUNCTION cleanup_expired_records()
 RETURNS void AS $$
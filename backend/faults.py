@@ -0,0 +1,38 @@
+import os
+import random
+import threading
+import time
+
+# Latency/failure injection for the in-memory storage and email backends, so
+# benchmarks and load tests can model a slow or flaky network dependency on a
+# single machine. Configured per backend from <PREFIX>_LATENCY_MS,
+# <PREFIX>_JITTER_MS and <PREFIX>_FAILURE_RATE.
+
+class InjectedFailure(Exception):
+    """Failure produced on purpose by a FaultInjector"""
+
+class FaultInjector:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, failure_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix):
+        return cls(
+            latency_ms=float(os.getenv(f'{prefix}_LATENCY_MS', '0')),
+            jitter_ms=float(os.getenv(f'{prefix}_JITTER_MS', '0')),
+            failure_rate=float(os.getenv(f'{prefix}_FAILURE_RATE', '0')),
+        )
+
+    def __call__(self, operation):
+        """Sleep for the configured latency, then fail with the configured probability"""
+        with self._lock:
+            delay = self.latency_ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+            fail = self.failure_rate > 0 and self._random.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if fail:
+            raise InjectedFailure(f"Injected failure in {operation}")
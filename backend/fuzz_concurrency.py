@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Concurrency fuzzer for seat holds and bookings.
+
+Worker threads interleave randomized calls against one fresh showtime:
+  reserve  POST /api/reserve-seats
+  book     POST /api/book (usually the seats the user holds, sometimes not)
+  action   PUT  /api/booking/{id}/action (admin status changes)
+  expire   hold / pending-payment expiry, forced directly in the database
+After each run the invariants are checked:
+  1. no seat is active in two bookings
+  2. no live hold of one user overlaps a seat confirmed for another
+  3. get_analytics() matches counts recomputed from the bookings table
+
+Runs are reproducible per --seed (up to thread scheduling). Uses the same
+in-memory-backend local server as load_test.py with --spawn. Requires httpx.
+
+Usage: python fuzz_concurrency.py --spawn [--runs 5] [--workers 16] [--ops 400] [--seed 1]
+Exits non-zero when an invariant is violated.
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from database import get_db_connection, get_analytics
+from load_test import double_bookings, seed_showtime, spawn_server
+
+OPERATIONS = {'reserve': 40, 'book': 30, 'action': 20, 'expire': 10}
+ACTION_STATUSES = ['approved', 'confirmed', 'cancelled', 'admin_rejected', 'pending_approval']
+CONFIRMED_STATUSES = ('approved', 'confirmed')
+
+class Run:
+    """Shared state of one fuzzing run"""
+
+    def __init__(self, showtime_id, seats, users, run_id):
+        self.showtime_id = showtime_id
+        self.seats = seats
+        self.users = users
+        self.run_id = run_id
+        self.holds = {}
+        self.bookings = []
+        self.lock = threading.Lock()
+        self.outcomes = Counter()
+
+    def user_key(self, user):
+        return f"u{user}-{self.run_id}"
+
+    def email(self, user):
+        return f"fuzz-{self.user_key(user)}@fuzz.invalid"
+
+def hall_seats(rows, cols):
+    return [f"{chr(65 + row)}{col}" for row in range(rows) for col in range(1, cols + 1)]
+
+def op_reserve(client, run, rng, user):
+    seats = rng.sample(run.seats, rng.randint(1, 3))
+    response = client.post('/api/reserve-seats', headers={'x-real-ip': f"10.9.{user // 256}.{user % 256}"},
+                           json={'showtime_id': run.showtime_id, 'seats': seats, 'user_id': run.user_key(user)})
+    if response.status_code == 200:
+        with run.lock:
+            run.holds[user] = seats
+    return f"reserve:{response.status_code}"
+
+def op_book(client, run, rng, user):
+    with run.lock:
+        seats = run.holds.get(user)
+    if not seats or rng.random() < 0.2:
+        # Clients that skip or lost the hold still reach /book
+        seats = rng.sample(run.seats, rng.randint(1, 3))
+    response = client.post('/api/book', json={
+        'showtime_id': run.showtime_id,
+        'customer_name': f"Fuzz {user}",
+        'customer_email': run.email(user),
+        'customer_phone': f"08{user:010d}",
+        'selected_seats': seats,
+        'user_id': run.user_key(user),
+    })
+    if response.status_code == 200:
+        with run.lock:
+            run.bookings.append(response.json()['booking_id'])
+    return f"book:{response.status_code}"
+
+def op_action(client, run, rng, user, token):
+    with run.lock:
+        if not run.bookings:
+            return "action:skipped"
+        booking_id = rng.choice(run.bookings)
+    response = client.put(f'/api/booking/{booking_id}/action', headers={'authorization': f"Bearer {token}"},
+                          json={'status': rng.choice(ACTION_STATUSES), 'admin_remarks': 'fuzz'})
+    return f"action:{response.status_code}"
+
+def op_expire(client, run, rng, user):
+    """Age a random hold or pending-payment booking past its expiry"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    if rng.random() < 0.5:
+        cursor.execute("""
+            UPDATE seat_reservations SET expires_at = NOW() - INTERVAL '1 second'
+            WHERE id = (SELECT id FROM seat_reservations WHERE showtime_id = %s ORDER BY random() LIMIT 1)
+        """, (run.showtime_id,))
+        kind = "hold"
+    else:
+        cursor.execute("""
+            UPDATE bookings SET created_at = NOW() - INTERVAL '6 minutes'
+            WHERE id = (SELECT id FROM bookings WHERE showtime_id = %s AND status = 'pending_payment'
+                        ORDER BY random() LIMIT 1)
+        """, (run.showtime_id,))
+        kind = "pending"
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return f"expire:{kind}"
+
+def worker(client, run, seed, ops, token):
+    rng = random.Random(seed)
+    names, weights = list(OPERATIONS), list(OPERATIONS.values())
+    for _ in range(ops):
+        user = rng.randrange(run.users)
+        op = rng.choices(names, weights)[0]
+        try:
+            if op == 'reserve':
+                outcome = op_reserve(client, run, rng, user)
+            elif op == 'book':
+                outcome = op_book(client, run, rng, user)
+            elif op == 'action':
+                outcome = op_action(client, run, rng, user, token)
+            else:
+                outcome = op_expire(client, run, rng, user)
+        except httpx.HTTPError as e:
+            outcome = f"{op}:{type(e).__name__}"
+        with run.lock:
+            run.outcomes[outcome] += 1
+
+def overlapping_holds(run):
+    """Live holds of one user on seats confirmed for another user"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT r.seat_id, r.user_id, b.id AS booking_id, b.customer_email
+        FROM seat_reservations r
+        JOIN bookings b ON b.showtime_id = r.showtime_id AND r.seat_id = ANY(b.seats)
+        WHERE r.showtime_id = %s AND r.expires_at > NOW() AND b.status = ANY(%s)
+    """, (run.showtime_id, list(CONFIRMED_STATUSES)))
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    # user_id is "<ip>_<user key>", customer_email is "fuzz-<user key>@..."
+    return [dict(row) for row in rows if not row['customer_email'].startswith(f"fuzz-{row['user_id'].split('_', 1)[-1]}@")]
+
+def analytics_mismatches():
+    """get_analytics() versus the same figures recomputed row by row"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT seats, status, total_amount FROM bookings WHERE status NOT IN ('cancelled', 'admin_rejected')")
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    seats_by_status = Counter()
+    revenue = 0
+    for row in rows:
+        seats_by_status[row['status']] += len(row['seats'])
+        if row['status'] in CONFIRMED_STATUSES:
+            revenue += row['total_amount']
+    confirmed = sum(seats_by_status[status] for status in CONFIRMED_STATUSES)
+    expected = {
+        'total_bookings': confirmed,
+        'total_revenue': revenue,
+        'confirmed_bookings': confirmed,
+        'pending_bookings': seats_by_status['pending_payment'],
+        'pending_verification': seats_by_status['pending_verification'],
+        'pending_approval': seats_by_status['pending_approval'],
+    }
+    actual = get_analytics()
+    return {key: {'expected': value, 'actual': actual.get(key)} for key, value in expected.items() if actual.get(key) != value}
+
+def admin_token(client, username, password):
+    response = client.post('/api/admin/login', json={'username': username, 'password': password})
+    response.raise_for_status()
+    return response.json()['access_token']
+
+def fuzz_once(args, client, token, run_index):
+    rows, left_cols, right_cols = (int(part) for part in args.hall.split('x'))
+    showtime_id = seed_showtime(rows, left_cols, right_cols)
+    run = Run(showtime_id, hall_seats(rows, left_cols + right_cols), args.users, f"{int(time.time())}r{run_index}")
+    seed = args.seed * 1000 + run_index
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(worker, client, run, seed * 100 + worker_index, args.ops, token)
+            for worker_index in range(args.workers)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    violations = {
+        'double_bookings': double_bookings(showtime_id),
+        'overlapping_holds': overlapping_holds(run),
+        'analytics': analytics_mismatches(),
+    }
+    print(f"Run {run_index} (seed {seed}, showtime {showtime_id}): {sum(run.outcomes.values())} ops in {elapsed:.1f}s")
+    print("  " + ", ".join(f"{outcome}={count}" for outcome, count in sorted(run.outcomes.items())))
+    for name, found in violations.items():
+        print(f"  {'✗' if found else '✓'} {name}: {len(found) if found else 'ok'}")
+        if isinstance(found, list):
+            for violation in found[:10]:
+                print(f"      {violation}")
+        elif found:
+            for key, values in found.items():
+                print(f"      {key}: expected {values['expected']}, got {values['actual']}")
+    return any(violations.values())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--spawn', action='store_true', help='start the API locally with in-memory storage/email')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=400, help='operations per worker per run')
+    parser.add_argument('--users', type=int, default=40)
+    parser.add_argument('--hall', default='4x4x4', help='small halls maximise contention')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--admin-user', default=os.getenv('ADMIN_USERNAME', 'admin'))
+    parser.add_argument('--admin-password', default=os.getenv('ADMIN_PASSWORD', 'admin123'))
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = spawn_server(args.port)
+        args.url = f"http://127.0.0.1:{args.port}"
+    failed = False
+    try:
+        with httpx.Client(base_url=args.url, timeout=30, limits=httpx.Limits(max_connections=args.workers)) as client:
+            token = admin_token(client, args.admin_user, args.admin_password)
+            for run_index in range(args.runs):
+                failed |= fuzz_once(args, client, token, run_index)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    if failed:
+        print("\n✗ Invariant violations found")
+        sys.exit(1)
+    print("\n✓ All invariants held")
+
+if __name__ == "__main__":
+    main()
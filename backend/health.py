@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+from logger_config import logger
+from resilience import CircuitBreaker, dependencies_snapshot
+
+# Readiness checks for /readyz. Probes arrive every few seconds from every
+# load balancer target group, so results are cached for READINESS_CACHE_SECONDS
+# and only one caller per process refreshes them.
+#
+# Each check reports ok, degraded or fail; only a failing check makes the
+# instance unready. An open S3/SES breaker or a growing email outbox is
+# degraded: requests still succeed through the fallbacks, and taking every
+# instance out of rotation would not help. The same goes for a storage or email
+# backend that could not be set up at start. Failed warm-up steps are retried
+# by the warm-up scheduler in the background; checks here stay cheap.
+
+READINESS_CACHE_SECONDS = float(os.getenv('READINESS_CACHE_SECONDS', '5'))
+READINESS_DB_TIMEOUT_MS = int(os.getenv('READINESS_DB_TIMEOUT_MS', '1000'))
+OUTBOX_MAX_BACKLOG = int(os.getenv('OUTBOX_MAX_BACKLOG', '500'))
+
+_cached = None
+_cached_at = 0.0
+_lock = threading.Lock()
+
+def check_database():
+    from database import get_db_connection
+
+    started = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SET LOCAL statement_timeout = {READINESS_DB_TIMEOUT_MS}")
+        cursor.execute("SELECT 1")
+        cursor.close()
+        conn.commit()
+    finally:
+        conn.close()
+    return {"status": "ok", "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+def check_outbox():
+    from database import get_email_outbox_stats
+
+    stats = get_email_outbox_stats()
+    status = "degraded" if stats['pending'] > OUTBOX_MAX_BACKLOG else "ok"
+    return {"status": status, **stats}
+
+def check_warm(warm_state):
+    """Fails while an essential warm-up step has failed; failed steps the app can
+    do without (warm_state stays warm) only degrade"""
+    failed = [name for name, value in warm_state['steps'].items() if isinstance(value, str)]
+    status = "fail" if not warm_state['warm'] else "degraded" if failed else "ok"
+    return {"status": status, "duration_ms": warm_state['duration_ms'], "failed": failed}
+
+def check_dependencies():
+    dependencies = dependencies_snapshot()
+    open_breakers = [name for name, state in dependencies.items() if state['state'] != CircuitBreaker.CLOSED]
+    return {"status": "degraded" if open_breakers else "ok", "open": open_breakers}
+
+def _run(name, check, *args):
+    try:
+        return check(*args)
+    except Exception as e:
+        logger.warning(f"Readiness check {name} failed: {e}")
+        return {"status": "fail", "error": str(e)}
+
+def readiness(warm_state):
+    """(ready, report), refreshed at most every READINESS_CACHE_SECONDS"""
+    global _cached, _cached_at
+    with _lock:
+        if _cached is None or time.monotonic() - _cached_at >= READINESS_CACHE_SECONDS:
+            checks = {
+                "database": _run("database", check_database),
+                "email_outbox": _run("email_outbox", check_outbox),
+                "warm": _run("warm", check_warm, warm_state),
+                "dependencies": _run("dependencies", check_dependencies),
+            }
+            statuses = {check['status'] for check in checks.values()}
+            status = "fail" if "fail" in statuses else "degraded" if "degraded" in statuses else "ok"
+            _cached = {"status": status, "checks": checks}
+            _cached_at = time.monotonic()
+        return _cached['status'] != "fail", _cached
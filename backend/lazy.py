@@ -0,0 +1,27 @@
+import threading
+
+# Deferred construction of expensive module-level objects (boto3 clients and
+# the like), so importing the app stays fast. The object is built on first
+# attribute access, or ahead of traffic by the startup warm-up.
+
+class Lazy:
+    """Proxy that builds its target with factory() on first use"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._factory()
+        return self._target
+
+    @property
+    def resolved(self):
+        return self._target is not None
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Load test simulating a ticket-launch seat rush against one hot showtime.
+
+Every virtual user walks the customer flow:
+showtimes -> seat map -> reserve -> book -> upload proof -> verify OTP
+and the run reports p50/p95/p99 per step, error and conflict rates, and
+seats that ended up in more than one active booking (double bookings).
+
+Runs against the Postgres configured in .env. With --spawn the API is
+started locally with the in-memory storage and email backends instead of
+S3/SES (add latency or failures with STORAGE_LATENCY_MS, EMAIL_FAILURE_RATE,
+...), and OTPs are read back from the database.
+Requires httpx (pip install httpx).
+
+Usage: python load_test.py --spawn [--users 2000] [--concurrency 200] [--ramp 10]
+                           [--showtime-id N | --allow-seed] [--max-error-rate 0.01]
+                           [--max-p95 book=500] [--json report.json]
+Exits non-zero when a gate fails, so it can gate performance changes.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+import httpx
+
+from database import get_db_connection, create_movie, create_theater, create_showtime
+
+STEPS = ('showtimes', 'seat_map', 'reserve', 'book', 'upload', 'otp')
+# Statuses that hold a seat (same set as get_booked_seats)
+ACTIVE_STATUSES = ('pending_payment', 'pending_verification', 'pending_approval', 'approved', 'confirmed')
+# Losing a seat race is expected during a rush; these are counted as conflicts, not errors
+CONFLICT_STATUSES = {'reserve': {400, 409, 429}, 'book': {400, 409}}
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+        self.completed = 0
+        self.sold_out = 0
+
+    def record(self, step, seconds, outcome):
+        self.latencies[step].append(seconds * 1000)
+        self.outcomes[step][outcome] += 1
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def timed(stats, step, request):
+    started = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        stats.record(step, time.perf_counter() - started, 'error')
+        return None
+    elapsed = time.perf_counter() - started
+    if response.status_code < 400:
+        stats.record(step, elapsed, 'ok')
+        return response
+    if response.status_code in CONFLICT_STATUSES.get(step, ()):
+        stats.record(step, elapsed, 'conflict')
+    else:
+        stats.record(step, elapsed, 'error')
+    return None
+
+def seat_preference(seat_map):
+    """Selectable seats, most desirable (middle rows, centre columns) first"""
+    rows, cols = seat_map['rows'], seat_map['left_cols'] + seat_map['right_cols']
+    seats = []
+    for row in range(rows):
+        for col in range(1, cols + 1):
+            seat = f"{chr(65 + row)}{col}"
+            if seat not in seat_map['non_selectable']:
+                seats.append((abs(row - rows * 0.6) + abs(col - (cols + 1) / 2), seat))
+    return [seat for _, seat in sorted(seats)]
+
+def free_seats(seat_map, preference):
+    taken = set(seat_map['reserved_seats'])
+    for key in ('pending_payment_seats', 'pending_approval_seats', 'approved_seats', 'confirmed_seats'):
+        taken.update(seat_map[key])
+    return [seat for seat in preference if seat not in taken]
+
+def read_otp(booking_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT otp FROM otp_storage WHERE booking_id = %s ORDER BY id DESC LIMIT 1", (booking_id,))
+    result = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return result['otp'] if result else None
+
+async def virtual_user(vu, client, args, stats, proof, run_id):
+    headers = {'x-real-ip': f"10.{(vu >> 16) & 255}.{(vu >> 8) & 255}.{vu & 255}"}
+    email = f"vu{vu}-{run_id}@loadtest.invalid"
+
+    if not await timed(stats, 'showtimes', client.get('/api/showtimes', headers=headers)):
+        return
+    response = await timed(stats, 'seat_map', client.get(f'/api/showtime/{args.showtime_id}', headers=headers))
+    if not response:
+        return
+    seat_map = response.json()
+    available = free_seats(seat_map, seat_preference(seat_map))
+    if not available:
+        stats.sold_out += 1
+        return
+
+    # Everyone fights over the best seats: pick from the front of the preference list
+    wanted = random.randint(1, args.max_seats)
+    pool = available[:max(wanted, len(available) // 4)]
+    seats = random.sample(pool, min(wanted, len(pool)))
+    await asyncio.sleep(random.uniform(0, args.think))
+
+    user_id = f"vu{vu}-{run_id}"
+    reservation = {'showtime_id': args.showtime_id, 'seats': seats, 'user_id': user_id}
+    if not await timed(stats, 'reserve', client.post('/api/reserve-seats', json=reservation, headers=headers)):
+        return
+    await asyncio.sleep(random.uniform(0, args.think))
+
+    booking = {
+        'showtime_id': args.showtime_id,
+        'customer_name': f"Load Test {vu}",
+        'customer_email': email,
+        'customer_phone': f"08{vu:010d}",
+        'selected_seats': seats,
+        'user_id': user_id,
+    }
+    response = await timed(stats, 'book', client.post('/api/book', json=booking, headers=headers))
+    if not response:
+        return
+    booking_id = response.json()['booking_id']
+
+    # Unique bytes per user (ignored after the JPEG end marker), so uploads are not
+    # deduplicated by content hash and each one really stores and ingests a proof
+    files = {'file': ('proof.jpg', proof + f"\n{user_id}".encode(), 'image/jpeg')}
+    if not await timed(stats, 'upload', client.post(f'/api/upload-payment/{booking_id}', files=files, headers=headers)):
+        return
+
+    otp = await asyncio.to_thread(read_otp, booking_id)
+    if otp is None:
+        stats.record('otp', 0, 'error')
+        return
+    verification = {'email': email, 'otp': otp}
+    if not await timed(stats, 'otp', client.post('/api/verify-payment-otp', json=verification, headers=headers)):
+        return
+    stats.completed += 1
+
+async def run_load(args, proof):
+    stats = Stats()
+    run_id = f"{int(time.time())}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def start_user(vu, client):
+        await asyncio.sleep(args.ramp * vu / args.users)
+        async with semaphore:
+            await virtual_user(vu, client, args, stats, proof, run_id)
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        await asyncio.gather(*(start_user(vu, client) for vu in range(args.users)))
+    return stats, time.perf_counter() - started
+
+def double_bookings(showtime_id):
+    """Seats held by more than one active booking"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT seat, array_agg(id ORDER BY id) AS booking_ids
+        FROM bookings, unnest(seats) AS seat
+        WHERE showtime_id = %s AND status = ANY(%s)
+        GROUP BY seat HAVING COUNT(*) > 1
+        ORDER BY seat
+    """, (showtime_id, list(ACTIVE_STATUSES)))
+    results = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return [{'seat': row['seat'], 'booking_ids': row['booking_ids']} for row in results]
+
+def seed_showtime(rows, left_cols, right_cols):
+    """A fresh, empty showtime so every run starts from the same hall"""
+    movie_id = create_movie("Load Test Premiere", "", 120, "Test", "U", "Seat rush simulation")
+    theater_id = create_theater(f"Load Test Hall {int(time.time())}", "", rows, left_cols, right_cols, [])
+    return create_showtime(movie_id, theater_id, (date.today() + timedelta(days=30)).isoformat(), "19:00:00", 50000)
+
+def spawn_server(port, command=None):
+    """Start the API with in-memory storage/email (STORAGE_* / EMAIL_* env vars still apply)"""
+    env = {'STORAGE_BACKEND': 'memory', 'EMAIL_BACKEND': 'memory', **os.environ}
+    command = command or [
+        sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'
+    ]
+    process = subprocess.Popen(command, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("API server did not start within 30s")
+
+def build_report(stats, elapsed, violations):
+    steps = {}
+    for step in STEPS:
+        outcomes = stats.outcomes[step]
+        total = sum(outcomes.values())
+        latencies = stats.latencies[step]
+        steps[step] = {
+            'requests': total,
+            'p50_ms': round(percentile(latencies, 50), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+            'p99_ms': round(percentile(latencies, 99), 1),
+            'error_rate': outcomes['error'] / total if total else 0.0,
+            'conflict_rate': outcomes['conflict'] / total if total else 0.0,
+        }
+    requests = sum(sum(outcomes.values()) for outcomes in stats.outcomes.values())
+    errors = sum(outcomes['error'] for outcomes in stats.outcomes.values())
+    return {
+        'duration_s': round(elapsed, 2),
+        'requests': requests,
+        'throughput_rps': round(requests / elapsed, 1) if elapsed else 0.0,
+        'error_rate': errors / requests if requests else 0.0,
+        'completed_bookings': stats.completed,
+        'sold_out_users': stats.sold_out,
+        'double_bookings': violations,
+        'steps': steps,
+    }
+
+def print_report(report):
+    print(f"\n{'step':<10} {'requests':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8} {'conflicts':>10}")
+    for step, data in report['steps'].items():
+        print(f"{step:<10} {data['requests']:>9} {data['p50_ms']:>9} {data['p95_ms']:>9} {data['p99_ms']:>9} "
+              f"{data['error_rate']:>8.2%} {data['conflict_rate']:>10.2%}")
+    print(f"\n{report['requests']} requests in {report['duration_s']}s ({report['throughput_rps']} req/s), "
+          f"error rate {report['error_rate']:.2%}")
+    print(f"Completed bookings: {report['completed_bookings']}, users who found it sold out: {report['sold_out_users']}")
+    if report['double_bookings']:
+        print(f"✗ Double bookings: {len(report['double_bookings'])} seats")
+        for violation in report['double_bookings'][:20]:
+            print(f"  {violation['seat']}: bookings {violation['booking_ids']}")
+    else:
+        print("✓ No double bookings")
+
+def check_gates(report, args):
+    failures = []
+    if report['double_bookings']:
+        failures.append(f"{len(report['double_bookings'])} double-booked seats")
+    if report['error_rate'] > args.max_error_rate:
+        failures.append(f"error rate {report['error_rate']:.2%} > {args.max_error_rate:.2%}")
+    for gate in args.max_p95:
+        step, limit = gate.split('=', 1)
+        if report['steps'][step]['p95_ms'] > float(limit):
+            failures.append(f"{step} p95 {report['steps'][step]['p95_ms']} ms > {limit} ms")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--spawn', action='store_true', help='start the API locally with in-memory storage/email')
+    parser.add_argument('--port', type=int, default=8765, help='port for --spawn')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--ramp', type=float, default=10.0, help='seconds over which users arrive')
+    parser.add_argument('--think', type=float, default=0.5, help='max think time between steps, seconds')
+    parser.add_argument('--max-seats', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--showtime-id', type=int, help='existing showtime (default: seed a fresh one)')
+    parser.add_argument('--allow-seed', action='store_true',
+                        help='seed a showtime into the .env database without --spawn')
+    parser.add_argument('--hall', default='11x8x6', help='rows x left_cols x right_cols of a seeded hall')
+    parser.add_argument('--proof', default=os.path.join(os.path.dirname(__file__), '..', 'sample.jpg'))
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--max-p95', action='append', default=[], metavar='STEP=MS', help=f"steps: {', '.join(STEPS)}")
+    parser.add_argument('--json', help='write the report to this file')
+    args = parser.parse_args()
+
+    for gate in args.max_p95:
+        if gate.split('=', 1)[0] not in STEPS:
+            parser.error(f"unknown step in --max-p95 {gate}")
+    with open(args.proof, 'rb') as f:
+        proof = f.read()
+    if args.showtime_id is None and not (args.spawn or args.allow_seed):
+        parser.error("refusing to seed a showtime into the .env database against an external --url; "
+                     "pass --showtime-id, --spawn or --allow-seed")
+    if args.showtime_id is None:
+        args.showtime_id = seed_showtime(*(int(part) for part in args.hall.split('x')))
+        print(f"Seeded showtime {args.showtime_id} ({args.hall})")
+
+    server = None
+    if args.spawn:
+        server = spawn_server(args.port)
+        args.url = f"http://127.0.0.1:{args.port}"
+    try:
+        print(f"Rushing showtime {args.showtime_id} with {args.users} users "
+              f"(concurrency {args.concurrency}, ramp {args.ramp}s) at {args.url}")
+        stats, elapsed = asyncio.run(run_load(args, proof))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    report = build_report(stats, elapsed, double_bookings(args.showtime_id))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    failures = check_gates(report, args)
+    if failures:
+        print("\n✗ Gate failed: " + "; ".join(failures))
+        sys.exit(1)
+    print("\n✓ All gates passed")
+
+if __name__ == "__main__":
+    main()
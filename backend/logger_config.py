@@ -1,18 +1,57 @@
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 # Define the log file path
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 LOG_FILE = LOG_DIR / "movies-api.log"
 
+# 'json' for structured lines, 'text' for the classic human-readable format
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+# Records buffered for the writer thread before new ones are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured fields come from extra={'fields': {...}}"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "line": record.lineno,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller: drops records when the queue is full"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
 # Define the logger
 logger = logging.getLogger("movies-api")
 logger.setLevel(logging.INFO)
 
-# Create handlers
+# Create handlers; these run on the listener thread, never on request threads
 file_handler = RotatingFileHandler(
     LOG_FILE, maxBytes=10 * 1024 * 1024, backupCount=5
 )
@@ -22,16 +61,42 @@ console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setLevel(logging.INFO)
 
 # Define logging format
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s"
-)
+if LOG_FORMAT == 'json':
+    formatter = JsonFormatter()
+else:
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s"
+    )
 file_handler.setFormatter(formatter)
 console_handler.setFormatter(formatter)
 
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+queue_handler = DroppingQueueHandler(log_queue)
+
+_listener = None
+_listener_pid = None
+
+def start_log_listener():
+    """Start the background writer thread (again, after a fork)"""
+    global _listener, _listener_pid
+    if _listener is not None and _listener_pid == os.getpid():
+        return
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+def stop_log_listener():
+    """Write out everything still queued and stop the writer thread"""
+    global _listener
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+        _listener = None
+
 # Add handlers to the logger
 if not logger.hasHandlers():
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(queue_handler)
+    start_log_listener()
+    atexit.register(stop_log_listener)
 
 # Disable uvicorn access logs to reduce noise
-logging.getLogger("uvicorn.access").disabled = True
\ No newline at end of file
+logging.getLogger("uvicorn.access").disabled = True
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+from email.utils import make_msgid
+
+from dotenv import load_dotenv
+
+import metrics
+from faults import FaultInjector, InjectedFailure
+from logger_config import logger
+from resilience import Dependency, dependency_config
+
+load_dotenv()
+
+# Outgoing email behind one interface, selected with EMAIL_BACKEND:
+#   ses      Amazon SES (us-east-1), from SES_FROM_EMAIL
+#   maildir  messages written to a Maildir (EMAIL_MAILDIR, default maildir/),
+#            readable with any mail client, for development
+#   memory   messages kept in a list with injectable latency/failures
+#            (EMAIL_LATENCY_MS, EMAIL_JITTER_MS, EMAIL_FAILURE_RATE)
+#
+# SES (and the memory stand-in) is wrapped in GuardedMailer: sends run in a
+# bounded pool with a deadline behind a circuit breaker (SES_BULKHEAD_SIZE,
+# SES_TIMEOUT, ..., see resilience.py). Callers queue messages that fail with
+# MailerError in the email outbox rather than lose them.
+
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'ses')
+EMAIL_MAILDIR = os.getenv('EMAIL_MAILDIR', 'maildir')
+SES_FROM_EMAIL = os.getenv('SES_FROM_EMAIL', 'noreply@yourdomain.com')
+SES_CONNECT_TIMEOUT = float(os.getenv('SES_CONNECT_TIMEOUT', '2'))
+SES_READ_TIMEOUT = float(os.getenv('SES_READ_TIMEOUT', '5'))
+
+class MailerError(Exception):
+    """The email backend could not send a message"""
+
+class Mailer:
+    name = None
+
+    def __init__(self, source=SES_FROM_EMAIL):
+        self.source = source
+
+    def send(self, to_email, subject, html, text, cc_email=None):
+        """Send one message; returns its message id, raises MailerError"""
+        started = time.perf_counter()
+        try:
+            return self._send(to_email, subject, html, text, cc_email)
+        except MailerError:
+            metrics.email_errors_total.inc(self.name)
+            raise
+        except Exception as e:
+            metrics.email_errors_total.inc(self.name)
+            raise MailerError(str(e)) from e
+        finally:
+            metrics.email_send_duration.observe(time.perf_counter() - started, self.name)
+
+    def _message(self, to_email, subject, html, text, cc_email):
+        message = EmailMessage()
+        message['From'] = self.source
+        message['To'] = to_email
+        if cc_email:
+            message['Cc'] = cc_email
+        message['Subject'] = subject
+        message['Message-ID'] = make_msgid()
+        message.set_content(text)
+        message.add_alternative(html, subtype='html')
+        return message
+
+class SESMailer(Mailer):
+    name = 'ses'
+
+    def __init__(self, client, source=SES_FROM_EMAIL, configuration_set=None):
+        super().__init__(source)
+        self.client = client
+        self.configuration_set = configuration_set
+
+    def _send(self, to_email, subject, html, text, cc_email):
+        from botocore.exceptions import ClientError
+
+        destination = {'ToAddresses': [to_email]}
+        if cc_email:
+            destination['CcAddresses'] = [cc_email]
+
+        email_params = {
+            'Source': self.source,
+            'Destination': destination,
+            'Message': {
+                'Subject': {'Data': subject, 'Charset': 'UTF-8'},
+                'Body': {
+                    'Html': {'Data': html, 'Charset': 'UTF-8'},
+                    'Text': {'Data': text, 'Charset': 'UTF-8'}
+                }
+            }
+        }
+
+        # Only add configuration set if it exists
+        if self.configuration_set:
+            email_params['ConfigurationSetName'] = self.configuration_set
+
+        try:
+            return self.client.send_email(**email_params)['MessageId']
+        except ClientError as e:
+            raise MailerError(f"SES send error: {e.response['Error']['Message']}") from e
+
+class MaildirMailer(Mailer):
+    name = 'maildir'
+
+    def __init__(self, path=EMAIL_MAILDIR, source=SES_FROM_EMAIL):
+        import mailbox
+
+        super().__init__(source)
+        self.maildir = mailbox.Maildir(path, create=True)
+        self._lock = threading.Lock()
+
+    def _send(self, to_email, subject, html, text, cc_email):
+        message = self._message(to_email, subject, html, text, cc_email)
+        with self._lock:
+            self.maildir.add(message)
+        return message['Message-ID']
+
+class MemoryMailer(Mailer):
+    name = 'memory'
+
+    def __init__(self, faults=None, source=SES_FROM_EMAIL):
+        super().__init__(source)
+        self.faults = faults or FaultInjector()
+        self.sent = []
+
+    def _send(self, to_email, subject, html, text, cc_email):
+        try:
+            self.faults('send')
+        except InjectedFailure as e:
+            raise MailerError(str(e)) from e
+        message_id = f"<{uuid.uuid4().hex}@memory>"
+        self.sent.append({
+            'message_id': message_id, 'to': to_email, 'cc': cc_email,
+            'subject': subject, 'html': html, 'text': text,
+        })
+        return message_id
+
+class GuardedMailer(Mailer):
+    """A mailer whose sends go through a resilience.Dependency"""
+
+    def __init__(self, mailer, dependency):
+        self.mailer = mailer
+        self.dependency = dependency
+        self.name = mailer.name
+        self.source = mailer.source
+
+    def send(self, to_email, subject, html, text, cc_email=None):
+        return self.dependency.call(self.mailer.send, to_email, subject, html, text, cc_email)
+
+def guarded(mailer, prefix='SES'):
+    dependency = Dependency(
+        'email', **dependency_config(prefix, workers=4, queue=16, timeout=10),
+        error_class=MailerError,
+    )
+    return GuardedMailer(mailer, dependency)
+
+def create_mailer(backend=EMAIL_BACKEND):
+    """Email backend from configuration; SES falls back to a local Maildir if the client cannot be created"""
+    if backend == 'memory':
+        return guarded(MemoryMailer(FaultInjector.from_env('EMAIL')))
+    if backend == 'maildir':
+        return MaildirMailer()
+    if backend != 'ses':
+        raise ValueError(f"Unknown EMAIL_BACKEND: {backend}")
+    try:
+        import boto3
+        from botocore.config import Config
+
+        # SES is always in us-east-1
+        client = boto3.client(
+            'ses',
+            region_name='us-east-1',
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            config=Config(
+                connect_timeout=SES_CONNECT_TIMEOUT,
+                read_timeout=SES_READ_TIMEOUT,
+                retries={'max_attempts': 2, 'mode': 'standard'},
+            )
+        )
+        metrics.instrument_boto_client(client, 'ses')
+        return guarded(SESMailer(client, configuration_set=os.getenv('SES_CONFIGURATION_SET')))
+    except Exception as e:
+        logger.warning(f"SES not configured, writing emails to {EMAIL_MAILDIR}/: {e}")
+        return MaildirMailer()
@@ -1,22 +1,38 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Response, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
+import hashlib
+import importlib
 import json
+import mimetypes
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import uuid
 import random
+import time
 import os
 from dotenv import load_dotenv
-import boto3
-from botocore.exceptions import ClientError
-from botocore.exceptions import NoCredentialsError
-from logger_config import logger
+from storage import create_storage, LocalStorage, StorageError, ObjectNotFound
+from mailer import create_mailer, MailerError
+from resilience import dependencies_snapshot
+from recovery import start_recovery_worker, stop_recovery_worker
+from logger_config import logger, start_log_listener, stop_log_listener
+from request_logging import allowed_headers, log_request
+import metrics
+import query_tracer
+import slow_queries
+import profiler
+import admission
+import health
+import database
+import booking_export
 import traceback
-import jwt
-import bcrypt
+from lazy import Lazy
+import warmup
+from cache import TTLCache, cache_sizes
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import Depends
 
@@ -27,17 +43,126 @@ logger.info("Starting Movie Booking API...")
 
 app = FastAPI()
 
-# Add middleware for request logging
+# Admission control: innermost, so shed requests are still logged and counted.
+# Plain ASGI rather than @app.middleware: the slot is held until the app has
+# sent the whole response, streamed bodies (tickets, exports, manifests)
+# included, and released whether it finishes, fails or the client goes away.
+class AdmitRequests:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        route_class = None
+        if scope["type"] == "http" and admission.ADMISSION_ENABLED:
+            route_class = admission.classify(scope["path"])
+        if route_class is None:
+            return await self.app(scope, receive, send)
+        rejected = await admission.controller.acquire(route_class)
+        if rejected:
+            metrics.admission_rejections_total.inc(route_class.name, rejected)
+            from fastapi.responses import JSONResponse
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server busy, please retry"},
+                headers={"Retry-After": str(admission.ADMISSION_RETRY_AFTER)},
+            )
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.controller.release(route_class)
+
+app.add_middleware(AdmitRequests)
+
+# Read-your-writes: after a successful write, the client's reads skip the
+# replicas for DB_READ_YOUR_WRITES seconds. A cookie rather than server state,
+# so it holds whichever worker or instance serves the next request.
+DB_READ_YOUR_WRITES = float(os.getenv('DB_READ_YOUR_WRITES', '10'))
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+@app.middleware("http")
+async def route_reads(request, call_next):
+    if not database.replicas:
+        return await call_next(request)
+    try:
+        recent_write = float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        recent_write = False
+    database.read_from_primary(recent_write)
+    response = await call_next(request)
+    if request.method in ("POST", "PUT", "DELETE") and response.status_code < 400:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, str(int(time.time() + DB_READ_YOUR_WRITES)),
+            max_age=int(DB_READ_YOUR_WRITES) + 1, httponly=True, samesite="lax"
+        )
+    return response
+
+# Add middleware for request logging (one sampled, structured line per request) and metrics
 @app.middleware("http")
 async def log_requests(request, call_next):
-    start_time = datetime.now()
-    logger.info(f"Request: {request.method} {request.url} - Headers: {dict(request.headers)}")
+    start_time = time.perf_counter()
+    db_stats = metrics.start_request_db_stats()
+    trace = query_tracer.start_trace()
+    metrics.http_requests_in_flight.inc()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        metrics.http_requests_in_flight.dec()
+        process_time = time.perf_counter() - start_time
+        route = getattr(request.scope.get("route"), "path", None)
+        route_label = route or "unmatched"
+        metrics.http_requests_total.inc(request.method, route_label, str(status_code))
+        metrics.http_request_duration.observe(process_time, request.method, route_label)
+        metrics.request_db_queries.observe(db_stats[0], route_label)
+        metrics.request_db_seconds.observe(db_stats[1], route_label)
     
-    response = await call_next(request)
+    log_request(
+        request.method, request.url.path, route, request.url.query,
+        status_code, process_time * 1000,
+        request.client.host if request.client else None, request.headers
+    )
+    query_tracer.check_budgets(trace, request.method, request.url.path)
+    response.headers.append("Server-Timing", query_tracer.server_timing(trace, process_time))
     
-    process_time = (datetime.now() - start_time).total_seconds()
-    logger.info(f"Response: {request.method} {request.url} - Status: {response.status_code} - Time: {process_time:.3f}s")
+    return response
+
+def is_profiling_admin(request):
+    """Profiling is admin-only: validate the bearer token like get_current_admin does"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        get_current_admin(HTTPAuthorizationCredentials(scheme=scheme, credentials=token))
+        return True
+    except HTTPException:
+        return False
+
+@app.middleware("http")
+async def profile_requests(request, call_next):
+    """Profile a single request for admins with `X-Profile: 1` or `?__profile=1`"""
+    if request.headers.get("x-profile") != "1" and request.query_params.get("__profile") != "1":
+        return await call_next(request)
+    if not is_profiling_admin(request):
+        response = await call_next(request)
+        response.headers["X-Profile-Skipped"] = "unauthorized"
+        return response
+    skipped = profiler.acquire()
+    if skipped:
+        response = await call_next(request)
+        response.headers["X-Profile-Skipped"] = skipped
+        return response
     
+    sampler = profiler.Sampler().start()
+    try:
+        response = await call_next(request)
+    finally:
+        sampler.stop()
+        profiler.release()
+    profile_id = profiler.save(sampler, request.method, request.url.path)
+    logger.info(f"Profiled {request.method} {request.url.path}: {profile_id} ({sampler.samples} samples)")
+    response.headers["X-Profile-Id"] = profile_id
     return response
 
 # Add exception handler for better error logging
@@ -46,7 +171,7 @@ async def global_exception_handler(request, exc):
     logger.error(f"Global exception handler caught: {exc}")
     logger.error(f"Request URL: {request.url}")
     logger.error(f"Request method: {request.method}")
-    logger.error(f"Request headers: {dict(request.headers)}")
+    logger.error(f"Request headers: {allowed_headers(request.headers)}")
     logger.error(f"Traceback: {traceback.format_exc()}")
     
     # Try to read request body for POST requests
@@ -69,62 +194,66 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Serve React static files (move to end of file)
 # app.mount("/", StaticFiles(directory="static", html=True), name="static")
 
 # Import database operations
-from database import get_db_connection
+from database import get_db_connection, fill_pool
 from database import (
-    create_booking, get_all_bookings, get_booking_by_id, update_booking_status,
-    update_booking_payment_proof, get_booked_seats, store_otp, verify_otp,
-    reserve_seats, get_reserved_seats, check_seat_availability, get_analytics,
+    create_booking, get_bookings_page, iter_bookings, get_booking_by_id, update_booking_status,
+    update_booking_payment_proof, get_bookings_by_proof_hash, get_booked_seats, store_otp, verify_otp,
+    reserve_seats, get_reserved_seats, check_seat_availability, get_analytics, get_booking_status_counts,
     get_admin_settings, update_admin_settings, get_all_movies, create_movie,
-    get_all_theaters, create_theater, get_all_showtimes, create_showtime, get_showtime_by_id
+    get_all_theaters, create_theater, get_all_showtimes, create_showtime, get_showtime_by_id,
+    iter_showtime_ticket_seats, get_showtime_bookings_version, get_slow_queries, get_slow_query, SLOW_QUERY_ORDERS,
+    enqueue_email, get_email_outbox_stats, get_payment_proofs_under
 )
 # from ticket_generator import create_ticket_pdf, generate_ticket_email_content
+from ticket_jobs import (
+    TICKET_RENDER_MODE, TICKET_STATUSES, ensure_ticket_pdf, iter_pdf_chunks, render_ticket_bytes,
+    shutdown_ticket_pool, ticket_cache_key, ticket_cache_path, ticket_content_version,
+    ticket_download_url, verify_ticket_download_token
+)
+from checkin import booking_status_changed, build_scanner_manifest, check_in, check_in_many, check_layout, scanner_key
+from showtimes import get_showtime_layout, get_seat_state, seat_state_changed, invalidate_layouts
+from proof_images import PROOF_VARIANTS, get_ingest_pool, shutdown_ingest_pool, render_proof_variants, variant_location
 
 # Admin sessions (keep in memory for simplicity)
 admin_sessions = set()
 
 
 
-# AWS configuration
-AWS_REGION = os.getenv('AWS_REGION', 'ap-southeast-3')
-SES_FROM_EMAIL = os.getenv('SES_FROM_EMAIL', 'noreply@yourdomain.com')
-S3_BUCKET = os.getenv('S3_BUCKET', 'bamboo-movies')
+PROOF_CHUNK_SIZE = 64 * 1024
 
-# Initialize AWS clients
-try:
-    # SES is always in us-east-1
-    ses_client = boto3.client(
-        'ses',
-        region_name='us-east-1',
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-    )
-    # S3 uses the configured region
-    s3_client = boto3.client(
-        's3',
-        region_name=AWS_REGION,
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-    )
-    logger.info(f"AWS services initialized - SES: us-east-1, S3: {AWS_REGION}")
-except Exception as e:
-    ses_client = None
-    s3_client = None
-    logger.warning(f"AWS not configured: {e}")
+# Object storage and email backends (STORAGE_BACKEND / EMAIL_BACKEND), built on
+# first use or by the startup warm-up so importing the app does not load boto3
+storage = Lazy(create_storage)
+mailer = Lazy(create_mailer)
+# Payment proofs are accepted here while primary storage is unavailable; recovery.py moves them later
+fallback_storage = LocalStorage(os.getenv('STORAGE_FALLBACK_ROOT', 'uploads-pending'))
+
+def storage_for(location):
+    """(backend, key) of a stored location, or (None, None) if no backend holds it"""
+    for backend in (storage, fallback_storage):
+        key = backend.key_for(location)
+        if key is not None:
+            return backend, key
+    return None, None
+
+# send_email outcomes; a failed send that could not be queued either returns None
+EMAIL_SENT = 'sent'
+EMAIL_QUEUED = 'queued'
 
 def send_email(to_email, subject, body, cc_email=None):
+    """Send now, or queue in the outbox for the recovery worker to resend.
+    Returns EMAIL_SENT, EMAIL_QUEUED or None"""
     if cc_email:
         logger.info(f"Attempting to send email to: {to_email} (CC: {cc_email})")
     else:
         logger.info(f"Attempting to send email to: {to_email}")
-    if not ses_client:
-        logger.warning(f"Demo mode - Email would be sent to {to_email}")
-        return False
     
     try:
         # Improved email with proper headers and text version
@@ -144,38 +273,21 @@ def send_email(to_email, subject, body, cc_email=None):
         This is an automated message. Please do not reply to this email.
         """
         
-        destination = {'ToAddresses': [to_email]}
-        if cc_email:
-            destination['CcAddresses'] = [cc_email]
-        
-        email_params = {
-            'Source': SES_FROM_EMAIL,
-            'Destination': destination,
-            'Message': {
-                'Subject': {'Data': subject, 'Charset': 'UTF-8'},
-                'Body': {
-                    'Html': {'Data': body, 'Charset': 'UTF-8'},
-                    'Text': {'Data': text_body, 'Charset': 'UTF-8'}
-                }
-            }
-        }
-        
-        # Only add configuration set if it exists
-        config_set = os.getenv('SES_CONFIGURATION_SET')
-        if config_set:
-            email_params['ConfigurationSetName'] = config_set
-        
-        response = ses_client.send_email(**email_params)
-        logger.info(f"Email sent successfully to {to_email}. MessageId: {response['MessageId']}")
-        return True
-    except ClientError as e:
-        error_code = e.response['Error']['Code']
-        error_message = e.response['Error']['Message']
-        logger.error(f"SES send error: {error_message}")
-        return False
-    except Exception as e:
+        message_id = mailer.send(to_email, subject, body, text_body, cc_email)
+        logger.info(f"Email sent successfully to {to_email} via {mailer.name}. MessageId: {message_id}")
+        return EMAIL_SENT
+    except MailerError as e:
         logger.error(f"Email send error: {e}")
-        return False
+        error = str(e)
+    
+    # Keep the message and let the recovery worker resend it
+    try:
+        email_id = enqueue_email(to_email, subject, body, text_body, cc_email, error)
+        logger.warning(f"Email to {to_email} queued in outbox (id {email_id})")
+        return EMAIL_QUEUED
+    except Exception as queue_error:
+        logger.error(f"Email outbox error: {queue_error}")
+        return None
 
 # Security configuration
 JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-super-secret-jwt-key-change-in-production')
@@ -191,26 +303,6 @@ ADMIN_PLAIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'admin123')  # Simple for loc
 security = HTTPBearer()
 ADMIN_IPS = os.getenv('ADMIN_IPS', '').split(',') if os.getenv('ADMIN_IPS') else []
 
-# Get showtime layout for booking
-def get_showtime_layout(showtime_id):
-    showtime = get_showtime_by_id(showtime_id)
-    if showtime:
-        return {
-            "showtime_id": showtime['id'],
-            "rows": showtime['rows'],
-            "left_cols": showtime['left_cols'],
-            "right_cols": showtime['right_cols'],
-            "movie": showtime['movie_title'],
-            "movie_poster": showtime.get('poster_url', ''),
-            "theater": showtime['theater_name'],
-            "address": showtime.get('address', ''),
-            "show_date": str(showtime['show_date']),
-            "showtime": str(showtime['show_time']),
-            "price": showtime['price'],
-            "non_selectable": showtime['non_selectable_seats'] or []
-        }
-    return None
-
 class BookingRequest(BaseModel):
     showtime_id: int
     customer_name: str
@@ -272,6 +364,18 @@ class BookingAction(BaseModel):
     status: str
     admin_remarks: Optional[str] = None
 
+class CheckinRequest(BaseModel):
+    token: str
+    gate: Optional[str] = None
+
+class OfflineCheckin(BaseModel):
+    token: str
+    scanned_at: Optional[datetime] = None
+
+class CheckinBatch(BaseModel):
+    gate: Optional[str] = None
+    checkins: List[OfflineCheckin]
+
 @app.get("/")
 @app.get("/api/")
 def read_root():
@@ -297,46 +401,7 @@ def get_showtime_info(showtime_id: int):
     if not showtime_layout:
         raise HTTPException(status_code=404, detail="Showtime not found")
     
-    # Get seats by status
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT seats, status FROM bookings 
-        WHERE showtime_id = %s AND status IN ('pending_payment', 'pending_approval', 'approved', 'confirmed')
-    """, (showtime_id,))
-    
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    
-    pending_payment_seats = []
-    pending_approval_seats = []
-    approved_seats = []
-    confirmed_seats = []
-    
-    logger.info(f"Showtime {showtime_id} bookings found: {len(results)}")
-    for result in results:
-        logger.debug(f"  Seats: {result['seats']}, Status: {result['status']}")
-        if result['status'] == 'pending_payment':
-            pending_payment_seats.extend(result['seats'])
-        elif result['status'] == 'pending_approval':
-            pending_approval_seats.extend(result['seats'])
-        elif result['status'] == 'approved':
-            approved_seats.extend(result['seats'])
-        elif result['status'] == 'confirmed':
-            confirmed_seats.extend(result['seats'])
-    
-    logger.info(f"Confirmed seats for showtime {showtime_id}: {confirmed_seats}")
-    reserved_seat_ids = get_reserved_seats(showtime_id)
-    
-    return {
-        **showtime_layout,
-        "pending_payment_seats": pending_payment_seats,
-        "pending_approval_seats": pending_approval_seats,
-        "approved_seats": approved_seats, 
-        "confirmed_seats": confirmed_seats,
-        "reserved_seats": reserved_seat_ids
-    }
+    return {**showtime_layout, **get_seat_state(showtime_id)}
 
 @app.post("/reserve-seats")
 @app.post("/api/reserve-seats")
@@ -358,6 +423,7 @@ def reserve_seats_endpoint(reservation: SeatReservation, request: Request):
     
     # Limit: Max 4 seats reserved per IP
     if current_reservations >= 4:
+        metrics.seat_holds_total.inc('rate_limited')
         raise HTTPException(status_code=429, detail="Too many seats reserved. Please complete your booking first.")
     
     # Check if seats are available
@@ -370,6 +436,7 @@ def reserve_seats_endpoint(reservation: SeatReservation, request: Request):
             unavailable_seats.append(seat)
     
     if unavailable_seats:
+        metrics.seat_holds_total.inc('conflict')
         raise HTTPException(status_code=400, 
                           detail=f"Seats {', '.join(unavailable_seats)} are no longer available")
     
@@ -377,6 +444,9 @@ def reserve_seats_endpoint(reservation: SeatReservation, request: Request):
     expires_at = datetime.now() + timedelta(minutes=5)
     user_id_with_ip = f"{client_ip}_{reservation.user_id}"
     reserve_seats(reservation.showtime_id, reservation.seats, user_id_with_ip, expires_at)
+    seat_state_changed(reservation.showtime_id)
+    metrics.seat_holds_total.inc('held')
+    metrics.seats_held_total.inc(amount=len(reservation.seats))
     
     return {"message": "Seats reserved successfully", "expires_at": expires_at.isoformat()}
 
@@ -420,6 +490,8 @@ def create_booking_endpoint(booking: BookingRequest):
             total_amount
         )
         
+        seat_state_changed(booking.showtime_id)
+        metrics.bookings_created_total.inc()
         logger.info(f"✓ Booking created successfully: ID {booking_id}, Amount: Rp {total_amount:,}")
         logger.info(f"=== BOOKING CREATION COMPLETE ===")
         
@@ -436,9 +508,40 @@ def create_booking_endpoint(booking: BookingRequest):
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def proof_extension(filename, content_type):
+    """File extension for a content-addressed proof blob"""
+    extension = mimetypes.guess_extension(content_type or '')
+    if not extension:
+        extension = os.path.splitext(filename or '')[1]
+    return extension.lower()
+
+def payment_proof_exists(file_url):
+    """Check whether a payment proof object (or variant) is already stored"""
+    backend, key = storage_for(file_url)
+    return backend is not None and backend.exists(key)
+
+def store_payment_proof_variants(file_url, variants):
+    """Store rendered proof variants next to the original upload"""
+    backend, key = storage_for(file_url)
+    for size, content in variants.items():
+        backend.put(variant_location(key, size), content, 'image/jpeg')
+
+async def ingest_payment_proof(booking_id, file_url, content):
+    """Generate thumbnail/preview for a payment proof, off the request path"""
+    try:
+        loop = asyncio.get_running_loop()
+        variants = await loop.run_in_executor(get_ingest_pool(), render_proof_variants, content)
+        await loop.run_in_executor(None, store_payment_proof_variants, file_url, variants)
+        logger.info(f"Payment proof variants stored for booking {booking_id}: {', '.join(variants)}")
+    except Exception as e:
+        # The original stays available, the proof endpoint falls back to it
+        logger.error(f"Payment proof ingest failed for booking {booking_id}: {e}")
+
 @app.post("/upload-payment/{booking_id}")
 @app.post("/api/upload-payment/{booking_id}")
-async def upload_payment_proof(booking_id: int, file: UploadFile = File(...)):
+def upload_payment_proof(booking_id: int, background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    # Plain def: storage, email and database calls block for up to their
+    # timeouts, so they run in the threadpool rather than on the event loop
     logger.info(f"Upload payment proof request for booking {booking_id}, file: {file.filename}")
     
     try:
@@ -449,37 +552,48 @@ async def upload_payment_proof(booking_id: int, file: UploadFile = File(...)):
         
         logger.info(f"Processing file upload for booking {booking_id}")
         
-        # Upload to S3
+        # Hash while reading so identical retries map to the same content-addressed blob
         try:
-            file_key = f"payment-proofs/{booking_id}_{file.filename}"
-            content = await file.read()
-            logger.info(f"File read successfully, size: {len(content)} bytes")
+            digest = hashlib.sha256()
+            chunks = []
+            while True:
+                chunk = file.file.read(PROOF_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                chunks.append(chunk)
+            content = b"".join(chunks)
+            proof_hash = digest.hexdigest()
+            content_type = file.content_type or 'image/jpeg'
+            file_key = f"payment-proofs/sha256/{proof_hash}{proof_extension(file.filename, content_type)}"
+            logger.info(f"File read successfully, size: {len(content)} bytes, sha256: {proof_hash}")
             
-            if s3_client:
-                logger.info(f"Uploading to S3 bucket: {S3_BUCKET}, key: {file_key}")
-                s3_client.put_object(
-                    Bucket=S3_BUCKET,
-                    Key=file_key,
-                    Body=content,
-                    ContentType=file.content_type or 'image/jpeg'
-                )
-                file_url = f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{file_key}"
-                logger.info(f"File uploaded to S3 successfully: {file_url}")
-            else:
-                # Fallback to local storage for development
-                logger.warning("S3 client not available, using local storage")
-                os.makedirs("uploads", exist_ok=True)
-                file_url = f"uploads/{booking_id}_{file.filename}"
-                with open(file_url, "wb") as buffer:
-                    buffer.write(content)
-                logger.info(f"File saved locally: {file_url}")
+            try:
+                file_url = storage.url(file_key)
+                already_stored = storage.exists(file_key)
+                if already_stored:
+                    logger.info(f"Payment proof already stored, skipping upload: {file_key}")
+                else:
+                    logger.info(f"Uploading to {storage.name} storage, key: {file_key}")
+                    storage.put(file_key, content, content_type)
+                    logger.info(f"File uploaded successfully: {file_url}")
+            except StorageError as e:
+                # Accept the proof anyway; it is moved to primary storage once that recovers
+                logger.warning(f"{storage.name} storage unavailable, keeping payment proof in {fallback_storage.name} storage: {e}")
+                fallback_storage.put(file_key, content, content_type)
+                file_url = fallback_storage.url(file_key)
+                already_stored = False
         except Exception as upload_error:
             logger.error(f"File upload failed: {str(upload_error)}")
             raise HTTPException(status_code=500, detail=f"File upload failed: {str(upload_error)}")
         
         # Update booking with payment proof
         logger.info(f"Updating booking {booking_id} with payment proof: {file_url}")
-        update_booking_payment_proof(booking_id, file_url)
+        update_booking_payment_proof(booking_id, file_url, proof_hash)
+        seat_state_changed(booking['showtime_id'])
+        metrics.booking_status_changes_total.inc("pending_verification")
+        if not (already_stored and payment_proof_exists(variant_location(file_url, 'thumb'))):
+            background_tasks.add_task(ingest_payment_proof, booking_id, file_url, content)
         
         # Generate OTP for email verification
         otp = str(random.randint(100000, 999999))
@@ -544,9 +658,13 @@ async def upload_payment_proof(booking_id: int, file: UploadFile = File(...)):
         </html>
         """
         
-        if send_email(booking['customer_email'], subject, body):
+        sent = send_email(booking['customer_email'], subject, body)
+        if sent == EMAIL_SENT:
             logger.info(f"OTP email sent successfully to {booking['customer_email']}")
             return {"message": "Payment uploaded. Check email for verification OTP.", "requires_otp": True}
+        elif sent == EMAIL_QUEUED:
+            logger.warning(f"OTP email to {booking['customer_email']} queued, email service unavailable")
+            return {"message": "Payment uploaded. The verification OTP email is delayed and will arrive shortly.", "requires_otp": True}
         else:
             logger.warning(f"Email sending failed")
             return {"message": "Payment uploaded. Check email for verification OTP.", "requires_otp": True}
@@ -567,10 +685,12 @@ def get_booking(booking_id: int):
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password against hash"""
+    import bcrypt
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 def create_jwt_token(username: str) -> str:
     """Create JWT token"""
+    import jwt
     payload = {
         'username': username,
         'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS),
@@ -580,6 +700,7 @@ def create_jwt_token(username: str) -> str:
 
 def verify_jwt_token(token: str) -> dict:
     """Verify JWT token"""
+    import jwt
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
         return payload
@@ -639,55 +760,125 @@ def get_admin_info(admin: dict = Depends(get_current_admin)):
     """Get current admin user info"""
     return {"username": admin['username'], "exp": admin['exp']}
 
+BOOKINGS_PAGE_SIZE = int(os.getenv('BOOKINGS_PAGE_SIZE', '100'))
+BOOKINGS_MAX_PAGE_SIZE = 500
+
+def ndjson_default(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
 @app.get("/bookings")
 @app.get("/api/bookings")
-def get_all_bookings_endpoint(status: str = None, admin: dict = Depends(get_current_admin)):
-    if status:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT b.*, s.show_date, s.show_time, m.title as movie_title, t.name as theater_name
-            FROM bookings b
-            LEFT JOIN showtimes s ON b.showtime_id = s.id
-            LEFT JOIN movies m ON s.movie_id = m.id
-            LEFT JOIN theaters t ON s.theater_id = t.id
-            WHERE b.status = %s
-            ORDER BY b.created_at DESC
-        """, (status,))
-        bookings = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return bookings
-    return get_all_bookings()
+def get_all_bookings_endpoint(
+    response: Response,
+    status: str = None,
+    showtime_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = BOOKINGS_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    admin: dict = Depends(get_current_admin)
+):
+    """Bookings newest first, one page at a time; the next page's cursor is in X-Next-Cursor.
+
+    stream=true sends every matching booking as NDJSON instead, read through a
+    server-side cursor so neither side holds the whole history.
+    """
+    filters = {'status': status, 'showtime_id': showtime_id, 'date_from': date_from, 'date_to': date_to}
+    if stream:
+        from fastapi.responses import StreamingResponse
+        lines = (json.dumps(booking, default=ndjson_default) + "\n" for booking in iter_bookings(**filters))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    if not 1 <= limit <= BOOKINGS_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {BOOKINGS_MAX_PAGE_SIZE}")
+    try:
+        bookings, next_cursor = get_bookings_page(limit, cursor, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return bookings
+
+@app.get("/admin/bookings/export")
+@app.get("/api/admin/bookings/export")
+def export_bookings_endpoint(
+    format: str = "csv",
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    admin: dict = Depends(get_current_admin)
+):
+    """Stream bookings with showtime/movie/theater as CSV, NDJSON or Parquet (status is comma-separated)"""
+    from fastapi.responses import StreamingResponse
+    statuses = [s.strip() for s in status.split(',') if s.strip()] if status else None
+    stats = {}
+    try:
+        chunks = booking_export.export_bookings(format, stats, status=statuses, date_from=date_from, date_to=date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def logged(chunks):
+        started = time.perf_counter()
+        yield from chunks
+        logger.info(f"Export by {admin['username']}: {stats['rows']} bookings as {format} "
+                    f"({stats['bytes'] / 1024:.0f} KiB) in {time.perf_counter() - started:.1f}s")
+
+    filename = booking_export.export_filename(format, date_from, date_to)
+    return StreamingResponse(
+        logged(chunks),
+        media_type=booking_export.FORMATS[format][0],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.get("/payment-proof/{booking_id}")
-def get_payment_proof(booking_id: int):
+@app.get("/api/payment-proof/{booking_id}")
+def get_payment_proof(booking_id: int, size: Optional[str] = None):
+    if size and size not in PROOF_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Invalid size. Use one of: {', '.join(PROOF_VARIANTS)}")
+    
     booking = get_booking_by_id(booking_id)
     if not booking or not booking.get("payment_proof"):
         raise HTTPException(status_code=404, detail="Payment proof not found")
     
     file_url = booking["payment_proof"]
+    backend, key = storage_for(file_url)
+    if backend is None:
+        logger.error(f"Payment proof of booking {booking_id} is not in {storage.name} storage: {file_url}")
+        raise HTTPException(status_code=404, detail="Payment proof not accessible")
     
-    # If S3 URL, fetch and serve the content
-    if file_url.startswith("https://") and s3_client:
-        try:
-            # Extract S3 key from URL
-            s3_key = file_url.split(f"{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/")[1]
-            
-            # Get object from S3
-            response = s3_client.get_object(Bucket=S3_BUCKET, Key=s3_key)
-            content = response['Body'].read()
-            content_type = response.get('ContentType', 'image/jpeg')
-            
-            from fastapi.responses import Response
-            return Response(content=content, media_type=content_type)
-        except Exception as e:
-            logger.error(f"Error fetching S3 object: {e}")
-            raise HTTPException(status_code=404, detail="Payment proof not accessible")
-    else:
-        # Local file fallback
-        from fastapi.responses import FileResponse
-        return FileResponse(file_url)
+    try:
+        # Prefer the requested variant if it has been generated
+        stored = None
+        if size:
+            try:
+                stored = backend.get(variant_location(key, size))
+            except ObjectNotFound:
+                logger.info(f"Proof variant '{size}' not ready for booking {booking_id}, serving original")
+        if stored is None:
+            stored = backend.get(key)
+        content, content_type = stored
+        
+        from fastapi.responses import Response
+        return Response(content=content, media_type=content_type)
+    except StorageError as e:
+        logger.error(f"Error fetching payment proof: {e}")
+        raise HTTPException(status_code=404, detail="Payment proof not accessible")
+
+@app.get("/admin/payment-proof/{booking_id}/duplicates")
+@app.get("/api/admin/payment-proof/{booking_id}/duplicates")
+def get_payment_proof_duplicates(booking_id: int, admin: dict = Depends(get_current_admin)):
+    """List other bookings that uploaded the exact same payment proof"""
+    booking = get_booking_by_id(booking_id)
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    if not booking.get("payment_proof_hash"):
+        return {"payment_proof_hash": None, "duplicates": []}
+    
+    duplicates = get_bookings_by_proof_hash(booking["payment_proof_hash"], booking_id)
+    if duplicates:
+        logger.warning(f"Payment proof of booking {booking_id} reused by bookings {[d['id'] for d in duplicates]}")
+    return {"payment_proof_hash": booking["payment_proof_hash"], "duplicates": duplicates}
 
 @app.post("/verify-payment-otp")
 @app.post("/api/verify-payment-otp")
@@ -741,7 +932,10 @@ def verify_payment_otp(request: OTPVerification):
     logger.info(f"✓ OTP verification successful for booking ID: {booking_id}")
     
     # Update booking to pending approval
-    update_booking_status(booking_id, "pending_approval")
+    approved_booking = update_booking_status(booking_id, "pending_approval")
+    if approved_booking:
+        seat_state_changed(approved_booking['showtime_id'])
+    metrics.booking_status_changes_total.inc("pending_approval")
     
     # Get booking details for admin notification
     booking = get_booking_by_id(booking_id)
@@ -788,9 +982,45 @@ def verify_payment_otp(request: OTPVerification):
     
     return {"message": "Payment verified. Admin has been notified for approval."}
 
+def upload_ticket_to_storage(key, body):
+    """Mirror a rendered ticket (bytes or local path) to shared storage so other containers can serve it"""
+    key = f"tickets/{key}"
+    if storage.exists(key):
+        return
+    if isinstance(body, bytes):
+        storage.put(key, body, 'application/pdf')
+    else:
+        with open(body, "rb") as pdf:
+            storage.put(key, pdf, 'application/pdf')
+    logger.info(f"Ticket uploaded to {storage.name} storage: {key}")
+
+def mirror_ticket(key, body):
+    """upload_ticket_to_storage for background tasks: failures are logged, the next download renders again"""
+    try:
+        upload_ticket_to_storage(key, body)
+    except Exception as e:
+        logger.error(f"Ticket upload failed for {key}: {e}")
+
+async def cache_ticket_pdf(booking, showtime_layout):
+    """Render the ticket once on approval so downloads are served from cache"""
+    try:
+        key = ticket_cache_key(booking['id'], ticket_content_version(booking, showtime_layout))
+        if TICKET_RENDER_MODE == 'memory':
+            # Nothing to cache into without shared storage; downloads render on demand
+            if not storage.shared:
+                return
+            ticket = await render_ticket_bytes(booking, showtime_layout)
+        else:
+            ticket = await ensure_ticket_pdf(booking, showtime_layout)
+        logger.info(f"Ticket cached for booking {booking['id']}: {key}")
+        if storage.shared:
+            await asyncio.get_running_loop().run_in_executor(None, upload_ticket_to_storage, key, ticket)
+    except Exception as e:
+        logger.error(f"Ticket generation failed for booking {booking['id']}: {e}")
+
 @app.put("/booking/{booking_id}/action")
 @app.put("/api/booking/{booking_id}/action")
-def update_booking_action_endpoint(booking_id: int, action: BookingAction, admin: dict = Depends(get_current_admin)):
+def update_booking_action_endpoint(booking_id: int, action: BookingAction, background_tasks: BackgroundTasks, admin: dict = Depends(get_current_admin)):
     booking = get_booking_by_id(booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -801,16 +1031,24 @@ def update_booking_action_endpoint(booking_id: int, action: BookingAction, admin
     
     old_status = booking["status"]
     updated_booking = update_booking_status(booking_id, action.status, action.admin_remarks)
+    seat_state_changed(booking['showtime_id'])
+    booking_status_changed(booking['showtime_id'], booking_id, action.status)
     status = action.status
+    metrics.booking_status_changes_total.inc(status)
+    
+    if status in TICKET_STATUSES and updated_booking:
+        showtime_layout = get_showtime_layout(updated_booking['showtime_id'])
+        if showtime_layout:
+            background_tasks.add_task(cache_ticket_pdf, updated_booking, showtime_layout)
     
     return {"message": f"Booking status updated from {old_status} to {status}"}
 
 @app.put("/booking/{booking_id}/status")
 @app.put("/api/booking/{booking_id}/status")
-def update_booking_status_endpoint(booking_id: int, status: str, admin: dict = Depends(get_current_admin)):
+def update_booking_status_endpoint(booking_id: int, status: str, background_tasks: BackgroundTasks, admin: dict = Depends(get_current_admin)):
     """Legacy endpoint for backward compatibility"""
     action = BookingAction(status=status)
-    return update_booking_action_endpoint(booking_id, action, admin)
+    return update_booking_action_endpoint(booking_id, action, background_tasks, admin)
 
 # Send email notification on status change helper
 def send_status_change_email(booking_id, status, old_status):
@@ -839,6 +1077,7 @@ def send_status_change_email(booking_id, status, old_status):
                 <p><strong>Total Amount:</strong> Rp {booking['total_amount']:,}</p>
             </div>
             
+            <p><a href="{ticket_download_url(booking_id)}">Download your ticket (PDF)</a> and show its QR codes at the gate.</p>
             <p>Your tickets are confirmed! Enjoy the movie! 🍿</p>
             """
         elif status == "admin_rejected":
@@ -916,6 +1155,8 @@ def resend_confirmation_email(booking_id: int, admin: dict = Depends(get_current
             </table>
         </div>
         
+        <p><a href="{ticket_download_url(booking_id)}">Download your ticket (PDF)</a> and show its QR codes at the gate.</p>
+        
         <p>Thank you for choosing Bamboo Holiday Movies. Enjoy your movie experience!</p>
     </body>
     </html>
@@ -923,37 +1164,40 @@ def resend_confirmation_email(booking_id: int, admin: dict = Depends(get_current
     
     logger.info(f"Resending confirmation email for booking {booking_id} to {booking['customer_email']} with admin CC: {admin_email}")
     
-    if send_email(booking['customer_email'], subject, body, admin_email):
+    sent = send_email(booking['customer_email'], subject, body, admin_email)
+    if sent == EMAIL_SENT:
         return {"message": "Confirmation email resent successfully"}
+    elif sent == EMAIL_QUEUED:
+        from fastapi.responses import JSONResponse
+        return JSONResponse(status_code=202, content={
+            "message": "Email service unavailable, confirmation email queued for resending", "queued": True
+        })
     else:
         raise HTTPException(status_code=500, detail="Failed to resend confirmation email")
 
 @app.get("/bookings/stats")
 @app.get("/api/bookings/stats")
 def get_booking_stats(admin: dict = Depends(get_current_admin)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT status, COUNT(*) as count
-        FROM bookings
-        GROUP BY status
-    """)
-    stats = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    
-    return {stat['status']: stat['count'] for stat in stats}
+    return get_booking_status_counts()
+
+# Dashboard figures are shared by every admin and cheap to recompute, but
+# several tabs polling at once add up: serve them from cache briefly
+ANALYTICS_CACHE_TTL = float(os.getenv('ANALYTICS_CACHE_TTL', '10'))
+analytics_cache = TTLCache('analytics', ANALYTICS_CACHE_TTL, max_entries=1)
 
 @app.get("/analytics")
 @app.get("/api/analytics")
-def get_analytics_endpoint():
+def get_analytics_endpoint(admin: dict = Depends(get_current_admin)):
+    return analytics_cache.get_or_load('dashboard', load_analytics)
+
+def load_analytics():
     analytics = get_analytics()
     
     # Calculate occupancy rate considering disabled seats
     confirmed_seats = analytics.get('confirmed_bookings', 0)
     
     # Get total available seats across all active showtimes (excluding disabled seats)
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     cursor = conn.cursor()
     cursor.execute("""
         SELECT 
@@ -980,9 +1224,168 @@ def get_analytics_endpoint():
     }
 
 @app.get("/download-ticket/{booking_id}")
-def download_ticket(booking_id: int):
-    """Download PDF ticket for confirmed booking"""
-    raise HTTPException(status_code=501, detail="Ticket generation temporarily disabled")
+@app.get("/api/download-ticket/{booking_id}")
+async def download_ticket(booking_id: int, background_tasks: BackgroundTasks, token: Optional[str] = None):
+    """Download PDF ticket for confirmed booking (token from the emailed link)"""
+    # Checked first, so booking ids cannot be probed without a valid link
+    if not verify_ticket_download_token(booking_id, token):
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    loop = asyncio.get_running_loop()
+    booking = await loop.run_in_executor(None, get_booking_by_id, booking_id)
+    if not booking or booking["status"] not in TICKET_STATUSES:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    
+    showtime_layout = await loop.run_in_executor(None, get_showtime_layout, booking['showtime_id'])
+    if not showtime_layout:
+        raise HTTPException(status_code=404, detail="Showtime information not found")
+    
+    from fastapi.responses import FileResponse, StreamingResponse
+    filename = f"ticket_{booking_id}.pdf"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    version = ticket_content_version(booking, showtime_layout)
+    key = ticket_cache_key(booking_id, version)
+    
+    # Rendered by another container? Stream it from shared storage instead of re-rendering
+    if storage.shared and (TICKET_RENDER_MODE == 'memory' or not os.path.exists(ticket_cache_path(booking_id, version))):
+        try:
+            chunks, _ = await loop.run_in_executor(None, storage.stream, f"tickets/{key}")
+            return StreamingResponse(chunks, media_type='application/pdf', headers=headers)
+        except StorageError:
+            pass
+    
+    try:
+        if TICKET_RENDER_MODE == 'memory':
+            pdf_bytes = await render_ticket_bytes(booking, showtime_layout)
+        else:
+            path = await ensure_ticket_pdf(booking, showtime_layout)
+    except Exception as e:
+        logger.error(f"Ticket generation failed for booking {booking_id}: {e}")
+        raise HTTPException(status_code=500, detail="Ticket generation failed")
+    
+    if TICKET_RENDER_MODE == 'memory':
+        if storage.shared:
+            # After the response, within the request: failures are logged and shutdown waits for it
+            background_tasks.add_task(mirror_ticket, key, pdf_bytes)
+        # No Content-Length, so the buffer goes out with chunked transfer encoding
+        return StreamingResponse(iter_pdf_chunks(pdf_bytes), media_type='application/pdf', headers=headers)
+    return FileResponse(path, media_type='application/pdf', filename=filename)
+
+@app.post("/checkin")
+@app.post("/api/checkin")
+def checkin_endpoint(request: CheckinRequest, admin: dict = Depends(get_current_admin)):
+    """Gate scan: verify the signed seat token and admit it once"""
+    result = check_in(request.token.strip(), request.gate)
+    if result['status'] == 'invalid':
+        raise HTTPException(status_code=400, detail="Invalid ticket")
+    if result['status'] == 'revoked':
+        raise HTTPException(status_code=403, detail=f"Booking {result['booking_id']} is no longer valid")
+    if result['status'] == 'duplicate':
+        raise HTTPException(status_code=409, detail=f"Seat {result['seat']} already checked in")
+    return result
+
+CHECKIN_BATCH_LIMIT = 5000
+
+@app.post("/checkin/batch")
+@app.post("/api/checkin/batch")
+def checkin_batch_endpoint(batch: CheckinBatch, admin: dict = Depends(get_current_admin)):
+    """Bulk upload of scans recorded by offline scanners"""
+    if len(batch.checkins) > CHECKIN_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {CHECKIN_BATCH_LIMIT} check-ins per batch")
+    
+    results = []
+    counts = {'admitted': 0, 'duplicate': 0, 'revoked': 0, 'invalid': 0}
+    scans = [(item.token.strip(), item.scanned_at) for item in batch.checkins]
+    for item, result in zip(batch.checkins, check_in_many(scans, batch.gate)):
+        counts[result['status']] += 1
+        results.append({'token': item.token, 'status': result['status'], 'seat': result.get('seat')})
+    
+    logger.info(f"Check-in batch from gate {batch.gate}: {counts}")
+    return {**counts, 'results': results}
+
+@app.get("/admin/showtime/{showtime_id}/scanner-manifest")
+@app.get("/api/admin/showtime/{showtime_id}/scanner-manifest")
+def get_scanner_manifest(showtime_id: int, admin: dict = Depends(get_current_admin)):
+    """Signed list of valid seat tokens for offline scanners"""
+    if not get_showtime_by_id(showtime_id):
+        raise HTTPException(status_code=404, detail="Showtime not found")
+    
+    # Read before the seats, so a change made meanwhile gets a newer version
+    version = get_showtime_bookings_version(showtime_id)
+    manifest = build_scanner_manifest(showtime_id, iter_showtime_ticket_seats(showtime_id), version)
+    
+    from fastapi.responses import Response
+    return Response(
+        content=manifest,
+        media_type='application/octet-stream',
+        headers={
+            "Content-Disposition": f'attachment; filename="scanner-manifest-{showtime_id}-{version}.bin"',
+            "ETag": f'"{showtime_id}-{version}"',
+            "X-Manifest-Version": str(version),
+        }
+    )
+
+@app.get("/admin/showtime/{showtime_id}/scanner-key")
+@app.get("/api/admin/showtime/{showtime_id}/scanner-key")
+def get_scanner_key(showtime_id: int, admin: dict = Depends(get_current_admin)):
+    """Key for provisioning scanners to verify this showtime's manifest"""
+    return {"showtime_id": showtime_id, "scanner_key": scanner_key(showtime_id).hex()}
+
+@app.get("/admin/slow-queries")
+@app.get("/api/admin/slow-queries")
+def list_slow_queries(order: str = "total", limit: int = 50, admin: dict = Depends(get_current_admin)):
+    """Slowest statements seen in production, aggregated by normalized SQL"""
+    if order not in SLOW_QUERY_ORDERS:
+        raise HTTPException(status_code=400, detail=f"order must be one of {', '.join(SLOW_QUERY_ORDERS)}")
+    return {"threshold_ms": slow_queries.SLOW_QUERY_MS, "queries": get_slow_queries(order, max(1, min(limit, 500)))}
+
+@app.get("/admin/slow-queries/{fingerprint}")
+@app.get("/api/admin/slow-queries/{fingerprint}")
+def get_slow_query_plan(fingerprint: str, admin: dict = Depends(get_current_admin)):
+    """One slow statement with its last captured EXPLAIN plan"""
+    entry = get_slow_query(fingerprint)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Slow query not found")
+    return entry
+
+@app.get("/admin/dependencies")
+@app.get("/api/admin/dependencies")
+def get_dependencies(admin: dict = Depends(get_current_admin)):
+    """Circuit breaker and bulkhead state of S3/SES, replica lag, plus what is waiting to be caught up"""
+    return {
+        "dependencies": dependencies_snapshot(),
+        "replicas": database.replicas_snapshot(),
+        "admission": admission.controller.snapshot(),
+        "email_outbox": get_email_outbox_stats(),
+        "pending_uploads": len(get_payment_proofs_under(fallback_storage.url(''))),
+    }
+
+@app.get("/admin/warmup")
+@app.get("/api/admin/warmup")
+def get_warmup_report(admin: dict = Depends(get_current_admin)):
+    """Last showtime cache warm-up of this worker: duration, showtimes and memory"""
+    return {"startup": warm_state, "last": warmup.last_report, "cache_entries": cache_sizes()}
+
+@app.post("/admin/warmup")
+@app.post("/api/admin/warmup")
+def run_warmup(days: int = warmup.WARMUP_DAYS, admin: dict = Depends(get_current_admin)):
+    """Warm this worker's showtime caches now, e.g. right before a ticket launch"""
+    return warmup.warm_upcoming_showtimes(max(0, min(days, 90)))
+
+@app.get("/admin/profiles")
+@app.get("/api/admin/profiles")
+def list_request_profiles(admin: dict = Depends(get_current_admin)):
+    """Stored request profiles, newest first"""
+    return {"profiles": profiler.list_profiles()}
+
+@app.get("/admin/profiles/{profile_id}")
+@app.get("/api/admin/profiles/{profile_id}")
+def download_request_profile(profile_id: str, admin: dict = Depends(get_current_admin)):
+    """Collapsed-stack profile for flamegraph.pl / speedscope"""
+    path = profiler.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    from fastapi.responses import FileResponse
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
 
 # Admin management endpoints
 @app.get("/admin/movies")
@@ -990,10 +1393,36 @@ def download_ticket(booking_id: int):
 def get_movies():
     return get_all_movies()
 
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+@app.get("/metrics")
+def metrics_endpoint(request: Request):
+    """Prometheus text exposition of all workers' metrics"""
+    if METRICS_TOKEN and request.headers.get('authorization') != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Authentication required")
+    from fastapi.responses import PlainTextResponse
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/test")
 def test_endpoint():
     return {"message": "Test endpoint working"}
 
+@app.get("/healthz")
+@app.get("/api/healthz")
+async def liveness():
+    """Liveness: the event loop answers; no I/O, so a slow database never gets the process restarted"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+@app.get("/api/readyz")
+def readiness():
+    """Readiness: database, email outbox, warm-up and S3/SES breakers (cached briefly)"""
+    ready, report = health.readiness(warm_state)
+    if not ready:
+        from fastapi.responses import JSONResponse
+        return JSONResponse(status_code=503, content=report)
+    return report
+
 @app.post("/admin/movies")
 @app.post("/api/admin/movies")
 def create_movie_endpoint(movie: MovieCreate):
@@ -1016,6 +1445,7 @@ def update_movie_endpoint(movie_id: int, movie: MovieCreate):
     conn.commit()
     cursor.close()
     conn.close()
+    invalidate_layouts()
     return {"message": "Movie updated successfully"}
 
 @app.delete("/admin/movies/{movie_id}")
@@ -1026,6 +1456,7 @@ def delete_movie_endpoint(movie_id: int):
     conn.commit()
     cursor.close()
     conn.close()
+    invalidate_layouts()
     return {"message": "Movie deleted successfully"}
 
 @app.get("/admin/theaters")
@@ -1033,9 +1464,17 @@ def delete_movie_endpoint(movie_id: int):
 def get_theaters():
     return get_all_theaters()
 
+def validate_theater_layout(theater):
+    """Every seat must be expressible as a gate token, or its ticket cannot be rendered"""
+    try:
+        check_layout(theater.rows, theater.left_cols, theater.right_cols)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/admin/theaters")
 @app.post("/api/admin/theaters")
 def create_theater_endpoint(theater: TheaterCreate):
+    validate_theater_layout(theater)
     theater_id = create_theater(
         theater.name, theater.address, theater.rows,
         theater.left_cols, theater.right_cols, theater.non_selectable_seats
@@ -1044,6 +1483,7 @@ def create_theater_endpoint(theater: TheaterCreate):
 
 @app.put("/admin/theaters/{theater_id}")
 def update_theater(theater_id: int, theater: TheaterCreate):
+    validate_theater_layout(theater)
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute("""
@@ -1055,6 +1495,7 @@ def update_theater(theater_id: int, theater: TheaterCreate):
     conn.commit()
     cursor.close()
     conn.close()
+    invalidate_layouts()
     return {"message": "Theater updated successfully"}
 
 @app.delete("/admin/theaters/{theater_id}")
@@ -1065,6 +1506,7 @@ def delete_theater(theater_id: int):
     conn.commit()
     cursor.close()
     conn.close()
+    invalidate_layouts()
     return {"message": "Theater deleted successfully"}
 
 @app.get("/admin/showtimes")
@@ -1089,6 +1531,7 @@ def delete_showtime(showtime_id: int):
     conn.commit()
     cursor.close()
     conn.close()
+    invalidate_layouts()
     return {"message": "Showtime deleted successfully"}
 
 # Admin settings endpoints
@@ -1120,6 +1563,82 @@ def update_admin_settings_endpoint(settings: AdminSettingsUpdate):
     
     return {"message": "Admin settings updated successfully"}
 
+# Threads per worker process for sync endpoints (set by run.py)
+THREADPOOL_SIZE = int(os.getenv('THREADPOOL_SIZE', '40'))
+
+@app.on_event("startup")
+async def configure_threadpool():
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+@app.on_event("startup")
+def start_background_workers():
+    """Start per-process background threads (after any fork, e.g. with a preloaded app)"""
+    start_log_listener()
+    metrics.start_metrics_flusher()
+    start_recovery_worker(mailer, storage, fallback_storage)
+
+# Filled in by warm_up(); the server accepts traffic once startup hooks return
+warm_state = {"warm": False, "duration_ms": None, "steps": {}}
+
+# Steps run by warm_up(), in order. Storage and email have fallbacks (local
+# storage, the outbox), so while they fail the instance is degraded, not unready.
+WARM_STEPS = {
+    "storage": storage.resolve,
+    "mailer": mailer.resolve,
+    "auth": lambda: [importlib.import_module(name) for name in ('jwt', 'bcrypt')],
+    "db_pool": fill_pool,
+    "showtimes": warmup.warm_upcoming_showtimes,
+}
+DEGRADABLE_WARM_STEPS = ("storage", "mailer")
+
+def failed_warm_steps():
+    return [name for name, value in warm_state["steps"].items() if isinstance(value, str)]
+
+def run_warm_steps(names):
+    """Run warm-up steps, recording each one's duration (ms) or failure in warm_state"""
+    steps = warm_state["steps"]
+    for name in names:
+        step_started = time.perf_counter()
+        try:
+            WARM_STEPS[name]()
+            steps[name] = round((time.perf_counter() - step_started) * 1000, 1)
+        except Exception as e:
+            steps[name] = f"failed: {e}"
+            logger.warning(f"Warm-up step {name} failed: {e}")
+    warm_state["warm"] = all(name in DEGRADABLE_WARM_STEPS for name in failed_warm_steps())
+
+@app.on_event("startup")
+def warm_up():
+    """Pay one-off costs before the first request: backends, auth modules, DB pool, showtime caches"""
+    started = time.perf_counter()
+    run_warm_steps(WARM_STEPS)
+    warm_state["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    # A backend that failed to resolve would only raise again here
+    storage_name = storage.name if storage.resolved else "unavailable"
+    mailer_name = mailer.name if mailer.resolved else "unavailable"
+    logger.info(f"Warm-up finished in {warm_state['duration_ms']}ms - storage: {storage_name}, email: {mailer_name}, steps: {warm_state['steps']}")
+    warmup.start_warmup_scheduler(retry=retry_warm_up)
+
+def retry_warm_up():
+    """Re-run the warm-up steps that failed; called periodically by the warm-up scheduler"""
+    failed = failed_warm_steps()
+    if failed:
+        run_warm_steps(failed)
+        recovered = [name for name in failed if name not in failed_warm_steps()]
+        if recovered:
+            logger.info(f"Warm-up steps recovered: {', '.join(recovered)}")
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    """Let background worker pools finish queued jobs"""
+    stop_recovery_worker()
+    warmup.stop_warmup_scheduler()
+    shutdown_ingest_pool()
+    shutdown_ticket_pool()
+    metrics.write_snapshot()
+    stop_log_listener()
+
 # Serve React static files at the end - only for production
 # Comment this out for development to avoid conflicts with API routes
 # if os.path.exists("static"):
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Cold-start measurement for the API process.
+
+  import profile       `python -X importtime -c "import main"`, the slowest
+                       modules by cumulative import time
+  time to first request  from spawning uvicorn until the first response,
+                       then the latency of the first real API call
+
+Both use the in-memory storage and email backends (override with
+STORAGE_BACKEND / EMAIL_BACKEND) and the Postgres configured in .env.
+Startup includes the warm-up hook, so time to first request is also the time
+until the readiness probe can pass.
+
+Usage: python measure_startup.py [--runs 3] [--top 15] [--port 8767] [--json startup.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV = {'STORAGE_BACKEND': 'memory', 'EMAIL_BACKEND': 'memory', **os.environ}
+
+def import_profile():
+    """(wall seconds, [(cumulative_us, self_us, module)]) for importing main"""
+    script = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=BACKEND_DIR, env=ENV, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        modules.append((int(cumulative_us), int(self_us), name))
+    return float(result.stdout.strip().splitlines()[-1]), modules
+
+def get(url, timeout=5):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+def first_request(port, path, timeout=60):
+    """(seconds until the server answers, seconds for the first call to path)"""
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=ENV
+    )
+    try:
+        while True:
+            try:
+                get(f"{base}/api/", timeout=1)
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if time.perf_counter() - started > timeout or server.poll() is not None:
+                    raise RuntimeError("API server did not start")
+                time.sleep(0.02)
+        ready = time.perf_counter() - started
+        call_started = time.perf_counter()
+        get(f"{base}{path}")
+        return ready, time.perf_counter() - call_started
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--path', default='/api/showtimes', help='first API call to time')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    wall, modules = import_profile()
+    print(f"import main: {wall * 1000:.0f}ms\n")
+    print(f"{'cumulative':>11} {'self':>9}  module")
+    for cumulative_us, self_us, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>9.1f}ms {self_us / 1000:>7.1f}ms  {name}")
+
+    runs = [first_request(args.port, args.path) for _ in range(args.runs)]
+    ready = statistics.median(run[0] for run in runs)
+    first_call = statistics.median(run[1] for run in runs)
+    print(f"\ntime to first response: {ready * 1000:.0f}ms (median of {args.runs})")
+    print(f"first {args.path}: {first_call * 1000:.1f}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'import_ms': round(wall * 1000, 1),
+                'slowest_imports': [
+                    {'module': name.strip(), 'cumulative_ms': cumulative_us / 1000, 'self_ms': self_us / 1000}
+                    for cumulative_us, self_us, name in sorted(modules, reverse=True)[:args.top]
+                ],
+                'time_to_first_response_ms': round(ready * 1000, 1),
+                'first_call_ms': round(first_call * 1000, 1),
+            }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Prometheus-style metrics without external dependencies.
+#
+# Hot-path updates are lock-free: every thread writes only to its own cell
+# (a plain list), and readers sum the cells. Locks are only taken the first
+# time a thread touches a metric/label combination.
+#
+# With several uvicorn workers, set METRICS_DIR to a directory shared by the
+# workers (cleared on deploy): each process periodically writes a snapshot
+# there and /metrics merges them. Counters and histograms of exited workers
+# are kept, their gauges are dropped.
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+class _Cells:
+    """Per-thread value slots for one label combination"""
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._cells = []
+        self._lock = threading.Lock()
+
+    def cell(self):
+        cell = getattr(self._local, 'cell', None)
+        if cell is None:
+            cell = [0.0] * self._size
+            with self._lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+        return cell
+
+    def totals(self):
+        with self._lock:
+            cells = list(self._cells)
+        return [sum(values) for values in zip(*cells)] if cells else [0.0] * self._size
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _size(self):
+        return 1
+
+    def _child(self, label_values):
+        child = self._children.get(label_values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(label_values, _Cells(self._size()))
+        return child
+
+    def snapshot(self):
+        """{label_values: [values]} for this process"""
+        return {key: child.totals() for key, child in list(self._children.items())}
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        self._child(label_values).cell()[0] += amount
+
+class Gauge(_Metric):
+    """Gauge updated with inc/dec, or sampled from a callback at scrape time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels)
+        self._function = function
+
+    def inc(self, *label_values, amount=1):
+        self._child(label_values).cell()[0] += amount
+
+    def dec(self, *label_values, amount=1):
+        self._child(label_values).cell()[0] -= amount
+
+    def set_function(self, function):
+        """function() -> {label_values_tuple: value}"""
+        self._function = function
+
+    def snapshot(self):
+        if self._function is None:
+            return super().snapshot()
+        try:
+            return {key: [float(value)] for key, value in self._function().items()}
+        except Exception:
+            return {}
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labels)
+
+    def _size(self):
+        # one slot per bucket, +Inf, sum, count
+        return len(self.buckets) + 3
+
+    def observe(self, value, *label_values):
+        cell = self._child(label_values).cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+class track_time:
+    """Context manager observing elapsed seconds into a histogram"""
+
+    def __init__(self, histogram, *label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+# Application metrics
+http_requests_total = Counter('http_requests_total', 'HTTP requests', ('method', 'route', 'status'))
+http_request_duration = Histogram('http_request_duration_seconds', 'HTTP request latency', ('method', 'route'))
+http_requests_in_flight = Gauge('http_requests_in_flight', 'HTTP requests being served')
+admission_in_flight = Gauge('admission_in_flight', 'Admitted requests per route class', ('route_class',))
+admission_queue_delay = Histogram('admission_queue_delay_seconds', 'Time waiting for admission', ('route_class',))
+admission_rejections_total = Counter('admission_rejections_total', 'Requests shed by admission control', ('route_class', 'reason'))
+request_db_queries = Histogram('http_request_db_queries', 'Database queries per request', ('route',),
+                               buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+request_db_seconds = Histogram('http_request_db_seconds', 'Database time per request', ('route',))
+db_queries_total = Counter('db_queries_total', 'Database statements executed')
+db_query_duration = Histogram('db_query_duration_seconds', 'Database statement latency', ('target',))
+db_connect_duration = Histogram('db_connect_duration_seconds', 'Time to open a database connection', ('target',))
+db_connections_opened = Counter('db_connections_opened_total', 'Database connections opened')
+db_connections_open = Gauge('db_connections_open', 'Database connections currently open')
+db_pool_idle = Gauge('db_pool_idle', 'Idle database connections in the pool', ('target',))
+db_pool_reused = Counter('db_pool_reused_total', 'Database connections reused from the pool')
+db_pool_dead_total = Counter('db_pool_dead_total', 'Idle pooled connections found dead and discarded')
+db_pool_timeouts_total = Counter('db_pool_timeouts_total', 'Connection requests that found DB_POOL_MAX_OPEN in use', ('target',))
+db_replica_lag = Gauge('db_replica_lag_seconds', 'Last measured replication lag', ('target',))
+db_read_routes_total = Counter('db_read_routes_total', 'Readonly queries by database target', ('target', 'reason'))
+cache_requests_total = Counter('cache_requests_total', 'In-process cache lookups', ('cache', 'result'))
+cache_entries = Gauge('cache_entries', 'Entries held in an in-process cache', ('cache',))
+external_call_duration = Histogram('external_call_duration_seconds', 'AWS API call latency', ('service', 'operation'))
+external_call_errors = Counter('external_call_errors_total', 'Failed AWS API calls', ('service', 'operation'))
+storage_operation_duration = Histogram('storage_operation_duration_seconds', 'Object storage latency', ('backend', 'operation'))
+storage_errors_total = Counter('storage_errors_total', 'Failed object storage operations', ('backend', 'operation'))
+email_send_duration = Histogram('email_send_duration_seconds', 'Email send latency', ('backend',))
+email_errors_total = Counter('email_errors_total', 'Failed email sends', ('backend',))
+circuit_breaker_state = Gauge('circuit_breaker_state', 'Circuit breaker state (0 closed, 1 half-open, 2 open)', ('dependency',))
+bulkhead_in_flight = Gauge('bulkhead_in_flight', 'Calls running or queued in a dependency bulkhead', ('dependency',))
+dependency_rejections_total = Counter('dependency_rejections_total', 'Dependency calls failed fast', ('dependency', 'reason'))
+seat_holds_total = Counter('seat_holds_total', 'Seat hold requests', ('result',))
+seats_held_total = Counter('seats_held_total', 'Seats placed on hold')
+bookings_created_total = Counter('bookings_created_total', 'Bookings created')
+booking_status_changes_total = Counter('booking_status_changes_total', 'Booking status transitions', ('status',))
+
+# Per-request database accounting: [queries, seconds], shared with threadpool workers
+_request_db = contextvars.ContextVar('request_db', default=None)
+
+def start_request_db_stats():
+    stats = [0, 0.0]
+    _request_db.set(stats)
+    return stats
+
+def record_query(seconds, target='primary'):
+    """Called by the database layer for every statement"""
+    db_queries_total.inc()
+    db_query_duration.observe(seconds, target)
+    stats = _request_db.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += seconds
+
+def instrument_boto_client(client, service):
+    """Record latency/errors of every API call made by a boto3 client"""
+
+    def before_call(context=None, **kwargs):
+        if context is not None:
+            context['metrics_started'] = time.perf_counter()
+
+    def after_call(http_response=None, model=None, context=None, **kwargs):
+        if context is None or 'metrics_started' not in context:
+            return
+        operation = model.name if model is not None else 'unknown'
+        external_call_duration.observe(time.perf_counter() - context.pop('metrics_started'), service, operation)
+        if http_response is None or http_response.status_code >= 400:
+            external_call_errors.inc(service, operation)
+
+    client.meta.events.register('before-call.*.*', before_call)
+    client.meta.events.register('after-call.*.*', after_call)
+    client.meta.events.register('after-call-error.*.*', after_call)
+    return client
+
+# Exposition
+def _snapshot():
+    return {
+        metric.name: {
+            'kind': metric.kind,
+            'help': metric.documentation,
+            'labels': list(metric.labels),
+            'buckets': list(getattr(metric, 'buckets', ())),
+            'samples': {json.dumps(list(key)): values for key, values in metric.snapshot().items()},
+        }
+        for metric in list(_registry)
+    }
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except (OSError, ValueError):
+        return False
+
+def _merged_snapshot():
+    merged = _snapshot()
+    if not METRICS_DIR:
+        return merged
+    for path in glob.glob(os.path.join(METRICS_DIR, 'metrics-*.json')):
+        pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+        if pid == os.getpid():
+            continue
+        try:
+            with open(path) as f:
+                other = json.load(f)
+        except (OSError, ValueError):
+            continue
+        alive = _pid_alive(pid)
+        for name, data in other.items():
+            if name not in merged or (data['kind'] == 'gauge' and not alive):
+                continue
+            samples = merged[name]['samples']
+            for key, values in data['samples'].items():
+                current = samples.get(key)
+                samples[key] = [a + b for a, b in zip(current, values)] if current else values
+    return merged
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def render_metrics():
+    """All metrics in Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name, data in _merged_snapshot().items():
+        lines.append(f"# HELP {name} {data['help']}")
+        lines.append(f"# TYPE {name} {data['kind']}")
+        for key, values in sorted(data['samples'].items()):
+            label_values = json.loads(key)
+            if data['kind'] != 'histogram':
+                lines.append(f"{name}{_format_labels(data['labels'], label_values)} {_format_value(values[0])}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(data['buckets']) + ['+Inf'], values[:-2]):
+                cumulative += count
+                le = ('le', bound if bound == '+Inf' else _format_value(bound))
+                lines.append(f"{name}_bucket{_format_labels(data['labels'], label_values, le)} {_format_value(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(data['labels'], label_values)} {_format_value(values[-2])}")
+            lines.append(f"{name}_count{_format_labels(data['labels'], label_values)} {_format_value(values[-1])}")
+    return '\n'.join(lines) + '\n'
+
+# Multi-worker snapshots
+_flusher = None
+_flusher_pid = None
+
+def write_snapshot():
+    """Publish this process's metrics for the other workers to merge"""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"metrics-{os.getpid()}.json")
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(_snapshot(), f)
+    os.replace(f"{path}.tmp", path)
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            write_snapshot()
+        except OSError:
+            pass
+
+def start_metrics_flusher():
+    """Start the snapshot writer (once per process) when METRICS_DIR is set"""
+    global _flusher, _flusher_pid
+    if not METRICS_DIR or (_flusher is not None and _flusher_pid == os.getpid()):
+        return
+    _flusher = threading.Thread(target=_flush_loop, name="metrics-flusher", daemon=True)
+    _flusher.start()
+    _flusher_pid = os.getpid()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the analytics_counters table, the triggers that keep it
+in step with bookings, and an initial backfill from the existing bookings
+"""
+
+from database import get_db_connection, ANALYTICS_COUNTERS_REBUILD_SQL
+
+def run_migration():
+    """Run the migration to add analytics_counters"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # No booking writes between creating the triggers and the backfill
+        cursor.execute("LOCK TABLE bookings IN SHARE MODE")
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analytics_counters (
+                showtime_id INTEGER NOT NULL,
+                status VARCHAR(50) NOT NULL,
+                bookings BIGINT NOT NULL DEFAULT 0,
+                seats BIGINT NOT NULL DEFAULT 0,
+                revenue BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (showtime_id, status)
+            )
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION bump_analytics_counters(p_showtime_id INTEGER, p_status VARCHAR, p_bookings INTEGER, p_seats BIGINT, p_revenue BIGINT)
+            RETURNS void AS $$
+            BEGIN
+                INSERT INTO analytics_counters (showtime_id, status, bookings, seats, revenue)
+                VALUES (p_showtime_id, p_status, p_bookings, p_seats, p_revenue)
+                ON CONFLICT (showtime_id, status) DO UPDATE SET
+                    bookings = analytics_counters.bookings + EXCLUDED.bookings,
+                    seats = analytics_counters.seats + EXCLUDED.seats,
+                    revenue = analytics_counters.revenue + EXCLUDED.revenue;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION maintain_analytics_counters()
+            RETURNS TRIGGER AS $$
+            DECLARE
+                old_key TEXT;
+                new_key TEXT;
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    PERFORM bump_analytics_counters(COALESCE(NEW.showtime_id, 0), NEW.status, 1, COALESCE(array_length(NEW.seats, 1), 0), NEW.total_amount);
+                ELSIF TG_OP = 'DELETE' THEN
+                    PERFORM bump_analytics_counters(COALESCE(OLD.showtime_id, 0), OLD.status, -1, -COALESCE(array_length(OLD.seats, 1), 0), -OLD.total_amount);
+                ELSE
+                    old_key := lpad(COALESCE(OLD.showtime_id, 0)::text, 10, '0') || OLD.status;
+                    new_key := lpad(COALESCE(NEW.showtime_id, 0)::text, 10, '0') || NEW.status;
+                    IF old_key <= new_key THEN
+                        PERFORM bump_analytics_counters(COALESCE(OLD.showtime_id, 0), OLD.status, -1, -COALESCE(array_length(OLD.seats, 1), 0), -OLD.total_amount);
+                        PERFORM bump_analytics_counters(COALESCE(NEW.showtime_id, 0), NEW.status, 1, COALESCE(array_length(NEW.seats, 1), 0), NEW.total_amount);
+                    ELSE
+                        PERFORM bump_analytics_counters(COALESCE(NEW.showtime_id, 0), NEW.status, 1, COALESCE(array_length(NEW.seats, 1), 0), NEW.total_amount);
+                        PERFORM bump_analytics_counters(COALESCE(OLD.showtime_id, 0), OLD.status, -1, -COALESCE(array_length(OLD.seats, 1), 0), -OLD.total_amount);
+                    END IF;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute("DROP TRIGGER IF EXISTS bookings_analytics_counters ON bookings")
+        cursor.execute("""
+            CREATE TRIGGER bookings_analytics_counters
+                AFTER INSERT OR DELETE ON bookings
+                FOR EACH ROW
+                EXECUTE FUNCTION maintain_analytics_counters()
+        """)
+        cursor.execute("DROP TRIGGER IF EXISTS bookings_analytics_counters_update ON bookings")
+        cursor.execute("""
+            CREATE TRIGGER bookings_analytics_counters_update
+                AFTER UPDATE OF showtime_id, status, seats, total_amount ON bookings
+                FOR EACH ROW
+                WHEN ((OLD.showtime_id, OLD.status, OLD.seats, OLD.total_amount) IS DISTINCT FROM (NEW.showtime_id, NEW.status, NEW.seats, NEW.total_amount))
+                EXECUTE FUNCTION maintain_analytics_counters()
+        """)
+        cursor.execute(ANALYTICS_COUNTERS_REBUILD_SQL)
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        print("✓ Migration completed successfully")
+        print("✓ Added analytics_counters table and triggers, backfilled from bookings")
+        
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the composite indexes behind the admin bookings listing
+(keyset pagination on created_at, id, optionally filtered by status or showtime).
+
+Indexes are built CONCURRENTLY so bookings stay writable while they build.
+"""
+
+from database import get_db_connection
+
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bookings_created_id ON bookings(created_at DESC, id DESC)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bookings_status_created_id ON bookings(status, created_at DESC, id DESC)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bookings_showtime_created_id ON bookings(showtime_id, created_at DESC, id DESC)",
+    # Covered by idx_bookings_created_id
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_bookings_created_at",
+]
+
+def run_migration():
+    """Run the migration to add the bookings listing indexes"""
+    try:
+        conn = get_db_connection()
+        # CONCURRENTLY cannot run inside a transaction block
+        conn.autocommit = True
+        cursor = conn.cursor()
+        
+        for statement in INDEXES:
+            cursor.execute(statement)
+        
+        cursor.close()
+        conn.autocommit = False
+        conn.close()
+        
+        print("✓ Migration completed successfully")
+        print("✓ Added bookings listing indexes (created_at, id), (status, ...), (showtime_id, ...)")
+        
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the checkins table (gate scan log)
+"""
+
+from database import get_db_connection
+
+def run_migration():
+    """Run the migration to add checkins table"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Append-only; no foreign key so scans never touch bookings
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS checkins (
+                id BIGSERIAL PRIMARY KEY,
+                showtime_id INTEGER NOT NULL,
+                booking_id INTEGER NOT NULL,
+                seat_index INTEGER NOT NULL,
+                seat_id VARCHAR(10) NOT NULL,
+                gate VARCHAR(50),
+                scanned_at TIMESTAMP NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (showtime_id, seat_index)
+            )
+        """)
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        print("✓ Migration completed successfully")
+        print("✓ Added checkins table")
+        
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
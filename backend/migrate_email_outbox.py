@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the email_outbox table (emails queued while SES is unavailable)
+"""
+
+from database import get_db_connection
+
+def run_migration():
+    """Run the migration to add email_outbox table"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id BIGSERIAL PRIMARY KEY,
+                to_email VARCHAR(255) NOT NULL,
+                cc_email VARCHAR(255),
+                subject TEXT NOT NULL,
+                html TEXT NOT NULL,
+                text_body TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_at TIMESTAMP
+            )
+        """)
+        # Messages given up on after EMAIL_MAX_ATTEMPTS
+        cursor.execute("""
+            ALTER TABLE email_outbox
+            ADD COLUMN IF NOT EXISTS dead_at TIMESTAMP
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(next_attempt_at) WHERE sent_at IS NULL
+        """)
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        print("✓ Migration completed successfully")
+        print("✓ Added email_outbox table")
+        print("✓ Added email_outbox dead_at column")
+        
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Migration script to add payment_proof_hash column to bookings table
+"""
+
+from database import get_db_connection
+
+def run_migration():
+    """Run the migration to add payment_proof_hash column"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Add payment_proof_hash column (sha256 hex of the uploaded bytes)
+        cursor.execute("""
+            ALTER TABLE bookings 
+            ADD COLUMN IF NOT EXISTS payment_proof_hash VARCHAR(64)
+        """)
+        
+        # Index for spotting the same proof reused across bookings
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_bookings_payment_proof_hash 
+            ON bookings(payment_proof_hash)
+        """)
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        print("✓ Migration completed successfully")
+        print("✓ Added payment_proof_hash column to bookings table")
+        print("✓ Added payment proof hash index")
+        
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
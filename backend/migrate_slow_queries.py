@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the slow_queries table (slow-query log with plans)
+"""
+
+from database import get_db_connection
+
+def run_migration():
+    """Run the migration to add slow_queries table"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS slow_queries (
+                fingerprint VARCHAR(32) PRIMARY KEY,
+                query TEXT NOT NULL,
+                calls BIGINT NOT NULL DEFAULT 0,
+                total_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+                max_ms DOUBLE PRECISION NOT NULL DEFAULT 0,
+                last_ms DOUBLE PRECISION,
+                param_shape JSONB,
+                plan_kind VARCHAR(10),
+                plan JSONB,
+                plan_captured_at TIMESTAMP,
+                first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        print("✓ Migration completed successfully")
+        print("✓ Added slow_queries table")
+        
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,154 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+# On-demand request profiling for admins. A sampler thread snapshots the
+# Python stacks of the event loop, threadpool and S3/SES bulkhead threads while the request
+# runs and folds them into the collapsed-stack format read by flamegraph.pl,
+# speedscope and inferno ("frame;frame;frame count" per line).
+#
+# Sampling costs nothing outside profiled requests. Profiles are rate limited
+# (token bucket) and only one runs at a time, so the switch can stay enabled
+# in production; other requests served meanwhile may show up in the samples.
+
+PROFILE_DIR = Path(os.getenv('PROFILE_DIR', 'profiles'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '2'))
+PROFILE_RATE_PER_MINUTE = float(os.getenv('PROFILE_RATE_PER_MINUTE', '6'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
+
+_active = threading.Lock()
+_bucket_lock = threading.Lock()
+_tokens = PROFILE_RATE_PER_MINUTE
+_refilled_at = time.monotonic()
+
+def acquire():
+    """Reserve a profiling slot; None if rate limited or another profile is running"""
+    global _tokens, _refilled_at
+    with _bucket_lock:
+        now = time.monotonic()
+        _tokens = min(PROFILE_RATE_PER_MINUTE, _tokens + (now - _refilled_at) * PROFILE_RATE_PER_MINUTE / 60)
+        _refilled_at = now
+        if _tokens < 1:
+            return 'rate-limited'
+        if not _active.acquire(blocking=False):
+            return 'busy'
+        _tokens -= 1
+    return None
+
+def release():
+    _active.release()
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _is_idle(frame):
+    """Event loop polling for events, or a threadpool or bulkhead worker waiting for work"""
+    code = frame.f_code
+    if code.co_name == 'select' and code.co_filename.endswith('selectors.py'):
+        return True
+    if code.co_name == '_worker' and code.co_filename.endswith(os.path.join('concurrent', 'futures', 'thread.py')):
+        # Blocked in its work queue's get(), which has no Python frame
+        return True
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == 'get' and code.co_filename.endswith('queue.py'):
+            caller = frame.f_back
+            return caller is not None and caller.f_code.co_name == 'run' and 'anyio' in caller.f_code.co_filename
+        frame = frame.f_back
+    return False
+
+def _is_request_thread(thread):
+    # Bulkhead threads (resilience.Dependency) make the S3/SES calls for requests
+    return (thread is threading.main_thread() or thread.name.startswith('AnyIO worker thread')
+            or thread.name.startswith('bulkhead-'))
+
+class Sampler:
+    """Collects folded stacks of request-serving threads until stopped"""
+
+    def __init__(self, interval_ms=PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def _sample(self):
+        threads = {thread.ident: thread for thread in threading.enumerate() if _is_request_thread(thread)}
+        for ident, frame in sys._current_frames().items():
+            thread = threads.get(ident)
+            if thread is None or _is_idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(thread.name)
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def folded(self):
+        """Collapsed-stack text, one 'stack count' per line"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+def save(sampler, method, path):
+    """Write a finished profile; returns its id"""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    (PROFILE_DIR / f"{profile_id}.folded").write_text(sampler.folded())
+    (PROFILE_DIR / f"{profile_id}.json").write_text(json.dumps({
+        "id": profile_id,
+        "method": method,
+        "path": path,
+        "duration_ms": round(sampler.duration * 1000, 1),
+        "samples": sampler.samples,
+        "interval_ms": sampler.interval * 1000,
+        "created_at": time.time(),
+    }))
+    _prune()
+    return profile_id
+
+def _prune():
+    profiles = sorted(PROFILE_DIR.glob('*.folded'))
+    for old in profiles[:-PROFILE_KEEP]:
+        old.unlink(missing_ok=True)
+        old.with_suffix('.json').unlink(missing_ok=True)
+
+def list_profiles():
+    """Stored profiles, newest first"""
+    if not PROFILE_DIR.exists():
+        return []
+    profiles = []
+    for path in sorted(PROFILE_DIR.glob('*.json'), reverse=True):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+def profile_path(profile_id):
+    """Path of a stored profile, or None (ids are never used as raw paths)"""
+    for path in PROFILE_DIR.glob('*.folded'):
+        if path.stem == profile_id:
+            return path
+    return None
@@ -0,0 +1,57 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Variant name -> (max edge in pixels, JPEG quality)
+PROOF_VARIANTS = {
+    'preview': (int(os.getenv('PROOF_PREVIEW_PX', '1280')), 80),
+    'thumb': (int(os.getenv('PROOF_THUMB_PX', '320')), 70),
+}
+PROOF_INGEST_WORKERS = int(os.getenv('PROOF_INGEST_WORKERS', '2'))
+
+_ingest_pool = None
+
+def get_ingest_pool():
+    """Get (lazily create) the process pool used for image work"""
+    global _ingest_pool
+    if _ingest_pool is None:
+        _ingest_pool = ProcessPoolExecutor(max_workers=PROOF_INGEST_WORKERS)
+    return _ingest_pool
+
+def shutdown_ingest_pool():
+    """Stop the ingest pool, waiting for queued jobs to finish"""
+    global _ingest_pool
+    if _ingest_pool is not None:
+        _ingest_pool.shutdown(wait=True)
+        _ingest_pool = None
+
+def variant_location(location, size):
+    """Path/key of a variant, stored next to the original: foo.png -> foo.thumb.jpg"""
+    root, _ = os.path.splitext(location)
+    return f"{root}.{size}.jpg"
+
+def render_proof_variants(content):
+    """Render every PROOF_VARIANTS entry from the original image bytes.
+
+    Runs inside the ingest pool, so it only takes and returns plain bytes.
+    Returns {size: jpeg_bytes}.
+    """
+    from PIL import Image, ImageOps
+
+    largest = max(px for px, _ in PROOF_VARIANTS.values())
+    variants = {}
+    with Image.open(io.BytesIO(content)) as original:
+        # Let the JPEG decoder downscale while decoding; phone photos are 12MP+
+        original.draft('RGB', (largest, largest))
+        img = ImageOps.exif_transpose(original)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Largest first, so each smaller variant is resized from the previous one
+        for size, (px, quality) in sorted(PROOF_VARIANTS.items(), key=lambda item: -item[1][0]):
+            img.thumbnail((px, px), Image.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+            variants[size] = buffer.getvalue()
+
+    return variants
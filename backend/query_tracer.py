@@ -0,0 +1,118 @@
+import contextvars
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+
+from logger_config import logger
+
+# Per-request SQL tracing. The database cursor reports every statement here;
+# the request middleware turns the trace into a Server-Timing header and logs
+# requests that exceed the query budgets or repeat a statement (N+1).
+
+QUERY_COUNT_BUDGET = int(os.getenv('QUERY_COUNT_BUDGET', '10'))
+QUERY_TIME_BUDGET_MS = float(os.getenv('QUERY_TIME_BUDGET_MS', '200'))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '5'))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s")
+_VALUES_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_trace = contextvars.ContextVar('query_trace', default=None)
+_captures = []
+
+@lru_cache(maxsize=1024)
+def _normalize(query):
+    query = _STRING_LITERAL.sub('?', query)
+    query = _PLACEHOLDER.sub('?', query)
+    query = _NUMBER.sub('?', query)
+    query = _VALUES_LIST.sub('(?)', query)
+    return _WHITESPACE.sub(' ', query).strip()
+
+def normalize_sql(query):
+    """Statement text with literals/placeholders replaced, for grouping"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    elif not isinstance(query, str):
+        query = str(query)
+    return _normalize(query)
+
+class QueryTrace:
+    """Statements executed during one request: (normalized sql, seconds, rows)"""
+
+    def __init__(self):
+        self.queries = []
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(seconds for _, seconds, _ in self.queries) * 1000
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Statements executed at least threshold times (likely N+1 patterns)"""
+        counts = Counter(statement for statement, _, _ in self.queries)
+        return [(statement, count) for statement, count in counts.most_common() if count >= threshold]
+
+    def summary(self):
+        return [
+            {"sql": statement, "ms": round(seconds * 1000, 2), "rows": rows}
+            for statement, seconds, rows in self.queries
+        ]
+
+def start_trace():
+    """Begin tracing the current request"""
+    trace = QueryTrace()
+    _trace.set(trace)
+    return trace
+
+def record(query, seconds, rowcount):
+    """Called by the database layer for every statement"""
+    trace = _trace.get()
+    if trace is None and not _captures:
+        return
+    entry = (normalize_sql(query), seconds, rowcount)
+    if trace is not None:
+        trace.queries.append(entry)
+    for capture in _captures:
+        capture.queries.append(entry)
+
+def server_timing(trace, app_seconds=None):
+    """Server-Timing header value for a finished request"""
+    parts = [f'db;dur={trace.total_ms:.1f};desc="{trace.count} queries"']
+    if app_seconds is not None:
+        parts.append(f"app;dur={app_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+def check_budgets(trace, method, path):
+    """Log requests that exceed the query count/time budgets or look like N+1"""
+    repeated = trace.repeated()
+    if trace.count <= QUERY_COUNT_BUDGET and trace.total_ms <= QUERY_TIME_BUDGET_MS and not repeated:
+        return False
+    logger.warning("query budget exceeded", extra={"fields": {
+        "method": method,
+        "path": path,
+        "queries": trace.count,
+        "db_ms": round(trace.total_ms, 2),
+        "count_budget": QUERY_COUNT_BUDGET,
+        "time_budget_ms": QUERY_TIME_BUDGET_MS,
+        "repeated": [{"sql": statement, "count": count} for statement, count in repeated],
+        "statements": trace.summary(),
+    }})
+    return True
+
+@contextmanager
+def capture_queries():
+    """Collect the statements run inside the block, from every thread (the
+    request threadpool included), into the yielded QueryTrace"""
+    capture = QueryTrace()
+    _captures.append(capture)
+    try:
+        yield capture
+    finally:
+        _captures.remove(capture)
@@ -0,0 +1,114 @@
+import os
+import threading
+
+from database import (
+    claim_due_emails, mark_email_sent, mark_email_failed, get_payment_proofs_under, move_payment_proof
+)
+from logger_config import logger
+from mailer import MailerError
+from proof_images import PROOF_VARIANTS, variant_location
+from resilience import DependencyUnavailable
+from storage import StorageError, ObjectNotFound
+
+# Catch-up work for the degraded paths of the S3/SES circuit breakers:
+# emails queued in the outbox are resent, and payment proofs accepted into the
+# local fallback storage are moved to primary storage once it answers again.
+# Runs in one daemon thread per worker process; outbox rows are claimed with
+# SKIP LOCKED so several workers never send the same message.
+
+RECOVERY_INTERVAL = float(os.getenv('RECOVERY_INTERVAL', '30'))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '20'))
+
+_worker = None
+_worker_pid = None
+_stopping = threading.Event()
+
+def _rejected(error):
+    return isinstance(error.__cause__, DependencyUnavailable)
+
+def drain_email_outbox(mailer, limit=OUTBOX_BATCH_SIZE):
+    """Resend due outbox emails; returns (sent, failed)"""
+    sent = failed = 0
+    for email in claim_due_emails(limit):
+        try:
+            mailer.send(email['to_email'], email['subject'], email['html'], email['text_body'], email['cc_email'])
+        except MailerError as e:
+            if _rejected(e):
+                # Breaker open: the rest of the batch is retried once the lease runs out
+                break
+            if mark_email_failed(email['id'], str(e)):
+                logger.error(f"Email {email['id']} to {email['to_email']} given up after {email['attempts'] + 1} attempts: {e}")
+            failed += 1
+            continue
+        mark_email_sent(email['id'])
+        sent += 1
+    if sent or failed:
+        logger.info(f"Email outbox: {sent} sent, {failed} failed")
+    return sent, failed
+
+def sync_fallback_uploads(storage, fallback):
+    """Move payment proofs kept in fallback storage to primary storage; returns the number moved.
+
+    The fallback copies are deleted once the booking points at primary storage.
+    """
+    if storage.name == fallback.name:
+        return 0
+    moved = 0
+    for location in get_payment_proofs_under(fallback.url('')):
+        key = fallback.key_for(location)
+        try:
+            content, content_type = fallback.get(key)
+        except ObjectNotFound:
+            # Accepted by another container, which syncs it itself
+            continue
+        try:
+            storage.put(key, content, content_type)
+            for size in PROOF_VARIANTS:
+                variant = variant_location(key, size)
+                if fallback.exists(variant):
+                    variant_content, variant_type = fallback.get(variant)
+                    storage.put(variant, variant_content, variant_type)
+        except StorageError as e:
+            logger.warning(f"Payment proof sync stopped, {storage.name} storage still unavailable: {e}")
+            break
+        move_payment_proof(location, storage.url(key))
+        moved += 1
+        try:
+            for stored in (key, *(variant_location(key, size) for size in PROOF_VARIANTS)):
+                fallback.delete(stored)
+        except StorageError as e:
+            logger.warning(f"Could not delete moved payment proof {key} from {fallback.name} storage: {e}")
+    if moved:
+        logger.info(f"Moved {moved} payment proofs from {fallback.name} to {storage.name} storage")
+    return moved
+
+def _recovery_loop(mailer, storage, fallback, interval):
+    while not _stopping.wait(interval):
+        try:
+            drain_email_outbox(mailer)
+        except Exception as e:
+            logger.error(f"Email outbox drain failed: {e}")
+        try:
+            sync_fallback_uploads(storage, fallback)
+        except Exception as e:
+            logger.error(f"Payment proof sync failed: {e}")
+
+def start_recovery_worker(mailer, storage, fallback, interval=RECOVERY_INTERVAL):
+    """Start the recovery thread (once per process)"""
+    global _worker, _worker_pid
+    if _worker is not None and _worker_pid == os.getpid():
+        return
+    _worker = threading.Thread(
+        target=_recovery_loop, args=(mailer, storage, fallback, interval), name="recovery", daemon=True
+    )
+    _stopping.clear()
+    _worker.start()
+    _worker_pid = os.getpid()
+
+def stop_recovery_worker(timeout=10):
+    """Let a running catch-up round finish, then stop the thread"""
+    global _worker
+    if _worker is not None and _worker_pid == os.getpid():
+        _stopping.set()
+        _worker.join(timeout)
+        _worker = None
@@ -0,0 +1,76 @@
+import os
+import random
+import time
+
+from logger_config import logger
+
+# Per-route sampling: "prefix=rate,prefix=rate". Longest matching prefix wins.
+# Seat maps are polled constantly, so they are sampled by default.
+LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '/showtime/=0.1,/api/showtime/=0.1')
+LOG_SAMPLE_DEFAULT = float(os.getenv('LOG_SAMPLE_DEFAULT', '1.0'))
+# Requests slower than this (or failing with 5xx) are always logged
+LOG_SLOW_REQUEST_MS = float(os.getenv('LOG_SLOW_REQUEST_MS', '1000'))
+# Only these request headers are logged
+LOG_HEADER_ALLOWLIST = os.getenv('LOG_HEADER_ALLOWLIST', 'user-agent,referer,x-real-ip,x-forwarded-for,content-length')
+
+def _parse_sample_rates(spec):
+    rates = []
+    for item in spec.split(','):
+        if '=' in item:
+            prefix, rate = item.split('=', 1)
+            rates.append((prefix.strip(), float(rate)))
+    return sorted(rates, key=lambda entry: -len(entry[0]))
+
+_sample_rates = _parse_sample_rates(LOG_SAMPLE_RATES)
+_allowed_headers = tuple(h.strip().lower() for h in LOG_HEADER_ALLOWLIST.split(',') if h.strip())
+
+# Time spent inside the logging middleware itself, for overhead reporting
+overhead = {"requests": 0, "logged": 0, "total_us": 0.0, "max_us": 0.0}
+
+def sample_rate(path):
+    """Sampling rate for a request path"""
+    for prefix, rate in _sample_rates:
+        if path.startswith(prefix):
+            return rate
+    return LOG_SAMPLE_DEFAULT
+
+def allowed_headers(headers):
+    """Subset of request headers that is safe and useful to log"""
+    return {name: headers[name] for name in _allowed_headers if name in headers}
+
+def log_request(method, path, route, query, status, duration_ms, client, headers):
+    """Emit one structured line for a finished request (subject to sampling)"""
+    started = time.perf_counter()
+    logged = (
+        status >= 500
+        or duration_ms >= LOG_SLOW_REQUEST_MS
+        or random.random() < sample_rate(path)
+    )
+    if logged:
+        logger.info("request", extra={"fields": {
+            "method": method,
+            "path": path,
+            "route": route,
+            "query": query,
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+            "client": client,
+            "headers": allowed_headers(headers),
+        }})
+
+    spent_us = (time.perf_counter() - started) * 1e6
+    overhead["requests"] += 1
+    overhead["logged"] += logged
+    overhead["total_us"] += spent_us
+    overhead["max_us"] = max(overhead["max_us"], spent_us)
+    return logged
+
+def overhead_snapshot():
+    """Average/max per-request cost of request logging, in microseconds"""
+    requests = overhead["requests"]
+    return {
+        "requests": requests,
+        "logged": overhead["logged"],
+        "avg_us": overhead["total_us"] / requests if requests else 0.0,
+        "max_us": overhead["max_us"],
+    }
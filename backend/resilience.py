@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import metrics
+from logger_config import logger
+
+# Isolation for slow or failing network dependencies (S3, SES).
+#
+# Every call to a dependency runs in that dependency's own bounded thread pool
+# (bulkhead) with a deadline, behind a circuit breaker. A hung dependency can
+# then tie up at most its own few threads, never the request threadpool that
+# also serves seat maps, and once it keeps failing calls fail fast until the
+# breaker lets a probe through again.
+
+class DependencyUnavailable(Exception):
+    """Call rejected without trying: breaker open or bulkhead full"""
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go ahead; in half-open state only one probe at a time"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                logger.info(f"Circuit breaker {self.name} half-open, probing")
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit breaker {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def cancel(self):
+        """An allowed call that never reached the dependency"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit breaker {self.name} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "open_for_s": round(time.monotonic() - self.opened_at, 1) if self.state == self.OPEN else None,
+            }
+
+class Bulkhead:
+    """Bounded executor: at most max_workers running and max_queue waiting calls"""
+
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.capacity = max_workers + max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"bulkhead-{name}")
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                return None
+            self.in_flight += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self.in_flight -= 1
+
+class Dependency:
+    """A bulkhead, a per-call deadline and a circuit breaker for one dependency.
+
+    call() raises error_class for rejections and timeouts; exceptions that
+    is_failure() rejects (e.g. "object not found") pass through without
+    counting against the breaker.
+    """
+
+    def __init__(self, name, max_workers, max_queue, timeout, failure_threshold, reset_timeout,
+                 error_class=Exception, is_failure=None):
+        self.name = name
+        self.timeout = timeout
+        self.error_class = error_class
+        self.is_failure = is_failure or (lambda error: True)
+        self.bulkhead = Bulkhead(name, max_workers, max_queue)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        _dependencies[name] = self
+
+    def call(self, fn, *args):
+        if not self.breaker.allow():
+            metrics.dependency_rejections_total.inc(self.name, 'circuit_open')
+            raise self.error_class(f"{self.name} unavailable (circuit open)") from DependencyUnavailable()
+        future = self.bulkhead.submit(fn, *args)
+        if future is None:
+            # Not the dependency's fault, so the breaker is left alone
+            self.breaker.cancel()
+            metrics.dependency_rejections_total.inc(self.name, 'bulkhead_full')
+            raise self.error_class(f"{self.name} unavailable (bulkhead full)") from DependencyUnavailable()
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout as e:
+            # The worker thread stays busy until the client's own timeouts fire
+            self.breaker.record_failure()
+            metrics.dependency_rejections_total.inc(self.name, 'timeout')
+            raise self.error_class(f"{self.name} timed out after {self.timeout}s") from e
+        except Exception as e:
+            if self.is_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def snapshot(self):
+        return {
+            **self.breaker.snapshot(),
+            "in_flight": self.bulkhead.in_flight,
+            "capacity": self.bulkhead.capacity,
+            "timeout_s": self.timeout,
+        }
+
+_dependencies = {}
+
+def dependency_config(prefix, workers, queue, timeout):
+    """Dependency() keyword arguments from <PREFIX>_BULKHEAD_SIZE, _BULKHEAD_QUEUE, _TIMEOUT, _BREAKER_*"""
+    return {
+        "max_workers": int(os.getenv(f'{prefix}_BULKHEAD_SIZE', str(workers))),
+        "max_queue": int(os.getenv(f'{prefix}_BULKHEAD_QUEUE', str(queue))),
+        "timeout": float(os.getenv(f'{prefix}_TIMEOUT', str(timeout))),
+        "failure_threshold": int(os.getenv(f'{prefix}_BREAKER_FAILURES', '5')),
+        "reset_timeout": float(os.getenv(f'{prefix}_BREAKER_RESET', '30')),
+    }
+
+def dependencies_snapshot():
+    """State of every guarded dependency, for monitoring"""
+    return {name: dependency.snapshot() for name, dependency in _dependencies.items()}
+
+def _breaker_states():
+    return {(name,): CircuitBreaker.STATE_VALUES[dependency.breaker.state] for name, dependency in _dependencies.items()}
+
+def _in_flight():
+    return {(name,): dependency.bulkhead.in_flight for name, dependency in _dependencies.items()}
+
+metrics.circuit_breaker_state.set_function(_breaker_states)
+metrics.bulkhead_in_flight.set_function(_in_flight)
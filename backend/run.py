@@ -1,10 +1,174 @@
 #!/usr/bin/env python3
-import uvicorn
-from main import app
+"""
+Start the Movie Booking API.
+
+  python run.py          one process on port 8000, for development
+  python run.py serve    production: a gunicorn master with uvicorn workers
+
+Production settings, as flags or environment variables (defaults in brackets):
+  --workers              WEB_CONCURRENCY      worker processes [CPUs of the cgroup quota, else up to 4]
+  --preload/--no-preload PRELOAD_APP          import the app once in the master, before forking [on]
+  --max-requests         MAX_REQUESTS         recycle a worker after this many requests, 0 = never [5000]
+  --max-requests-jitter  MAX_REQUESTS_JITTER  random extra requests, so workers do not recycle together [500]
+  --graceful-timeout     GRACEFUL_TIMEOUT     seconds a worker may drain after SIGTERM [30]
+  --timeout              WORKER_TIMEOUT       seconds before a silent worker is killed and replaced [60]
+  --keepalive            KEEPALIVE            idle keep-alive seconds [5]
+  --backlog              BACKLOG              listen backlog [2048]
+  --threadpool           THREADPOOL_SIZE      threads per worker for sync endpoints [40]
+  --db-connections       DB_MAX_CONNECTIONS   connections to each database for all workers together, 0 = no limit [80]
+  --port                 PORT                 [8000]
+
+On SIGTERM the master stops accepting connections and every worker finishes
+its in-flight requests (and their background tasks) before running the app's
+shutdown hooks, which stop the recovery worker and flush job pools,
+metrics and the log queue. Queued emails stay in the outbox for the next start.
+
+Each worker may open DB_MAX_CONNECTIONS / workers connections (DB_POOL_MAX_OPEN);
+keep DB_MAX_CONNECTIONS below the server's max_connections, minus whatever
+else connects. Requests beyond a worker's share wait for a free connection.
+
+With more than one worker, metrics are merged through METRICS_DIR
+(default /tmp/movies-api-metrics, cleared here on start).
+gunicorn does not run on Windows; there `serve` falls back to uvicorn's own
+multi-process mode, without preloading.
+"""
+
+import argparse
+import glob
+import math
+import os
+
+def env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+def env_flag(name, default):
+    return os.getenv(name, 'true' if default else 'false').lower() == 'true'
+
+def cgroup_cpus():
+    """CPUs granted by the container's cgroup quota (v2, then v1), or None without a quota"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        return int(quota) / int(period) if quota != 'max' else None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def default_workers():
+    """One worker per CPU of the container's quota; without one, os.cpu_count()
+    is the host's CPUs, so stay small"""
+    cpus = cgroup_cpus()
+    if cpus is not None:
+        return max(1, math.ceil(cpus))
+    return min(os.cpu_count() or 1, 4)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Start the Movie Booking API')
+    parser.add_argument('mode', nargs='?', choices=('dev', 'serve'), default='dev')
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=env_int('PORT', 8000))
+    parser.add_argument('--workers', type=int, default=env_int('WEB_CONCURRENCY', default_workers()))
+    parser.add_argument('--preload', action=argparse.BooleanOptionalAction, default=env_flag('PRELOAD_APP', True))
+    parser.add_argument('--max-requests', type=int, default=env_int('MAX_REQUESTS', 5000))
+    parser.add_argument('--max-requests-jitter', type=int, default=env_int('MAX_REQUESTS_JITTER', 500))
+    parser.add_argument('--graceful-timeout', type=int, default=env_int('GRACEFUL_TIMEOUT', 30))
+    parser.add_argument('--timeout', type=int, default=env_int('WORKER_TIMEOUT', 60))
+    parser.add_argument('--keepalive', type=int, default=env_int('KEEPALIVE', 5))
+    parser.add_argument('--backlog', type=int, default=env_int('BACKLOG', 2048))
+    parser.add_argument('--threadpool', type=int, default=env_int('THREADPOOL_SIZE', 40))
+    parser.add_argument('--db-connections', type=int, default=env_int('DB_MAX_CONNECTIONS', 80))
+    parser.add_argument('--log-level', default=os.getenv('SERVER_LOG_LEVEL', 'info'))
+    options = parser.parse_args()
+    if options.mode == 'serve' and 0 < options.db_connections < options.workers:
+        parser.error(f"--db-connections {options.db_connections} leaves no connection for some of {options.workers} workers")
+    return options
+
+def connections_per_worker(options):
+    """DB_POOL_MAX_OPEN for each worker; 0 leaves connections unlimited"""
+    return options.db_connections // options.workers if options.mode == 'serve' else options.db_connections
+
+def prepare_environment(options):
+    """Settings the app reads at import time; set before anything imports main"""
+    os.environ['THREADPOOL_SIZE'] = str(options.threadpool)
+    os.environ['DB_POOL_MAX_OPEN'] = str(connections_per_worker(options))
+    if options.mode == 'serve' and options.workers > 1:
+        metrics_dir = os.environ.setdefault('METRICS_DIR', '/tmp/movies-api-metrics')
+        # Snapshots of a previous run would be merged as exited workers
+        for path in glob.glob(os.path.join(metrics_dir, 'metrics-*.json')):
+            os.remove(path)
+
+def serve_gunicorn(options):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            config = {
+                'bind': f"{options.host}:{options.port}",
+                'workers': options.workers,
+                'worker_class': 'uvicorn.workers.UvicornWorker',
+                'preload_app': options.preload,
+                'max_requests': options.max_requests,
+                'max_requests_jitter': options.max_requests_jitter,
+                'graceful_timeout': options.graceful_timeout,
+                'timeout': options.timeout,
+                'keepalive': options.keepalive,
+                'backlog': options.backlog,
+                'loglevel': options.log_level,
+            }
+            for key, value in config.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    Application().run()
+
+def serve_uvicorn(options):
+    import uvicorn
+
+    uvicorn.run(
+        'main:app',
+        host=options.host,
+        port=options.port,
+        workers=options.workers,
+        limit_max_requests=options.max_requests or None,
+        timeout_graceful_shutdown=options.graceful_timeout,
+        timeout_keep_alive=options.keepalive,
+        backlog=options.backlog,
+        log_level=options.log_level,
+    )
+
+def main():
+    options = parse_args()
+    prepare_environment(options)
+
+    if options.mode == 'dev':
+        import uvicorn
+        from main import app
+
+        print("Starting Movie Booking API server...")
+        print(f"API Documentation: http://localhost:{options.port}/docs")
+        print(f"API Base URL: http://localhost:{options.port}")
+        print("Press Ctrl+C to stop the server")
+        uvicorn.run(app, host=options.host, port=options.port)
+        return
+
+    print(f"Serving Movie Booking API on {options.host}:{options.port} with {options.workers} workers, "
+          f"{connections_per_worker(options)} database connections each")
+    try:
+        import gunicorn.app.base  # noqa: F401 - needs fcntl, so not on Windows
+    except ImportError:
+        serve_uvicorn(options)
+    else:
+        serve_gunicorn(options)
 
 if __name__ == "__main__":
-    print("Starting Movie Booking API server...")
-    print("API Documentation: http://localhost:8000/docs")
-    print("API Base URL: http://localhost:8000")
-    print("Press Ctrl+C to stop the server")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    main()
@@ -0,0 +1,114 @@
+import os
+
+from cache import TTLCache
+from database import get_db_connection, get_showtime_by_id, get_reserved_seats
+from logger_config import logger
+
+# Showtime layouts and seat maps as served by GET /showtime/{id}, cached per
+# worker process.
+#
+# Layouts change only through the admin movie/theater/showtime endpoints,
+# which invalidate the cache. Seat state changes with every hold and booking:
+# writes in this process invalidate it at once, and the short SEAT_STATE_TTL
+# bounds how long another worker's hold can be missing from the map. Seat
+# availability itself is always checked against the database on reserve/book.
+
+SHOWTIME_LAYOUT_TTL = float(os.getenv('SHOWTIME_LAYOUT_TTL', '300'))
+SEAT_STATE_TTL = float(os.getenv('SEAT_STATE_TTL', '3'))
+# Statuses shown on the seat map, by response field
+SEAT_MAP_STATUSES = {
+    'pending_payment': 'pending_payment_seats',
+    'pending_approval': 'pending_approval_seats',
+    'approved': 'approved_seats',
+    'confirmed': 'confirmed_seats',
+}
+
+showtime_layouts = TTLCache('showtime_layout', SHOWTIME_LAYOUT_TTL)
+seat_states = TTLCache('seat_state', SEAT_STATE_TTL, max_entries=4096)
+
+def layout_from_showtime(showtime):
+    """Seat-map layout from a get_showtime_by_id() row"""
+    return {
+        "showtime_id": showtime['id'],
+        "rows": showtime['rows'],
+        "left_cols": showtime['left_cols'],
+        "right_cols": showtime['right_cols'],
+        "movie": showtime['movie_title'],
+        "movie_poster": showtime.get('poster_url', ''),
+        "theater": showtime['theater_name'],
+        "address": showtime.get('address', ''),
+        "show_date": str(showtime['show_date']),
+        "showtime": str(showtime['show_time']),
+        "price": showtime['price'],
+        "non_selectable": showtime['non_selectable_seats'] or []
+    }
+
+def load_showtime_layout(showtime_id):
+    showtime = get_showtime_by_id(showtime_id)
+    return layout_from_showtime(showtime) if showtime else None
+
+def get_showtime_layout(showtime_id):
+    """Layout of a showtime, or None if it does not exist"""
+    layout = showtime_layouts.get_or_load(showtime_id, lambda: load_showtime_layout(showtime_id))
+    return dict(layout) if layout else None
+
+def seat_state_from_bookings(bookings, reserved_seat_ids):
+    state = {field: [] for field in SEAT_MAP_STATUSES.values()}
+    for booking in bookings:
+        state[SEAT_MAP_STATUSES[booking['status']]].extend(booking['seats'])
+    state["reserved_seats"] = reserved_seat_ids
+    return state
+
+def load_seat_state(showtime_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT seats, status FROM bookings
+        WHERE showtime_id = %s AND status = ANY(%s)
+    """, (showtime_id, list(SEAT_MAP_STATUSES)))
+
+    results = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    logger.info(f"Showtime {showtime_id} bookings found: {len(results)}")
+    return seat_state_from_bookings(results, get_reserved_seats(showtime_id))
+
+def get_seat_state(showtime_id):
+    """Seats by status (pending_payment_seats, ..., reserved_seats) for the seat map"""
+    return seat_states.get_or_load(showtime_id, lambda: load_seat_state(showtime_id))
+
+def load_seat_states(showtime_ids):
+    """Seat state of many showtimes in two queries, for warm-up"""
+    states = {showtime_id: {'bookings': [], 'reserved': []} for showtime_id in showtime_ids}
+    if not states:
+        return {}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT showtime_id, seats, status FROM bookings
+        WHERE showtime_id = ANY(%s) AND status = ANY(%s)
+    """, (list(states), list(SEAT_MAP_STATUSES)))
+    for row in cursor.fetchall():
+        states[row['showtime_id']]['bookings'].append(row)
+    cursor.execute("""
+        SELECT showtime_id, seat_id FROM seat_reservations
+        WHERE showtime_id = ANY(%s) AND expires_at >= CURRENT_TIMESTAMP
+    """, (list(states),))
+    for row in cursor.fetchall():
+        states[row['showtime_id']]['reserved'].append(row['seat_id'])
+    cursor.close()
+    conn.close()
+
+    return {
+        showtime_id: seat_state_from_bookings(state['bookings'], state['reserved'])
+        for showtime_id, state in states.items()
+    }
+
+def seat_state_changed(showtime_id):
+    """Call after any write that holds, books or releases seats of a showtime"""
+    seat_states.invalidate(showtime_id)
+
+def invalidate_layouts():
+    """Call after changing movies, theaters or showtimes"""
+    showtime_layouts.invalidate()
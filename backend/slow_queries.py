@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+
+from logger_config import LOG_DIR, JsonFormatter, logger
+from query_tracer import normalize_sql
+
+# Slow-query log. Statements slower than SLOW_QUERY_MS are handed to a single
+# background worker which aggregates them in the slow_queries table and, at
+# most once per SLOW_QUERY_EXPLAIN_INTERVAL per statement, captures a plan on
+# its own connection: EXPLAIN (ANALYZE, BUFFERS) for plain SELECTs (inside a
+# rolled-back transaction), plain EXPLAIN for everything else. Only the shape
+# of the parameters is stored, never their values.
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '250'))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', '600'))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv('SLOW_QUERY_EXPLAIN_TIMEOUT_MS', '5000'))
+SLOW_QUERY_MAX_PENDING = 100
+
+slow_logger = logging.getLogger("movies-api.slow-queries")
+slow_logger.setLevel(logging.INFO)
+slow_logger.propagate = False
+if not slow_logger.handlers:
+    # Only ever written from the background worker, so a direct file handler is fine
+    _slow_handler = RotatingFileHandler(LOG_DIR / "slow-queries.log", maxBytes=10 * 1024 * 1024, backupCount=5)
+    _slow_handler.setFormatter(JsonFormatter())
+    slow_logger.addHandler(_slow_handler)
+
+_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query")
+_pending = 0
+_pending_lock = threading.Lock()
+_last_explained = {}
+_explain_conn = None
+
+_EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete')
+
+def param_shape(params):
+    """Describe parameters without their values: types, string lengths, list sizes"""
+    def shape(value):
+        if value is None:
+            return 'null'
+        if isinstance(value, str):
+            return f"str({len(value)})"
+        if isinstance(value, (list, tuple)):
+            return f"list[{len(value)}]"
+        return type(value).__name__
+
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {key: shape(value) for key, value in params.items()}
+    return [shape(value) for value in params]
+
+def is_safe_to_analyze(sql):
+    """Plain reads only: EXPLAIN ANALYZE really executes the statement"""
+    lowered = sql.lstrip().lower()
+    if not lowered.startswith('select'):
+        return False
+    return not any(word in lowered for word in (' for update', ' for share', 'nextval(', 'setval(', ' into '))
+
+def report(query, params, seconds):
+    """Called by the database layer after every statement"""
+    if SLOW_QUERY_MS <= 0 or seconds * 1000 < SLOW_QUERY_MS:
+        return
+    global _pending
+    with _pending_lock:
+        if _pending >= SLOW_QUERY_MAX_PENDING:
+            return
+        _pending += 1
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    _worker.submit(_process, str(query), params, seconds)
+
+def _connection():
+    global _explain_conn
+    if _explain_conn is None or _explain_conn.closed:
+        import psycopg2
+        from database import DB_CONFIG
+
+        # Plain connection: statements here must not be traced or reported again
+        _explain_conn = psycopg2.connect(**DB_CONFIG)
+    return _explain_conn
+
+def _explain(cursor, query, params):
+    # Planning alone can take long for a pathological statement
+    cursor.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+    if is_safe_to_analyze(query):
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", params)
+        return 'analyze', cursor.fetchone()[0]
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+    return 'explain', cursor.fetchone()[0]
+
+def _process(query, params, seconds):
+    global _pending
+    try:
+        fingerprint_sql = normalize_sql(query)
+        fingerprint = hashlib.md5(fingerprint_sql.encode()).hexdigest()
+        duration_ms = seconds * 1000
+        shape = param_shape(params)
+
+        plan_kind, plan = None, None
+        now = time.monotonic()
+        if (fingerprint_sql.lower().startswith(_EXPLAINABLE)
+                and now - _last_explained.get(fingerprint, float('-inf')) >= SLOW_QUERY_EXPLAIN_INTERVAL):
+            _last_explained[fingerprint] = now
+            conn = _connection()
+            try:
+                with conn.cursor() as cursor:
+                    plan_kind, plan = _explain(cursor, query, params)
+            except Exception as e:
+                logger.warning(f"EXPLAIN failed for slow query {fingerprint}: {e}")
+            finally:
+                conn.rollback()
+
+        slow_logger.info("slow query", extra={"fields": {
+            "fingerprint": fingerprint,
+            "sql": fingerprint_sql,
+            "duration_ms": round(duration_ms, 2),
+            "params": shape,
+            "plan_kind": plan_kind,
+            "plan": plan,
+        }})
+        _store(fingerprint, fingerprint_sql, duration_ms, shape, plan_kind, plan)
+    except Exception as e:
+        logger.error(f"Slow query capture failed: {e}")
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+def _store(fingerprint, sql, duration_ms, shape, plan_kind, plan):
+    conn = _connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO slow_queries (fingerprint, query, calls, total_ms, max_ms, last_ms, param_shape,
+                                          plan_kind, plan, plan_captured_at, last_seen_at)
+                VALUES (%s, %s, 1, %s, %s, %s, %s, %s, %s, CASE WHEN %s IS NULL THEN NULL ELSE CURRENT_TIMESTAMP END, CURRENT_TIMESTAMP)
+                ON CONFLICT (fingerprint) DO UPDATE SET
+                    calls = slow_queries.calls + 1,
+                    total_ms = slow_queries.total_ms + EXCLUDED.total_ms,
+                    max_ms = GREATEST(slow_queries.max_ms, EXCLUDED.max_ms),
+                    last_ms = EXCLUDED.last_ms,
+                    param_shape = EXCLUDED.param_shape,
+                    plan_kind = COALESCE(EXCLUDED.plan_kind, slow_queries.plan_kind),
+                    plan = COALESCE(EXCLUDED.plan, slow_queries.plan),
+                    plan_captured_at = COALESCE(EXCLUDED.plan_captured_at, slow_queries.plan_captured_at),
+                    last_seen_at = CURRENT_TIMESTAMP
+            """, (fingerprint, sql, duration_ms, duration_ms, duration_ms, json.dumps(shape),
+                  plan_kind, json.dumps(plan) if plan is not None else None, plan_kind))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
@@ -0,0 +1,303 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+import metrics
+from faults import FaultInjector, InjectedFailure
+from logger_config import logger
+from resilience import Dependency, dependency_config
+
+load_dotenv()
+
+# Object storage behind one interface, selected with STORAGE_BACKEND:
+#   s3      the production bucket (S3_BUCKET in AWS_REGION)
+#   local   files under STORAGE_LOCAL_ROOT (default uploads/), for development
+#   memory  a dict with injectable latency/failures (STORAGE_LATENCY_MS,
+#           STORAGE_JITTER_MS, STORAGE_FAILURE_RATE), for benchmarks and load tests
+#
+# Objects are addressed by key. url() is the location stored in the database;
+# key_for() maps a stored location back to a key of this backend.
+#
+# Remote backends are wrapped in GuardedStorage: calls run in a bounded pool
+# with a deadline behind a circuit breaker (S3_BULKHEAD_SIZE, S3_TIMEOUT, ...,
+# see resilience.py), and the S3 client itself has short connect/read timeouts
+# (S3_CONNECT_TIMEOUT, S3_READ_TIMEOUT) so a hung socket frees its thread.
+
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 's3')
+STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT', 'uploads')
+S3_BUCKET = os.getenv('S3_BUCKET', 'bamboo-movies')
+AWS_REGION = os.getenv('AWS_REGION', 'ap-southeast-3')
+S3_CONNECT_TIMEOUT = float(os.getenv('S3_CONNECT_TIMEOUT', '2'))
+S3_READ_TIMEOUT = float(os.getenv('S3_READ_TIMEOUT', '5'))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+class StorageError(Exception):
+    """The storage backend could not complete an operation"""
+
+class ObjectNotFound(StorageError):
+    """No object stored under the key"""
+
+class ObjectStorage:
+    name = None
+    # Visible to every container, so worth mirroring rendered artefacts into
+    shared = False
+
+    def put(self, key, body, content_type='application/octet-stream'):
+        """Store bytes (or a binary file object) under key"""
+        with self._timed('put'):
+            self._put(key, body, content_type)
+
+    def get(self, key):
+        """(bytes, content_type) of a stored object; raises ObjectNotFound"""
+        with self._timed('get'):
+            return self._get(key)
+
+    def stream(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        """(chunk iterator, content_type) of a stored object; raises ObjectNotFound"""
+        with self._timed('get'):
+            return self._stream(key, chunk_size)
+
+    def exists(self, key):
+        with self._timed('head'):
+            return self._exists(key)
+
+    def delete(self, key):
+        """Remove the object under key; a missing object is not an error"""
+        with self._timed('delete'):
+            self._delete(key)
+
+    def url(self, key):
+        raise NotImplementedError
+
+    def key_for(self, location):
+        """Key of a location produced by url(), or None if it belongs elsewhere"""
+        prefix = self.url('')
+        return location[len(prefix):] if location.startswith(prefix) else None
+
+    def _stream(self, key, chunk_size):
+        content, content_type = self._get(key)
+        return (content[i:i + chunk_size] for i in range(0, len(content), chunk_size)), content_type
+
+    def _timed(self, operation):
+        return _Timed(self.name, operation)
+
+class _Timed:
+    def __init__(self, backend, operation):
+        self.backend = backend
+        self.operation = operation
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        metrics.storage_operation_duration.observe(time.perf_counter() - self.started, self.backend, self.operation)
+        if exc_type is not None and not issubclass(exc_type, ObjectNotFound):
+            metrics.storage_errors_total.inc(self.backend, self.operation)
+        return False
+
+class S3Storage(ObjectStorage):
+    name = 's3'
+    shared = True
+
+    def __init__(self, client, bucket=S3_BUCKET, region=AWS_REGION):
+        self.client = client
+        self.bucket = bucket
+        self.region = region
+
+    def url(self, key):
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}"
+
+    def _put(self, key, body, content_type):
+        try:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType=content_type)
+        except Exception as e:
+            raise StorageError(f"S3 put {key} failed: {e}") from e
+
+    def _object(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                raise ObjectNotFound(key) from e
+            raise StorageError(f"S3 get {key} failed: {e}") from e
+        except Exception as e:
+            raise StorageError(f"S3 get {key} failed: {e}") from e
+
+    def _get(self, key):
+        response = self._object(key)
+        return response['Body'].read(), response.get('ContentType', 'application/octet-stream')
+
+    def _stream(self, key, chunk_size):
+        response = self._object(key)
+        return response['Body'].iter_chunks(chunk_size), response.get('ContentType', 'application/octet-stream')
+
+    def _exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404', 'NotFound'):
+                return False
+            raise StorageError(f"S3 head {key} failed: {e}") from e
+        except Exception as e:
+            raise StorageError(f"S3 head {key} failed: {e}") from e
+
+    def _delete(self, key):
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            raise StorageError(f"S3 delete {key} failed: {e}") from e
+
+class LocalStorage(ObjectStorage):
+    name = 'local'
+
+    def __init__(self, root=STORAGE_LOCAL_ROOT):
+        self.root = Path(root)
+
+    def url(self, key):
+        return f"{self.root.as_posix()}/{key}"
+
+    def path(self, key):
+        return self.root / key
+
+    def _put(self, key, body, content_type):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = body if isinstance(body, (bytes, bytearray)) else body.read()
+        # Write then rename, so readers never see half an object
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+
+    def _get(self, key):
+        import mimetypes
+
+        try:
+            content = self.path(key).read_bytes()
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+        return content, mimetypes.guess_type(key)[0] or 'application/octet-stream'
+
+    def _exists(self, key):
+        return self.path(key).exists()
+
+    def _delete(self, key):
+        try:
+            self.path(key).unlink(missing_ok=True)
+        except OSError as e:
+            raise StorageError(f"Delete {key} failed: {e}") from e
+
+class MemoryStorage(ObjectStorage):
+    name = 'memory'
+    # Per process: with several workers, the others cannot see what one stored
+    shared = False
+
+    def __init__(self, faults=None):
+        self.objects = {}
+        self.faults = faults or FaultInjector()
+
+    def url(self, key):
+        return f"memory://{key}"
+
+    def _inject(self, operation, key):
+        try:
+            self.faults(operation)
+        except InjectedFailure as e:
+            raise StorageError(f"{e} ({key})") from e
+
+    def _put(self, key, body, content_type):
+        self._inject('put', key)
+        content = bytes(body) if isinstance(body, (bytes, bytearray)) else body.read()
+        self.objects[key] = (content, content_type)
+
+    def _get(self, key):
+        self._inject('get', key)
+        try:
+            return self.objects[key]
+        except KeyError as e:
+            raise ObjectNotFound(key) from e
+
+    def _exists(self, key):
+        self._inject('head', key)
+        return key in self.objects
+
+    def _delete(self, key):
+        self._inject('delete', key)
+        self.objects.pop(key, None)
+
+class GuardedStorage(ObjectStorage):
+    """A backend whose calls go through a resilience.Dependency"""
+
+    def __init__(self, backend, dependency):
+        self.backend = backend
+        self.dependency = dependency
+        self.name = backend.name
+        self.shared = backend.shared
+
+    def put(self, key, body, content_type='application/octet-stream'):
+        return self.dependency.call(self.backend.put, key, body, content_type)
+
+    def get(self, key):
+        return self.dependency.call(self.backend.get, key)
+
+    def stream(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        # Only opening the object is guarded; the body is read by the response
+        return self.dependency.call(self.backend.stream, key, chunk_size)
+
+    def exists(self, key):
+        return self.dependency.call(self.backend.exists, key)
+
+    def delete(self, key):
+        return self.dependency.call(self.backend.delete, key)
+
+    def url(self, key):
+        return self.backend.url(key)
+
+    def key_for(self, location):
+        return self.backend.key_for(location)
+
+def guarded(backend, prefix='S3'):
+    dependency = Dependency(
+        'storage', **dependency_config(prefix, workers=8, queue=32, timeout=10),
+        error_class=StorageError,
+        is_failure=lambda error: not isinstance(error, ObjectNotFound),
+    )
+    return GuardedStorage(backend, dependency)
+
+def create_storage(backend=STORAGE_BACKEND):
+    """Storage backend from configuration; S3 falls back to local storage if the client cannot be created"""
+    if backend == 'memory':
+        # Guarded like S3 so load tests exercise the same fail-fast path
+        return guarded(MemoryStorage(FaultInjector.from_env('STORAGE')))
+    if backend == 'local':
+        return LocalStorage()
+    if backend != 's3':
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    try:
+        import boto3
+        from botocore.config import Config
+
+        client = boto3.client(
+            's3',
+            region_name=AWS_REGION,
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            config=Config(
+                connect_timeout=S3_CONNECT_TIMEOUT,
+                read_timeout=S3_READ_TIMEOUT,
+                retries={'max_attempts': 2, 'mode': 'standard'},
+            )
+        )
+        metrics.instrument_boto_client(client, 's3')
+        return guarded(S3Storage(client))
+    except Exception as e:
+        logger.warning(f"S3 not configured, using local storage: {e}")
+        return LocalStorage()
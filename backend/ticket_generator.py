@@ -4,54 +4,109 @@ import base64
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.colors import black, blue, red
 from datetime import datetime
+from functools import lru_cache
 import os
 
-def generate_qr_code(data):
-    """Generate QR code and return as base64 string"""
-    qr = qrcode.QRCode(
+def _new_qr():
+    return qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
         box_size=10,
         border=4,
     )
+
+def generate_qr_png(data):
+    """Generate QR code and return PNG bytes"""
+    qr = _new_qr()
     qr.add_data(data)
     qr.make(fit=True)
     
     img = qr.make_image(fill_color="black", back_color="white")
     
-    # Convert to base64
     buffer = io.BytesIO()
     img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    return base64.b64encode(buffer.getvalue()).decode()
+    return buffer.getvalue()
 
-def create_ticket_pdf(booking_data, theater_config):
-    """Create PDF ticket with QR codes for each seat"""
-    
-    # Create tickets directory if it doesn't exist
-    os.makedirs("tickets", exist_ok=True)
+def generate_qr_code(data):
+    """Generate QR code and return as base64 string"""
+    return base64.b64encode(generate_qr_png(data)).decode()
+
+def generate_qr_images(payloads):
+    """Generate QR images for a batch of payloads, ready to draw.
+
+    Reuses one encoder and hands PIL images straight to reportlab, skipping
+    the PNG encode/decode round trip per seat.
+    """
+    qr = _new_qr()
+    images = []
+    for data in payloads:
+        qr.clear()
+        qr.add_data(data)
+        qr.make(fit=True)
+        img = qr.make_image(fill_color="black", back_color="white")
+        images.append(ImageReader(img.get_image() if hasattr(img, 'get_image') else img._img))
+    return images
+
+@lru_cache(maxsize=1)
+def _static_elements():
+    """Text that is identical on every ticket, laid out once per process.
+
+    Returns {form_name: [(font, size, color, x, y, text), ...]} with centred
+    positions already resolved.
+    """
+    width, height = A4
+    elements = {
+        'header': [("Helvetica-Bold", 24, blue, height - 50, "🎬 MOVIE TICKET")],
+        'footer': [
+            ("Helvetica", 8, black, 30, "Please arrive 30 minutes before showtime. No outside food allowed."),
+            ("Helvetica", 8, black, 20, "Present this ticket and valid ID at the theater entrance."),
+        ],
+    }
+    return {
+        name: [(font, size, color, (width - stringWidth(text, font, size)) / 2, y, text)
+               for font, size, color, y, text in lines]
+        for name, lines in elements.items()
+    }
+
+def _define_static_forms(c):
+    """Register header/footer as form XObjects, drawn by reference on each page"""
+    for name, lines in _static_elements().items():
+        c.beginForm(name)
+        for font, size, color, x, y, text in lines:
+            c.setFont(font, size)
+            c.setFillColor(color)
+            c.drawString(x, y, text)
+        c.endForm()
+
+def _draw_ticket(c, booking_data, theater_config):
+    width, height = A4
+    seats = booking_data['seats']
     
-    filename = f"tickets/ticket_{booking_data['id']}.pdf"
+    # Render all seat QR codes up front, in one batch. Signed check-in tokens
+    # when the caller provides them, the legacy readable payload otherwise.
+    seat_tokens = booking_data.get('seat_tokens') or {}
+    qr_images = generate_qr_images([
+        seat_tokens.get(seat) or
+        f"BOOKING:{booking_data['id']},SEAT:{seat},MOVIE:{theater_config['movie']},TIME:{theater_config['showtime']}"
+        for seat in seats
+    ])
     
-    # Create PDF
-    c = canvas.Canvas(filename, pagesize=A4)
-    width, height = A4
+    _define_static_forms(c)
     
     # Title
-    c.setFont("Helvetica-Bold", 24)
-    c.setFillColor(blue)
-    c.drawCentredText(width/2, height - 50, "🎬 MOVIE TICKET")
+    c.doForm('header')
     
     # Movie details
     c.setFont("Helvetica-Bold", 16)
     c.setFillColor(black)
-    c.drawCentredText(width/2, height - 100, theater_config['movie'])
+    c.drawCentredString(width/2, height - 100, theater_config['movie'])
     
     c.setFont("Helvetica", 12)
-    c.drawCentredText(width/2, height - 120, f"{theater_config['theater']} - {theater_config['showtime']}")
+    c.drawCentredString(width/2, height - 120, f"{theater_config['theater']} - {theater_config['showtime']}")
     
     # Booking info
     y_pos = height - 160
@@ -78,8 +133,9 @@ def create_ticket_pdf(booking_data, theater_config):
     
     y_pos -= 30
     
-    for i, seat in enumerate(booking_data['seats']):
+    for seat, qr_image in zip(seats, qr_images):
         if y_pos < 100:  # Start new page if needed
+            c.doForm('footer')
             c.showPage()
             y_pos = height - 50
         
@@ -97,26 +153,35 @@ def create_ticket_pdf(booking_data, theater_config):
         c.drawString(70, y_pos - 80, f"Showtime: {theater_config['showtime']}")
         c.drawString(70, y_pos - 95, f"Booking ID: {booking_data['id']}")
         
-        # Generate QR code data for this seat
-        qr_data = f"BOOKING:{booking_data['id']},SEAT:{seat},MOVIE:{theater_config['movie']},TIME:{theater_config['showtime']}"
-        
-        # QR code placeholder (in real implementation, you'd embed the actual QR image)
         c.setFont("Helvetica", 8)
-        c.drawString(width - 200, y_pos - 30, "QR CODE")
-        c.drawString(width - 200, y_pos - 45, f"Scan at theater")
-        c.drawString(width - 200, y_pos - 60, f"for seat {seat}")
+        c.drawString(width - 280, y_pos - 45, "Scan at theater")
+        c.drawString(width - 280, y_pos - 60, f"for seat {seat}")
         
-        # Draw QR code box
-        c.rect(width - 180, y_pos - 110, 80, 80)
+        # QR code image
+        c.drawImage(qr_image, width - 180, y_pos - 110, 80, 80)
         
         y_pos -= 140
     
     # Footer
-    c.setFont("Helvetica", 8)
-    c.drawCentredText(width/2, 30, "Please arrive 30 minutes before showtime. No outside food allowed.")
-    c.drawCentredText(width/2, 20, "Present this ticket and valid ID at the theater entrance.")
-    
+    c.doForm('footer')
     c.save()
+
+def render_ticket_pdf(booking_data, theater_config):
+    """Render the PDF ticket into memory and return the bytes"""
+    buffer = io.BytesIO()
+    _draw_ticket(canvas.Canvas(buffer, pagesize=A4), booking_data, theater_config)
+    return buffer.getvalue()
+
+def create_ticket_pdf(booking_data, theater_config, filename=None):
+    """Create PDF ticket with QR codes for each seat"""
+    
+    if filename is None:
+        # Create tickets directory if it doesn't exist
+        os.makedirs("tickets", exist_ok=True)
+        filename = f"tickets/ticket_{booking_data['id']}.pdf"
+    
+    with open(filename, "wb") as pdf:
+        pdf.write(render_ticket_pdf(booking_data, theater_config))
     
     return filename
 
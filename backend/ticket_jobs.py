@@ -0,0 +1,124 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Bump when the ticket layout changes so cached PDFs are regenerated
+TICKET_TEMPLATE_VERSION = 2
+TICKET_CACHE_DIR = os.getenv('TICKET_CACHE_DIR', 'tickets')
+TICKET_WORKERS = int(os.getenv('TICKET_WORKERS', '2'))
+# 'disk' caches PDFs under TICKET_CACHE_DIR, 'memory' renders into a buffer and never touches local disk
+TICKET_RENDER_MODE = os.getenv('TICKET_RENDER_MODE', 'disk')
+TICKET_STREAM_CHUNK_SIZE = 64 * 1024
+TICKET_STATUSES = ('approved', 'confirmed')
+# Tickets carry personal details and gate-entry QR codes, so downloads need the
+# per-booking secret from the link in the approval email
+TICKET_LINK_SECRET = os.getenv('TICKET_LINK_SECRET') or os.getenv('JWT_SECRET_KEY', 'your-super-secret-jwt-key-change-in-production')
+PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL', 'https://movies.bambooholiday.com').rstrip('/')
+
+_ticket_pool = None
+_rendering = {}
+
+def get_ticket_pool():
+    """Get (lazily create) the process pool used for PDF rendering"""
+    global _ticket_pool
+    if _ticket_pool is None:
+        _ticket_pool = ProcessPoolExecutor(max_workers=TICKET_WORKERS)
+    return _ticket_pool
+
+def shutdown_ticket_pool():
+    """Stop the ticket pool, waiting for queued renders to finish"""
+    global _ticket_pool
+    if _ticket_pool is not None:
+        _ticket_pool.shutdown(wait=True)
+        _ticket_pool = None
+
+def ticket_content_version(booking, layout):
+    """Short hash of everything printed on the ticket"""
+    content = {
+        'template': TICKET_TEMPLATE_VERSION,
+        'booking': [booking['id'], booking['customer_name'], booking['customer_email'],
+                    booking['customer_phone'], list(booking['seats']), booking['total_amount']],
+        'show': [layout['movie'], layout['theater'], layout['show_date'], layout['showtime']],
+    }
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+def ticket_download_token(booking_id):
+    """Unguessable secret that authorizes downloading one booking's ticket"""
+    mac = hmac.new(TICKET_LINK_SECRET.encode(), f"ticket-download:{booking_id}".encode(), hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(mac).rstrip(b'=').decode()
+
+def verify_ticket_download_token(booking_id, token):
+    return bool(token) and hmac.compare_digest(token.encode(), ticket_download_token(booking_id).encode())
+
+def ticket_download_url(booking_id):
+    """Link for the customer's email"""
+    return f"{PUBLIC_BASE_URL}/api/download-ticket/{booking_id}?token={ticket_download_token(booking_id)}"
+
+def ticket_cache_key(booking_id, version):
+    """Cache key (file name / object key suffix) of a rendered ticket"""
+    return f"ticket_{booking_id}_{version}.pdf"
+
+def ticket_cache_path(booking_id, version):
+    """Local path of a cached ticket"""
+    return os.path.join(TICKET_CACHE_DIR, ticket_cache_key(booking_id, version))
+
+def render_ticket_bytes_job(booking_data, theater_config):
+    """Render a ticket PDF in memory; runs inside the ticket pool"""
+    from ticket_generator import render_ticket_pdf
+
+    return render_ticket_pdf(booking_data, theater_config)
+
+def render_ticket_job(booking_data, theater_config, path):
+    """Render a ticket PDF to path; runs inside the ticket pool"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as pdf:
+        pdf.write(render_ticket_bytes_job(booking_data, theater_config))
+    # Atomic publish so readers never see a half-written PDF
+    os.replace(tmp_path, path)
+    return path
+
+def iter_pdf_chunks(pdf_bytes):
+    """Yield a rendered PDF in chunks for a chunked-transfer response"""
+    view = memoryview(pdf_bytes)
+    for offset in range(0, len(view), TICKET_STREAM_CHUNK_SIZE):
+        yield bytes(view[offset:offset + TICKET_STREAM_CHUNK_SIZE])
+
+def ticket_booking_data(booking):
+    """Booking fields for the renderer, with a signed check-in token per seat"""
+    from checkin import sign_seat_token
+
+    booking_data = dict(booking)
+    booking_data['seat_tokens'] = {
+        seat: sign_seat_token(booking['showtime_id'], booking['id'], seat) for seat in booking['seats']
+    }
+    return booking_data
+
+def _theater_config(layout):
+    return {key: layout[key] for key in ('movie', 'theater', 'show_date', 'showtime')}
+
+async def _shared_render(key, job, *args):
+    """Run job in the ticket pool; concurrent callers for the same key share one render"""
+    if key not in _rendering:
+        loop = asyncio.get_running_loop()
+        _rendering[key] = loop.run_in_executor(get_ticket_pool(), job, *args)
+    try:
+        return await _rendering[key]
+    finally:
+        _rendering.pop(key, None)
+
+async def ensure_ticket_pdf(booking, layout):
+    """Return the local path of the ticket PDF, rendering it in the pool if needed"""
+    path = ticket_cache_path(booking['id'], ticket_content_version(booking, layout))
+    if os.path.exists(path):
+        return path
+    return await _shared_render(path, render_ticket_job, ticket_booking_data(booking), _theater_config(layout), path)
+
+async def render_ticket_bytes(booking, layout):
+    """Render the ticket PDF in the pool and return the bytes, without touching disk"""
+    key = ticket_cache_key(booking['id'], ticket_content_version(booking, layout))
+    return await _shared_render(key, render_ticket_bytes_job, ticket_booking_data(booking), _theater_config(layout))
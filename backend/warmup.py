@@ -0,0 +1,126 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import showtimes
+from database import get_upcoming_showtimes
+from logger_config import logger
+
+# Preloads layouts and seat state of showtimes in the next WARMUP_DAYS into
+# the showtime caches: once at startup, so the first customers after a deploy
+# do not pay for cold queries, then every WARMUP_INTERVAL seconds (shorter than
+# the layout TTL, so upcoming layouts never go cold) and shortly before each
+# expected peak listed in WARMUP_PEAK_TIMES (local HH:MM, e.g. ticket
+# launches). Seat state is only fresh for SEAT_STATE_TTL, hence the short lead.
+
+WARMUP_DAYS = int(os.getenv('WARMUP_DAYS', '7'))
+WARMUP_INTERVAL = float(os.getenv('WARMUP_INTERVAL', str(showtimes.SHOWTIME_LAYOUT_TTL * 0.8)))
+WARMUP_PEAK_TIMES = [t.strip() for t in os.getenv('WARMUP_PEAK_TIMES', '').split(',') if t.strip()]
+WARMUP_PEAK_LEAD = float(os.getenv('WARMUP_PEAK_LEAD', '2'))
+# How often the scheduler retries startup warm-up steps that failed
+WARMUP_RETRY_INTERVAL = float(os.getenv('WARMUP_RETRY_INTERVAL', '10'))
+
+last_report = None
+
+_worker = None
+_worker_pid = None
+_stopping = threading.Event()
+
+def deep_size(obj, seen=None):
+    """Approximate bytes held by a structure of dicts, lists and scalars"""
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_size(item, seen) for item in obj)
+    return size
+
+def rss_mb():
+    """Peak resident memory of this process, where the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Kilobytes on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+def warm_upcoming_showtimes(days=WARMUP_DAYS):
+    """Load upcoming showtimes into the caches; returns a report with duration and memory"""
+    global last_report
+    started = time.perf_counter()
+    upcoming = get_upcoming_showtimes(days)
+    layouts = {showtime['id']: showtimes.layout_from_showtime(showtime) for showtime in upcoming}
+    seat_states = showtimes.load_seat_states(list(layouts))
+    for showtime_id, layout in layouts.items():
+        showtimes.showtime_layouts.set(showtime_id, layout)
+    for showtime_id, state in seat_states.items():
+        showtimes.seat_states.set(showtime_id, state)
+
+    last_report = {
+        "at": datetime.now().isoformat(timespec='seconds'),
+        "days": days,
+        "showtimes": len(layouts),
+        "seats_taken": sum(len(seats) for state in seat_states.values() for seats in state.values()),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "cache_bytes": deep_size(layouts) + deep_size(seat_states),
+        "rss_mb": rss_mb(),
+    }
+    logger.info(f"Warmed {last_report['showtimes']} showtimes in {last_report['duration_ms']}ms "
+                f"({last_report['cache_bytes'] / 1024:.0f} KiB cached)")
+    return last_report
+
+def next_run(now, interval=WARMUP_INTERVAL, peak_times=WARMUP_PEAK_TIMES, lead=WARMUP_PEAK_LEAD):
+    """When the next scheduled warm-up is due: after the interval, or before the next peak if sooner"""
+    candidates = [now + timedelta(seconds=interval)]
+    for peak in peak_times:
+        hour, minute = (int(part) for part in peak.split(':'))
+        due = now.replace(hour=hour, minute=minute, second=0, microsecond=0) - timedelta(seconds=lead)
+        if due <= now:
+            due += timedelta(days=1)
+        candidates.append(due)
+    return min(candidates)
+
+def _warmup_loop(retry):
+    due = next_run(datetime.now())
+    while True:
+        wait = (due - datetime.now()).total_seconds()
+        if retry is not None:
+            wait = min(wait, WARMUP_RETRY_INTERVAL)
+        if _stopping.wait(max(0.0, wait)):
+            return
+        if retry is not None:
+            try:
+                retry()
+            except Exception as e:
+                logger.error(f"Warm-up retry failed: {e}")
+        if datetime.now() >= due:
+            try:
+                warm_upcoming_showtimes()
+            except Exception as e:
+                logger.error(f"Scheduled warm-up failed: {e}")
+            due = next_run(datetime.now())
+
+def start_warmup_scheduler(retry=None):
+    """Start the warm-up thread (once per process); it also calls retry every
+    WARMUP_RETRY_INTERVAL seconds, to re-run startup steps that failed"""
+    global _worker, _worker_pid
+    if _worker is not None and _worker_pid == os.getpid():
+        return
+    _stopping.clear()
+    _worker = threading.Thread(target=_warmup_loop, args=(retry,), name="warmup", daemon=True)
+    _worker.start()
+    _worker_pid = os.getpid()
+
+def stop_warmup_scheduler():
+    global _worker
+    if _worker is not None and _worker_pid == os.getpid():
+        _stopping.set()
+        _worker.join(5)
+        _worker = None
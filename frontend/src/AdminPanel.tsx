@@ -37,6 +37,8 @@ const AdminPanel: React.FC<Props> = ({ navigate }) => {
   const [currentTab, setCurrentTab] = useState<'dashboard' | 'management' | 'settings'>('dashboard');
   const [statusFilter, setStatusFilter] = useState<string>('all');
   const [bookingStats, setBookingStats] = useState<Record<string, number>>({});
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [toast, setToast] = useState<{message: string, type: 'success'|'error'|'info'} | null>(null);
   const [actionModal, setActionModal] = useState<{bookingId: number, currentStatus: string} | null>(null);
   const [actionStatus, setActionStatus] = useState<string>('');
@@ -84,29 +86,9 @@ const AdminPanel: React.FC<Props> = ({ navigate }) => {
       const analyticsData = await analyticsResponse.json();
       const statsData = await statsResponse.json();
       
-      // Add showtime info to bookings
-      const bookingsWithShowtime = await Promise.all(
-        bookingsData.map(async (booking: any) => {
-          if (booking.showtime_id) {
-            try {
-              const showtimeResponse = await authUtils.apiCall(`/api/showtime/${booking.showtime_id}`);
-              const showtimeData = await showtimeResponse.json();
-              return {
-                ...booking,
-                movie_title: showtimeData.movie,
-                theater_name: showtimeData.theater,
-                show_date: showtimeData.show_date,
-                show_time: showtimeData.showtime
-              };
-            } catch {
-              return booking;
-            }
-          }
-          return booking;
-        })
-      );
-      
-      setBookings(bookingsWithShowtime);
+      // Bookings come with movie/theater/showtime joined in, one page at a time
+      setBookings(bookingsData);
+      setNextCursor(bookingsResponse.headers.get('X-Next-Cursor'));
       setAnalytics(analyticsData);
       setBookingStats(statsData);
     } catch (error) {
@@ -116,6 +98,23 @@ const AdminPanel: React.FC<Props> = ({ navigate }) => {
     }
   };
 
+  const loadMoreBookings = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const params = new URLSearchParams({ cursor: nextCursor });
+      if (statusFilter && statusFilter !== 'all') params.set('status', statusFilter);
+      const response = await authUtils.apiCall(`/api/bookings?${params}`);
+      const page = await response.json();
+      setBookings(current => [...current, ...page]);
+      setNextCursor(response.headers.get('X-Next-Cursor'));
+    } catch (error) {
+      console.error('Error loading more bookings:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const updateBookingStatus = async (bookingId: number, status: string, remarks?: string) => {
     try {
       const response = await authUtils.apiCall(`/api/booking/${bookingId}/action`, {
@@ -173,7 +172,7 @@ const AdminPanel: React.FC<Props> = ({ navigate }) => {
 
   const viewPaymentProof = async (bookingId: number) => {
     try {
-      const response = await fetch(`/api/payment-proof/${bookingId}`);
+      const response = await fetch(`/api/payment-proof/${bookingId}?size=preview`);
       
       if (response.ok) {
         const blob = await response.blob();
@@ -382,8 +381,14 @@ const AdminPanel: React.FC<Props> = ({ navigate }) => {
                   {booking.payment_proof ? (
                     <button 
                       onClick={() => viewPaymentProof(booking.id)}
-                      style={{ padding: '4px 8px', background: '#2196F3', color: 'white', border: 'none', borderRadius: '3px' }}
+                      style={{ padding: '4px', background: '#2196F3', color: 'white', border: 'none', borderRadius: '3px' }}
                     >
+                      <img
+                        src={`/api/payment-proof/${booking.id}?size=thumb`}
+                        alt="Payment proof thumbnail"
+                        loading="lazy"
+                        style={{ display: 'block', width: '96px', height: '96px', objectFit: 'cover', borderRadius: '3px' }}
+                      />
                       🔍 View Proof
                     </button>
                   ) : (
@@ -445,6 +450,18 @@ const AdminPanel: React.FC<Props> = ({ navigate }) => {
         </table>
       </div>
 
+      {nextCursor && (
+        <div style={{ textAlign: 'center', padding: '20px' }}>
+          <button
+            onClick={loadMoreBookings}
+            disabled={loadingMore}
+            style={{ padding: '10px 20px', border: '1px solid #ddd', borderRadius: '4px', background: 'white', cursor: 'pointer' }}
+          >
+            {loadingMore ? 'Loading...' : 'Load more bookings'}
+          </button>
+        </div>
+      )}
+
       {bookings.length === 0 && (
         <div style={{ textAlign: 'center', padding: '40px', color: '#666' }}>
           No bookings found